@@ -1,13 +1,36 @@
 from __future__ import annotations
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 
-from api.dependencies import register_dependencies
-from api.routers import detect
+from api.dependencies import (
+    register_dependencies,
+    start_job_runner,
+    start_model_reaper,
+    start_warmup,
+    stop_job_runner,
+    stop_model_reaper,
+)
+from api.middleware import register_metrics_middleware
+from api.routers import detect, jobs, metrics
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    start_warmup(app)
+    start_model_reaper(app)
+    start_job_runner(app)
+    yield
+    stop_job_runner(app)
+    stop_model_reaper(app)
 
 
-app = FastAPI(title="GroundingDINO Server")
+app = FastAPI(title="GroundingDINO Server", lifespan=lifespan)
 
 register_dependencies(app)
+register_metrics_middleware(app)
 app.include_router(detect.router)
+app.include_router(jobs.router)
+app.include_router(metrics.router)
 
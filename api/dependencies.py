@@ -1,8 +1,13 @@
 from __future__ import annotations
 
-from fastapi import FastAPI, Request
+import logging
+import threading
 
-from src.services.factory import get_detection_manager
+from fastapi import FastAPI, HTTPException, Request
+
+from config.runtime import get_settings
+from src.services.factory import create_job_runner, get_detection_manager
+from src.services.jobs import JobRunner
 from src.services.manager import DetectionServiceManager
 
 
@@ -10,6 +15,22 @@ def register_dependencies(app: FastAPI) -> None:
     app.state.detection_manager = get_detection_manager()
 
 
+def start_warmup(app: FastAPI) -> None:
+    """Warm the models in the background so /healthz answers while /readyz waits."""
+    manager: DetectionServiceManager = app.state.detection_manager
+    if not get_settings().warmup:
+        manager.mark_ready()
+        return
+
+    def run() -> None:
+        try:
+            manager.warmup()
+        except Exception:  # noqa: BLE001 - keep serving; /readyz keeps failing
+            logging.getLogger("uvicorn.error").exception("Model warm-up failed")
+
+    threading.Thread(target=run, name="model-warmup", daemon=True).start()
+
+
 def get_detection_manager_dependency(request: Request) -> DetectionServiceManager:
     manager: DetectionServiceManager = getattr(
         request.app.state,
@@ -20,3 +41,32 @@ def get_detection_manager_dependency(request: Request) -> DetectionServiceManage
         manager = get_detection_manager()
         request.app.state.detection_manager = manager
     return manager
+
+
+def start_model_reaper(app: FastAPI) -> None:
+    app.state.detection_manager.start_reaper()
+
+
+def stop_model_reaper(app: FastAPI) -> None:
+    app.state.detection_manager.stop_reaper()
+
+
+def start_job_runner(app: FastAPI) -> None:
+    runner = create_job_runner(app.state.detection_manager)
+    app.state.job_runner = runner
+    if runner is not None:
+        runner.start()
+
+
+def stop_job_runner(app: FastAPI) -> None:
+    runner = getattr(app.state, "job_runner", None)
+    if runner is not None:
+        runner.stop(timeout=30)
+        runner.store.close()
+
+
+def get_job_runner_dependency(request: Request) -> JobRunner:
+    runner = getattr(request.app.state, "job_runner", None)
+    if runner is None:
+        raise HTTPException(status_code=503, detail="Background jobs are disabled.")
+    return runner
@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import time
+
+from fastapi import FastAPI, Request
+
+from src.services.metrics import METRICS
+
+
+def register_metrics_middleware(app: FastAPI) -> None:
+    """Count requests and record latency per route template (not per raw path)."""
+
+    @app.middleware("http")
+    async def record_request_metrics(request: Request, call_next):
+        METRICS.inc("gdino_http_requests_in_flight")
+        start = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            METRICS.dec("gdino_http_requests_in_flight")
+            route = request.scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            METRICS.observe(
+                "gdino_http_request_duration_seconds",
+                time.perf_counter() - start,
+                route_path,
+                request.method,
+            )
+            METRICS.inc("gdino_http_requests_total", route_path, request.method, str(status))
@@ -2,17 +2,22 @@ from __future__ import annotations
 
 from typing import List, Optional
 
-from fastapi import APIRouter, Depends, File, Form, UploadFile
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Response, UploadFile
 
 from api.dependencies import get_detection_manager_dependency
 from api.schemas.detections import (
     AnnotatedImageResponse,
+    DedupSummary,
     DetectItem,
     ImageSearchResult,
+    RefilterRequest,
     SearchRequest,
     SearchResponse,
 )
+from groundingdino.util.time_counter import PROFILER
+from src.services.jobs import INTERACTIVE_GATE
 from src.services.manager import DetectionServiceManager
+from src.services.metrics import format_server_timing
 from src.utils.file_io import encode_file_to_base64
 
 
@@ -24,8 +29,21 @@ def health_check():
     return {"ok": True}
 
 
+@router.get("/readyz")
+def readiness_check(
+    response: Response,
+    detection_manager: DetectionServiceManager = Depends(get_detection_manager_dependency),
+):
+    models = detection_manager.readiness()
+    ready = all(models.values())
+    if not ready:
+        response.status_code = 503
+    return {"ready": ready, "models": models, "loaded": detection_manager.loaded_models()}
+
+
 @router.post("/detect", response_model=List[DetectItem])
-async def detect(
+def detect(
+    response: Response,
     file: UploadFile = File(...),
     text: str = Form(...),
     box_threshold: Optional[float] = Form(None),
@@ -33,40 +51,71 @@ async def detect(
     model: Optional[str] = Form(None),
     detection_manager: DetectionServiceManager = Depends(get_detection_manager_dependency),
 ) -> List[DetectItem]:
-    detection_service = detection_manager.resolve(model)
-    payload = await file.read()
-    result = detection_service.detect_from_bytes(
-        data=payload,
-        filename=file.filename,
-        caption=text,
-        box_threshold=box_threshold,
-        text_threshold=text_threshold,
-    )
+    # a sync handler runs in the threadpool, so a model load or a replica dispatch
+    # blocks only this request and not the event loop
+    payload = file.file.read()
+    with detection_manager.use(model) as detection_service:
+        with INTERACTIVE_GATE.interactive(), PROFILER.collect() as timings:
+            result = detection_service.detect_from_bytes(
+                data=payload,
+                filename=file.filename,
+                caption=text,
+                box_threshold=box_threshold,
+                text_threshold=text_threshold,
+            )
+    if timings:
+        response.headers["Server-Timing"] = format_server_timing(timings)
+    if result.result_id is not None:
+        response.headers["X-Result-Id"] = result.result_id
+    return [DetectItem.from_domain(item) for item in result.items]
+
+
+@router.post("/detect/refilter", response_model=List[DetectItem])
+def refilter(
+    request: RefilterRequest,
+    detection_manager: DetectionServiceManager = Depends(get_detection_manager_dependency),
+) -> List[DetectItem]:
+    """Re-apply new thresholds to a ``/detect`` result (``X-Result-Id`` header)."""
+    with detection_manager.use(request.model) as detection_service:
+        try:
+            result = detection_service.refilter(
+                result_id=request.result_id,
+                box_threshold=request.box_threshold,
+                text_threshold=request.text_threshold,
+            )
+        except KeyError as exc:
+            raise HTTPException(status_code=404, detail=str(exc.args[0])) from exc
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc)) from exc
     return [DetectItem.from_domain(item) for item in result.items]
 
 
 @router.post("/search", response_model=SearchResponse)
 def search(
     request: SearchRequest,
+    response: Response,
     detection_manager: DetectionServiceManager = Depends(get_detection_manager_dependency),
 ) -> SearchResponse:
-    detection_service = detection_manager.resolve(request.model)
-    results = detection_service.detect_in_directory(
-        caption=request.text,
-        directory=None,
-        patterns=request.patterns,
-        box_threshold=request.box_threshold,
-        text_threshold=request.text_threshold,
-        limit=request.limit,
-        only_with_detections=True,
-    )
+    with detection_manager.use(request.model) as detection_service, PROFILER.collect() as timings:
+        scan = detection_service.scan_directory(
+            caption=request.text,
+            directory=None,
+            patterns=request.patterns,
+            box_threshold=request.box_threshold,
+            text_threshold=request.text_threshold,
+            limit=request.limit,
+            only_with_detections=True,
+        )
+    if timings:
+        response.headers["Server-Timing"] = format_server_timing(timings)
 
     response_items = []
-    for payload in results:
+    for payload in scan.results:
         annotated = None
-        if payload.annotated_path and payload.annotated_path.exists():
+        annotated_path = payload.resolve_annotated_path()
+        if annotated_path and annotated_path.exists():
             try:
-                data, mime = encode_file_to_base64(payload.annotated_path)
+                data, mime = encode_file_to_base64(annotated_path)
                 annotated = AnnotatedImageResponse(data=data, mime_type=mime)
             except FileNotFoundError:
                 annotated = None
@@ -75,7 +124,10 @@ def search(
                 image=str(payload.source_path),
                 detections=[DetectItem.from_domain(item) for item in payload.items],
                 annotated_image=annotated,
+                duplicate_of=str(payload.duplicate_of) if payload.duplicate_of else None,
             )
         )
 
-    return SearchResponse(results=response_items)
+    dedup = scan.dedup.to_dict()
+    dedup.pop("groups")
+    return SearchResponse(results=response_items, dedup=DedupSummary(**dedup))
@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from api.dependencies import get_job_runner_dependency
+from api.schemas.jobs import JobRequest, JobResponse
+from src.services.jobs import JobRunner
+
+
+router = APIRouter()
+
+
+@router.post("/jobs", response_model=JobResponse, status_code=202)
+def submit_job(
+    request: JobRequest,
+    job_runner: JobRunner = Depends(get_job_runner_dependency),
+) -> JobResponse:
+    try:
+        job_id = job_runner.submit(request.to_spec())
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=str(exc.args[0])) from exc
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc)) from exc
+    return JobResponse.from_record(job_runner.store.get(job_id))
+
+
+@router.get("/jobs/{job_id}", response_model=JobResponse)
+def get_job(
+    job_id: str,
+    results_offset: int = Query(0, ge=0, description="Skip results already fetched."),
+    job_runner: JobRunner = Depends(get_job_runner_dependency),
+) -> JobResponse:
+    record = job_runner.store.get(job_id, results_offset=results_offset)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'.")
+    return JobResponse.from_record(record, results_offset=results_offset)
+
+
+@router.delete("/jobs/{job_id}", response_model=JobResponse)
+def cancel_job(
+    job_id: str,
+    job_runner: JobRunner = Depends(get_job_runner_dependency),
+) -> JobResponse:
+    if job_runner.cancel(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job '{job_id}'.")
+    return JobResponse.from_record(job_runner.store.get(job_id))
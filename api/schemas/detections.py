@@ -30,10 +30,21 @@ class ImageSearchResult(BaseModel):
     image: str
     detections: List[DetectItem]
     annotated_image: Optional[AnnotatedImageResponse] = None
+    duplicate_of: Optional[str] = None
+
+
+class DedupSummary(BaseModel):
+    mode: str
+    total: int
+    unique: int
+    exact_duplicates: int
+    near_duplicates: int
+    skipped_fraction: float
 
 
 class SearchResponse(BaseModel):
     results: List[ImageSearchResult]
+    dedup: Optional[DedupSummary] = None
 
 
 class SearchRequest(BaseModel):
@@ -43,3 +54,10 @@ class SearchRequest(BaseModel):
     limit: Optional[int] = None
     patterns: Optional[List[str]] = None
     model: Optional[str] = None
+
+
+class RefilterRequest(BaseModel):
+    result_id: str
+    box_threshold: Optional[float] = None
+    text_threshold: Optional[float] = None
+    model: Optional[str] = None
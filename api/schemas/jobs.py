@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+from typing import List, Optional
+
+from pydantic import BaseModel, model_validator
+
+from api.schemas.detections import DetectItem
+from src.services.jobs import JobRecord, JobSpec
+
+
+class JobRequest(BaseModel):
+    text: str
+    directory: Optional[str] = None
+    images: Optional[List[str]] = None
+    patterns: Optional[List[str]] = None
+    box_threshold: Optional[float] = None
+    text_threshold: Optional[float] = None
+    limit: Optional[int] = None
+    only_with_detections: bool = True
+    model: Optional[str] = None
+
+    @model_validator(mode="after")
+    def _directory_or_images(self) -> "JobRequest":
+        if self.directory is not None and self.images:
+            raise ValueError("Pass either 'directory' or 'images', not both.")
+        return self
+
+    def to_spec(self) -> JobSpec:
+        return JobSpec(
+            caption=self.text,
+            model=self.model,
+            directory=self.directory,
+            images=self.images,
+            patterns=self.patterns,
+            box_threshold=self.box_threshold,
+            text_threshold=self.text_threshold,
+            limit=self.limit,
+            only_with_detections=self.only_with_detections,
+        )
+
+
+class JobResultItem(BaseModel):
+    image: str
+    detections: List[DetectItem]
+    annotated_path: Optional[str] = None
+
+
+class JobResponse(BaseModel):
+    id: str
+    status: str
+    total: Optional[int] = None
+    processed: int
+    matched: int
+    error: Optional[str] = None
+    cancel_requested: bool
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    results_offset: int = 0
+    results: List[JobResultItem] = []
+
+    @classmethod
+    def from_record(cls, record: JobRecord, results_offset: int = 0) -> "JobResponse":
+        return cls(
+            id=record.id,
+            status=record.status,
+            total=record.total,
+            processed=record.processed,
+            matched=record.matched,
+            error=record.error,
+            cancel_requested=record.cancel_requested,
+            created_at=record.created_at,
+            started_at=record.started_at,
+            finished_at=record.finished_at,
+            results_offset=results_offset,
+            results=[
+                JobResultItem(
+                    image=result["image"],
+                    detections=[DetectItem(**item) for item in result["detections"]],
+                    annotated_path=result["annotated_path"],
+                )
+                for result in record.results
+            ],
+        )
@@ -0,0 +1,5 @@
+"""Reproducible latency/throughput benchmarks for GroundingDINO and the detection service.
+
+Run ``python -m benchmarks run --help``; results are JSON files that
+``python -m benchmarks compare`` diffs against a baseline.
+"""
@@ -0,0 +1,222 @@
+"""Command line entry point: ``python -m benchmarks run ...`` / ``python -m benchmarks compare ...``."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Iterable, List, Tuple
+
+import numpy as np
+import torch
+from PIL import Image
+
+from benchmarks.compare import compare_files
+from benchmarks.harness import BenchmarkResult, measure
+from benchmarks.suites import (
+    PER_IMAGE_SUITES,
+    SUITE_BUILDERS,
+    BenchmarkCase,
+    build_caption,
+    suite_names,
+    write_synthetic_image,
+)
+
+IMAGE_PATTERNS = ("*.jpg", "*.jpeg", "*.png", "*.bmp", "*.webp")
+
+
+def parse_size(raw: str) -> Tuple[int, int]:
+    """``800`` (square) or ``HxW``."""
+    parts = raw.lower().split("x")
+    if len(parts) == 1:
+        return int(parts[0]), int(parts[0])
+    if len(parts) == 2:
+        return int(parts[0]), int(parts[1])
+    raise argparse.ArgumentTypeError(f"Invalid image size '{raw}', expected N or HxW.")
+
+
+def parse_args(argv: Iterable[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="GroundingDINO latency/throughput benchmarks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run benchmark suites and write JSON results.")
+    run.add_argument(
+        "--suites",
+        nargs="+",
+        default=["predict", "backbone", "encoder", "decoder"],
+        choices=suite_names(),
+        help="Suites to run.",
+    )
+    run.add_argument(
+        "--config",
+        type=Path,
+        default=Path("groundingdino/config/GroundingDINO_SwinT_OGC.py"),
+        help="Model config file (GroundingDINO_Tiny_Test.py runs offline in seconds).",
+    )
+    run.add_argument(
+        "--weights",
+        type=Path,
+        default=None,
+        help="Checkpoint to load. Random init when omitted (latency is unaffected).",
+    )
+    run.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    run.add_argument(
+        "--sizes",
+        nargs="+",
+        type=parse_size,
+        default=[(800, 1200)],
+        help="Synthetic image sizes, N or HxW.",
+    )
+    run.add_argument(
+        "--images-dir",
+        type=Path,
+        default=None,
+        help="Use local images (first match per pattern) instead of synthetic ones.",
+    )
+    run.add_argument("--batch-sizes", nargs="+", type=int, default=[1])
+    run.add_argument(
+        "--caption-phrases",
+        nargs="+",
+        type=int,
+        default=[3],
+        help="Number of phrases in the benchmark caption.",
+    )
+    run.add_argument("--threads", nargs="+", type=int, default=[torch.get_num_threads()])
+    run.add_argument("--warmup", type=int, default=2)
+    run.add_argument("--iterations", type=int, default=10)
+    run.add_argument("--output", type=Path, default=None, help="JSON results file.")
+    run.add_argument("--baseline", type=Path, default=None, help="Compare against this run.")
+    run.add_argument("--metric", default="p50", choices=["p50", "p95", "p99", "mean"])
+    run.add_argument(
+        "--max-regression",
+        type=float,
+        default=0.1,
+        help="Allowed slowdown vs. the baseline (0.1 = 10%%) before failing.",
+    )
+
+    compare = commands.add_parser("compare", help="Diff two result files.")
+    compare.add_argument("current", type=Path)
+    compare.add_argument("baseline", type=Path)
+    compare.add_argument("--metric", default="p50", choices=["p50", "p95", "p99", "mean"])
+    compare.add_argument("--max-regression", type=float, default=0.1)
+    return parser.parse_args(argv)
+
+
+def build_benchmark_model(config_path: Path, weights_path: Path | None, device: str):
+    from groundingdino.util.inference import load_model
+
+    # latency does not depend on the weights, so any config runs without a checkpoint here
+    checkpoint = str(weights_path) if weights_path is not None else None
+    model = load_model(str(config_path), checkpoint, device=device, random_init=weights_path is None)
+    return model.to(device)
+
+
+def collect_images(args: argparse.Namespace, workdir: Path) -> List[Path]:
+    if args.images_dir is None:
+        return [write_synthetic_image(height, width, workdir) for height, width in args.sizes]
+    directory = args.images_dir.expanduser().resolve()
+    images = sorted({path for pattern in IMAGE_PATTERNS for path in directory.glob(pattern)})
+    if not images:
+        raise FileNotFoundError(f"No images found in {directory}")
+    return images
+
+
+def run_benchmarks(args: argparse.Namespace) -> List[BenchmarkResult]:
+    model = build_benchmark_model(args.config, args.weights, args.device)
+    workdir = Path(tempfile.mkdtemp(prefix="gdino-bench-"))
+    results: List[BenchmarkResult] = []
+    for threads in args.threads:
+        torch.set_num_threads(threads)
+        for image_path in collect_images(args, workdir):
+            image_source = np.asarray(Image.open(image_path).convert("RGB"))
+            for num_phrases in args.caption_phrases:
+                for batch_size in args.batch_sizes:
+                    case = BenchmarkCase(
+                        model=model,
+                        device=args.device,
+                        image_path=image_path,
+                        image_source=image_source,
+                        caption=build_caption(num_phrases),
+                        batch_size=batch_size,
+                    )
+                    for suite in args.suites:
+                        if suite in PER_IMAGE_SUITES and batch_size != 1:
+                            continue  # per-image paths have no batch dimension
+                        stats = measure(
+                            SUITE_BUILDERS[suite](case),
+                            device=args.device,
+                            warmup=args.warmup,
+                            iterations=args.iterations,
+                        )
+                        p50 = stats["latency_ms"]["p50"]
+                        result = BenchmarkResult(
+                            suite=suite,
+                            image_size=list(image_source.shape[:2]),
+                            batch_size=batch_size,
+                            caption_phrases=num_phrases,
+                            threads=threads,
+                            device=args.device,
+                            iterations=args.iterations,
+                            latency_ms=stats["latency_ms"],
+                            images_per_sec=batch_size * 1000.0 / p50 if p50 else 0.0,
+                            peak_rss_mb=stats["peak_rss_mb"],
+                            peak_cuda_mb=stats["peak_cuda_mb"],
+                            image=image_path.stem,
+                        )
+                        results.append(result)
+                        print(
+                            f"{result.key:<70} p50 {p50:9.2f}ms  p95 {stats['latency_ms']['p95']:9.2f}ms"
+                            f"  {result.images_per_sec:8.2f} img/s"
+                        )
+    return results
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "torch": torch.__version__,
+        "platform": platform.platform(),
+        "cuda": torch.cuda.get_device_name(0) if torch.cuda.is_available() else None,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def main(argv: Iterable[str] | None = None) -> int:
+    args = parse_args(argv)
+    if args.command == "compare":
+        regressions = compare_files(
+            args.current,
+            args.baseline,
+            metric=args.metric,
+            max_regression=args.max_regression,
+        )
+        return 1 if regressions else 0
+
+    results = run_benchmarks(args)
+    output = args.output or Path(f"benchmark-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "environment": environment(),
+        "arguments": {key: str(value) for key, value in vars(args).items()},
+        "results": [result.to_dict() for result in results],
+    }
+    output.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+    print(f"Wrote {len(results)} results to {output}")
+
+    if args.baseline is not None:
+        regressions = compare_files(
+            output,
+            args.baseline,
+            metric=args.metric,
+            max_regression=args.max_regression,
+        )
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""Diff benchmark results against a baseline and flag latency regressions."""
+
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List
+
+
+@dataclass
+class Comparison:
+    key: str
+    metric: str
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline if self.baseline else float("inf")
+
+    def regressed(self, max_regression: float) -> bool:
+        return self.ratio > 1.0 + max_regression
+
+
+def load_results(path: Path) -> Dict[str, dict]:
+    payload = json.loads(Path(path).read_text(encoding="utf-8"))
+    results: Dict[str, dict] = {}
+    for record in payload["results"]:
+        if record["key"] in results:
+            raise ValueError(f"Duplicate benchmark case '{record['key']}' in {path}")
+        results[record["key"]] = record
+    return results
+
+
+def compare_results(
+    current: Dict[str, dict],
+    baseline: Dict[str, dict],
+    metric: str = "p50",
+) -> List[Comparison]:
+    """Compare ``latency_ms[metric]`` of every case present in both runs."""
+    comparisons = []
+    for key, record in sorted(current.items()):
+        reference = baseline.get(key)
+        if reference is None:
+            continue
+        comparisons.append(
+            Comparison(
+                key=key,
+                metric=metric,
+                baseline=reference["latency_ms"][metric],
+                current=record["latency_ms"][metric],
+            )
+        )
+    return comparisons
+
+
+def report(comparisons: List[Comparison], max_regression: float) -> int:
+    """Print a table and return the number of regressions above ``max_regression``."""
+    regressions = 0
+    for item in comparisons:
+        flag = ""
+        if item.regressed(max_regression):
+            flag = "  REGRESSION"
+            regressions += 1
+        print(
+            f"{item.key:<70} {item.metric} {item.baseline:10.2f}ms -> {item.current:10.2f}ms "
+            f"({(item.ratio - 1.0) * 100:+6.1f}%){flag}"
+        )
+    return regressions
+
+
+def compare_files(
+    current_path: Path,
+    baseline_path: Path,
+    *,
+    metric: str = "p50",
+    max_regression: float = 0.1,
+) -> int:
+    comparisons = compare_results(
+        load_results(current_path),
+        load_results(baseline_path),
+        metric=metric,
+    )
+    if not comparisons:
+        print(f"No benchmark cases in common with {baseline_path}")
+    return report(comparisons, max_regression)
@@ -0,0 +1,102 @@
+"""Timing, percentile and memory helpers shared by the benchmark suites."""
+
+from __future__ import annotations
+
+import resource
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence
+
+import torch
+
+
+@dataclass
+class BenchmarkResult:
+    suite: str
+    image_size: Sequence[int]
+    batch_size: int
+    caption_phrases: int
+    threads: int
+    device: str
+    iterations: int
+    latency_ms: Dict[str, float]
+    images_per_sec: float
+    peak_rss_mb: float
+    peak_cuda_mb: Optional[float] = None
+    image: Optional[str] = None
+    extra: Dict[str, object] = field(default_factory=dict)
+
+    @property
+    def key(self) -> str:
+        height, width = self.image_size
+        key = (
+            f"{self.suite}|{height}x{width}|bs{self.batch_size}"
+            f"|phrases{self.caption_phrases}|threads{self.threads}|{self.device}"
+        )
+        # same-size images from --images-dir would otherwise share a key
+        return f"{key}|{self.image}" if self.image else key
+
+    def to_dict(self) -> dict:
+        record = asdict(self)
+        record["key"] = self.key
+        return record
+
+
+def percentile(samples: Sequence[float], q: float) -> float:
+    """Linear-interpolated percentile, ``q`` in [0, 100]."""
+    ordered = sorted(samples)
+    if not ordered:
+        return float("nan")
+    position = (len(ordered) - 1) * q / 100.0
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (monotonic across suites)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _synchronize(device: str) -> None:
+    if device.startswith("cuda") and torch.cuda.is_available():
+        torch.cuda.synchronize()
+
+
+def measure(
+    fn: Callable[[], object],
+    *,
+    device: str,
+    warmup: int,
+    iterations: int,
+) -> Dict[str, object]:
+    """Run ``fn`` ``warmup + iterations`` times and summarize the timed iterations."""
+    for _ in range(warmup):
+        fn()
+    _synchronize(device)
+    if device.startswith("cuda") and torch.cuda.is_available():
+        torch.cuda.reset_peak_memory_stats()
+
+    samples: List[float] = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        _synchronize(device)
+        samples.append(time.perf_counter() - start)
+
+    peak_cuda = None
+    if device.startswith("cuda") and torch.cuda.is_available():
+        peak_cuda = torch.cuda.max_memory_allocated() / (1024 * 1024)
+    return {
+        "samples": samples,
+        "latency_ms": {
+            "p50": percentile(samples, 50) * 1000,
+            "p95": percentile(samples, 95) * 1000,
+            "p99": percentile(samples, 99) * 1000,
+            "mean": sum(samples) / len(samples) * 1000,
+        },
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_cuda_mb": peak_cuda,
+    }
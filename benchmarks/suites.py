@@ -0,0 +1,266 @@
+"""Benchmark suites: end-to-end paths and isolated GroundingDINO modules.
+
+End-to-end suites (``predict``, ``service``, ``route``) start from an encoded image of
+the configured size and include the usual resize to an 800px short side. Module suites
+(``forward``, ``final_heads``, ``backbone``, ``encoder``, ``decoder``, ``msda``, ``bimha``)
+feed a normalized tensor of exactly the configured size, batched ``batch_size`` times.
+``forward`` runs the box and class heads on every decoder layer, ``final_heads`` on the
+last one only (the inference default of the service).
+"""
+
+from __future__ import annotations
+
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+import torch
+from PIL import Image
+
+import groundingdino.datasets.transforms as T
+from groundingdino.models.GroundingDINO.ms_deform_attn import multi_scale_deformable_attn_pytorch
+from groundingdino.util.inference import load_image, predict
+from groundingdino.util.misc import nested_tensor_from_tensor_list
+
+PER_IMAGE_SUITES = ("predict", "service", "route")
+MODULE_SUITES = ("forward", "final_heads", "backbone", "encoder", "decoder", "msda", "bimha")
+ALL_SUITES = PER_IMAGE_SUITES + MODULE_SUITES
+
+PHRASE_WORDS = (
+    "person", "car", "bottle", "chair", "dog", "cat", "bicycle", "traffic light", "backpack",
+    "umbrella", "handbag", "cup", "knife", "banana", "sandwich", "laptop", "keyboard",
+    "cell phone", "book", "clock", "scissors", "toothbrush", "snack", "drink", "bread",
+)
+
+
+def build_caption(num_phrases: int) -> str:
+    phrases = [PHRASE_WORDS[idx % len(PHRASE_WORDS)] for idx in range(num_phrases)]
+    return " . ".join(phrases) + " ."
+
+
+@dataclass
+class BenchmarkCase:
+    model: torch.nn.Module
+    device: str
+    image_path: Path
+    image_source: np.ndarray
+    caption: str
+    batch_size: int
+    box_threshold: float = 0.35
+    text_threshold: float = 0.25
+
+    def batch_tensor(self) -> torch.Tensor:
+        transform = T.Compose(
+            [
+                T.ToTensor(),
+                T.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
+            ]
+        )
+        image, _ = transform(Image.fromarray(self.image_source), None)
+        return image[None].expand(self.batch_size, -1, -1, -1).contiguous().to(self.device)
+
+
+def write_synthetic_image(height: int, width: int, directory: Path, seed: int = 0) -> Path:
+    """Random-noise JPEG; noise is the worst case for JPEG decode and keeps runs comparable."""
+    rng = np.random.default_rng(seed)
+    pixels = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+    path = directory / f"synthetic_{height}x{width}.jpg"
+    Image.fromarray(pixels).save(path, quality=90)
+    return path
+
+
+def capture_inputs(module: torch.nn.Module, run: Callable[[], object]) -> Tuple[tuple, dict]:
+    """Record the positional and keyword inputs of the first ``module`` call made by ``run``."""
+    captured: Dict[str, object] = {}
+
+    def hook(_module, args, kwargs):
+        captured.setdefault("args", args)
+        captured.setdefault("kwargs", kwargs)
+
+    handle = module.register_forward_pre_hook(hook, with_kwargs=True)
+    try:
+        with torch.no_grad():
+            run()
+    finally:
+        handle.remove()
+    if "args" not in captured:
+        raise RuntimeError(f"{type(module).__name__} was not called by the model forward.")
+    return captured["args"], captured["kwargs"]
+
+
+def _replay(module: torch.nn.Module, case: BenchmarkCase) -> Callable[[], object]:
+    batch = case.batch_tensor()
+    captions = [case.caption] * case.batch_size
+    args, kwargs = capture_inputs(module, lambda: case.model(batch, captions=captions))
+
+    def run():
+        with torch.no_grad():
+            return module(*args, **kwargs)
+
+    return run
+
+
+def build_predict(case: BenchmarkCase) -> Callable[[], object]:
+    def run():
+        _, image = load_image(str(case.image_path))
+        return predict(
+            model=case.model,
+            image=image,
+            caption=case.caption,
+            box_threshold=case.box_threshold,
+            text_threshold=case.text_threshold,
+            device=case.device,
+        )
+
+    return run
+
+
+def _build_service(case: BenchmarkCase, workdir: Path):
+    from src.adapters.grounding_dino import GroundingDinoModelAdapter
+    from src.services.detection_service import DetectionService
+
+    adapter = GroundingDinoModelAdapter(
+        config_path=Path(),
+        weights_path=Path(),
+        device=case.device,
+        model=case.model,
+    )
+    return DetectionService(
+        model_adapter=adapter,
+        model_name="grounding_dino",
+        images_dir=workdir / "images",
+        results_dir=workdir / "results",
+        search_dir=workdir,
+        default_box_threshold=case.box_threshold,
+        default_text_threshold=case.text_threshold,
+        annotate_results=False,
+    )
+
+
+def build_service(case: BenchmarkCase) -> Callable[[], object]:
+    service = _build_service(case, Path(tempfile.mkdtemp(prefix="gdino-bench-")))
+
+    def run():
+        return service.detect_from_path(image_path=case.image_path, caption=case.caption)
+
+    return run
+
+
+def build_route(case: BenchmarkCase) -> Callable[[], object]:
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from api.routers import detect
+    from src.services.manager import DetectionServiceManager
+
+    service = _build_service(case, Path(tempfile.mkdtemp(prefix="gdino-bench-")))
+    app = FastAPI()
+    app.state.detection_manager = DetectionServiceManager(
+        services={"grounding_dino": service},
+        default_model="grounding_dino",
+    )
+    app.include_router(detect.router)
+    client = TestClient(app)
+    payload = case.image_path.read_bytes()
+
+    def run():
+        response = client.post(
+            "/detect",
+            files={"file": (case.image_path.name, payload, "image/jpeg")},
+            data={"text": case.caption},
+        )
+        response.raise_for_status()
+        return response
+
+    return run
+
+
+def build_forward(case: BenchmarkCase, final_layer_heads: bool = False) -> Callable[[], object]:
+    batch = case.batch_tensor()
+    captions = [case.caption] * case.batch_size
+
+    def run():
+        with torch.no_grad():
+            return case.model(batch, captions=captions, final_layer_heads=final_layer_heads)
+
+    return run
+
+
+def build_final_heads(case: BenchmarkCase) -> Callable[[], object]:
+    return build_forward(case, final_layer_heads=True)
+
+
+def build_backbone(case: BenchmarkCase) -> Callable[[], object]:
+    samples = nested_tensor_from_tensor_list(case.batch_tensor())
+
+    def run():
+        with torch.no_grad():
+            return case.model.backbone(samples)
+
+    return run
+
+
+def build_encoder(case: BenchmarkCase) -> Callable[[], object]:
+    return _replay(case.model.transformer.encoder, case)
+
+
+def build_decoder(case: BenchmarkCase) -> Callable[[], object]:
+    return _replay(case.model.transformer.decoder, case)
+
+
+def build_bimha(case: BenchmarkCase) -> Callable[[], object]:
+    fusion_layers = case.model.transformer.encoder.fusion_layers
+    if not fusion_layers:
+        raise RuntimeError("The model has no text-image fusion layers.")
+    return _replay(fusion_layers[0].attn, case)
+
+
+def build_msda(case: BenchmarkCase) -> Callable[[], object]:
+    """Pure-PyTorch deformable attention core with the shapes of the first encoder layer."""
+    encoder = case.model.transformer.encoder
+    _, kwargs = capture_inputs(
+        encoder,
+        lambda: case.model(case.batch_tensor(), captions=[case.caption] * case.batch_size),
+    )
+    spatial_shapes = kwargs["spatial_shapes"]
+    attention = encoder.layers[0].self_attn
+    num_heads, num_levels, num_points = attention.num_heads, attention.num_levels, attention.num_points
+    head_dim = attention.embed_dim // num_heads
+    num_values = int((spatial_shapes[:, 0] * spatial_shapes[:, 1]).sum())
+    generator = torch.Generator().manual_seed(0)
+
+    def rand(*shape):
+        return torch.rand(*shape, generator=generator).to(case.device)
+
+    value = rand(case.batch_size, num_values, num_heads, head_dim)
+    sampling_locations = rand(case.batch_size, num_values, num_heads, num_levels, num_points, 2)
+    attention_weights = rand(case.batch_size, num_values, num_heads, num_levels, num_points)
+    attention_weights = attention_weights / attention_weights.sum(dim=(-2, -1), keepdim=True)
+
+    def run():
+        with torch.no_grad():
+            return multi_scale_deformable_attn_pytorch(
+                value, spatial_shapes, sampling_locations, attention_weights
+            )
+
+    return run
+
+
+SUITE_BUILDERS: Dict[str, Callable[[BenchmarkCase], Callable[[], object]]] = {
+    "predict": build_predict,
+    "service": build_service,
+    "route": build_route,
+    "forward": build_forward,
+    "final_heads": build_final_heads,
+    "backbone": build_backbone,
+    "encoder": build_encoder,
+    "decoder": build_decoder,
+    "msda": build_msda,
+    "bimha": build_bimha,
+}
+
+
+def suite_names() -> List[str]:
+    return list(ALL_SUITES)
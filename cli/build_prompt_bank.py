@@ -0,0 +1,62 @@
+"""Encode a fixed class list once and save it as a GroundingDINO prompt bank."""
+
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Iterable, List
+
+from config.runtime import get_settings
+from groundingdino.util.prompt_bank import PromptBank
+from src.adapters.grounding_dino import GroundingDinoModelAdapter
+
+
+def parse_args(argv: Iterable[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Build a prompt bank (pre-encoded class list) for GroundingDINO.",
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        "--classes",
+        nargs="+",
+        help='Class names (e.g. "chips" "snack" "bottle").',
+    )
+    source.add_argument(
+        "--classes-file",
+        type=Path,
+        help="Text file with one class name per line.",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        required=True,
+        help="Where to write the prompt bank (set GDINO_PROMPT_BANK to this path to serve it).",
+    )
+    return parser.parse_args(argv)
+
+
+def read_classes(args: argparse.Namespace) -> List[str]:
+    if args.classes:
+        return [name.strip() for name in args.classes if name.strip()]
+    lines = args.classes_file.expanduser().read_text(encoding="utf-8").splitlines()
+    return [line.strip() for line in lines if line.strip()]
+
+
+def main(argv: Iterable[str] | None = None) -> None:
+    args = parse_args(argv)
+    classes = read_classes(args)
+    settings = get_settings()
+    adapter = GroundingDinoModelAdapter(
+        config_path=settings.model_config_path,
+        weights_path=settings.weights_path,
+        device=settings.device,
+    )
+    bank = PromptBank.build(adapter.model, classes, device=adapter.resolve_device())
+    output = args.output.expanduser().resolve()
+    output.parent.mkdir(parents=True, exist_ok=True)
+    bank.save(output)
+    print(f"Saved {bank!r} to {output}")
+
+
+if __name__ == "__main__":
+    main()
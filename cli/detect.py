@@ -52,6 +52,7 @@ def main(argv: Iterable[str] | None = None) -> None:
             box_threshold=args.box_threshold,
             text_threshold=args.text_threshold,
         )
+        annotated_path = result.resolve_annotated_path()
         payload = {
             "image": str(image_path),
             "detections": [
@@ -62,7 +63,7 @@ def main(argv: Iterable[str] | None = None) -> None:
                 }
                 for det in result.items
             ],
-            "annotated": str(result.annotated_path) if result.annotated_path else None,
+            "annotated": str(annotated_path) if annotated_path else None,
         }
         print(json.dumps(payload, ensure_ascii=False))
 
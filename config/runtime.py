@@ -41,6 +41,18 @@ def _resolve_optional_path(env_var: str, default_relative: str) -> Optional[Path
     return None
 
 
+def _resolve_existing_file(env_var: str) -> Optional[Path]:
+    """Path from ``env_var`` or None when unset; a path that is set must exist, so a typo
+    fails at startup instead of silently turning the feature off."""
+    value = _resolve_optional_str(env_var)
+    if value is None:
+        return None
+    path = Path(value).expanduser().resolve()
+    if not path.is_file():
+        raise FileNotFoundError(f"{env_var} points to a missing file: {path}")
+    return path
+
+
 def _resolve_float(env_var: str, default: float) -> float:
     raw = os.getenv(env_var)
     if raw is None:
@@ -51,6 +63,16 @@ def _resolve_float(env_var: str, default: float) -> float:
         return default
 
 
+def _resolve_int(env_var: str, default: int) -> int:
+    raw = os.getenv(env_var)
+    if raw is None:
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        return default
+
+
 def _resolve_bool(env_var: str, default: bool) -> bool:
     raw = os.getenv(env_var)
     if raw is None:
@@ -98,13 +120,54 @@ class RuntimeSettings:
     images_dir: Path
     results_dir: Path
     annotate_results: bool
+    annotation_mode: str
+    annotation_workers: int
+    profile_stages: bool
+    profile_sync_cuda: bool
+    check_numerics: bool
+    warmup: bool
+    configure_threads: bool
+    worker_count: int
+    intra_op_threads: int
+    inter_op_threads: int
+    pin_cores: bool
+    worker_lock_dir: Path
     search_dir: Path
+    dedup_mode: str
+    near_dup_distance: int
+    result_cache_size: int
+    result_cache_dir: Optional[Path]
+    result_cache_disk_mb: int
+    raw_top_k: int
+    raw_token_floor: float
+    jobs_db_path: Path
+    job_workers: int
     default_detection_model: str
+    preload_default_model: bool
+    model_idle_timeout: float
+    model_memory_budget_mb: int
+    replicas: int
+    replica_devices: Optional[List[str]]
+    replica_cpus: str
+    replica_cooldown: float
+    omdet_enabled: bool
     omdet_model_id: Optional[str]
     omdet_weights_path: Optional[Path]
     omdet_device: str
     omdet_confidence_threshold: float
     omdet_class_names: Optional[List[str]]
+    prompt_bank_path: Optional[Path]
+    prefilter_mode: str
+    prefilter_threshold: float
+    prefilter_min_keep_fraction: float
+    prefilter_short_side: int
+    tile_size: int
+    tile_overlap: float
+    tile_batch_size: int
+    tile_merge: str
+    tile_iou_threshold: float
+    tile_full_image_pass: bool
+    final_layer_heads: bool
 
 
 def get_settings() -> RuntimeSettings:
@@ -125,8 +188,44 @@ def get_settings() -> RuntimeSettings:
         images_dir=_resolve_path("GDINO_IMAGES_DIR", "data/images"),
         results_dir=_resolve_path("GDINO_RESULTS_DIR", "data/results"),
         annotate_results=_resolve_bool("GDINO_ANNOTATE_RESULTS", True),
+        annotation_mode=os.getenv("GDINO_ANNOTATION_MODE", "sync").strip().lower(),
+        annotation_workers=_resolve_int("GDINO_ANNOTATION_WORKERS", 2),
+        profile_stages=_resolve_bool("GDINO_PROFILE", False),
+        profile_sync_cuda=_resolve_bool("GDINO_PROFILE_SYNC_CUDA", False),
+        check_numerics=_resolve_bool("GDINO_CHECK_NUMERICS", False),
+        warmup=_resolve_bool("GDINO_WARMUP", True),
+        configure_threads=_resolve_bool("GDINO_CONFIGURE_THREADS", True),
+        worker_count=_resolve_int("GDINO_WORKERS", _resolve_int("WEB_CONCURRENCY", 1)),
+        intra_op_threads=_resolve_int("GDINO_INTRA_OP_THREADS", 0),
+        inter_op_threads=_resolve_int("GDINO_INTER_OP_THREADS", 0),
+        pin_cores=_resolve_bool("GDINO_PIN_CORES", False),
+        worker_lock_dir=_resolve_path("GDINO_WORKER_LOCK_DIR", "data/locks"),
         search_dir=_resolve_path("GDINO_SEARCH_DIR", "data/gallery"),
+        dedup_mode=os.getenv("GDINO_DEDUP", "off").strip().lower(),
+        near_dup_distance=_resolve_int("GDINO_NEAR_DUP_DISTANCE", 4),
+        result_cache_size=_resolve_int("GDINO_RESULT_CACHE_SIZE", 256),
+        result_cache_dir=(
+            Path(os.environ["GDINO_RESULT_CACHE_DIR"]).expanduser().resolve()
+            if _resolve_optional_str("GDINO_RESULT_CACHE_DIR")
+            else None
+        ),
+        result_cache_disk_mb=_resolve_int("GDINO_RESULT_CACHE_DISK_MB", 1024),
+        raw_top_k=_resolve_int("GDINO_RAW_TOP_K", 100),
+        raw_token_floor=_resolve_float("GDINO_RAW_TOKEN_FLOOR", 0.05),
+        jobs_db_path=_resolve_path("GDINO_JOBS_DB", "data/jobs.sqlite3"),
+        job_workers=_resolve_int("GDINO_JOB_WORKERS", 0),
         default_detection_model=os.getenv("DETECTION_DEFAULT_MODEL", "grounding_dino"),
+        preload_default_model=_resolve_bool("GDINO_PRELOAD_DEFAULT_MODEL", True),
+        model_idle_timeout=_resolve_float("GDINO_MODEL_IDLE_TIMEOUT", 0.0),
+        model_memory_budget_mb=_resolve_int("GDINO_MODEL_MEMORY_BUDGET_MB", 0),
+        replicas=_resolve_int("GDINO_REPLICAS", 1),
+        replica_devices=[
+            device.strip() for device in os.getenv("GDINO_REPLICA_DEVICES", "").split(",") if device.strip()
+        ]
+        or None,
+        replica_cpus=os.getenv("GDINO_REPLICA_CPUS", "none").strip().lower(),
+        replica_cooldown=_resolve_float("GDINO_REPLICA_COOLDOWN", 30.0),
+        omdet_enabled=_resolve_bool("OMDET_ENABLED", True),
         omdet_model_id=_resolve_optional_str("OMDET_MODEL_ID") or "omlab/omdet-turbo-swin-tiny-hf",
         omdet_weights_path=_resolve_optional_path(
             "OMDET_WEIGHTS_PATH",
@@ -135,4 +234,16 @@ def get_settings() -> RuntimeSettings:
         omdet_device=_resolve_device(omdet_device_env),
         omdet_confidence_threshold=_resolve_float("OMDET_CONFIDENCE_THRESHOLD", 0.3),
         omdet_class_names=_resolve_class_names("OMDET_CLASS_NAMES"),
+        prompt_bank_path=_resolve_existing_file("GDINO_PROMPT_BANK"),
+        prefilter_mode=os.getenv("GDINO_PREFILTER", "none").strip().lower(),
+        prefilter_threshold=_resolve_float("GDINO_PREFILTER_THRESHOLD", 0.15),
+        prefilter_min_keep_fraction=_resolve_float("GDINO_PREFILTER_MIN_KEEP", 0.0),
+        prefilter_short_side=_resolve_int("GDINO_PREFILTER_SHORT_SIDE", 400),
+        tile_size=_resolve_int("GDINO_TILE_SIZE", 0),
+        tile_overlap=_resolve_float("GDINO_TILE_OVERLAP", 0.2),
+        tile_batch_size=_resolve_int("GDINO_TILE_BATCH_SIZE", 4),
+        tile_merge=os.getenv("GDINO_TILE_MERGE", "nms").strip().lower(),
+        tile_iou_threshold=_resolve_float("GDINO_TILE_IOU_THRESHOLD", 0.5),
+        tile_full_image_pass=_resolve_bool("GDINO_TILE_FULL_IMAGE_PASS", True),
+        final_layer_heads=_resolve_bool("GDINO_FINAL_LAYER_HEADS", True),
     )
@@ -0,0 +1,49 @@
+# Tiny, randomly initialized GroundingDINO for offline tests and benchmarks.
+# Same module structure as SwinT-OGC with a small Swin, one encoder layer, two decoder
+# layers and a stub text encoder (no network, no checkpoint). Outputs are meaningless.
+# hidden_dim stays 256: the text position embedding is hard-coded to 256 features.
+random_init = True
+seed = 0
+batch_size = 1
+modelname = "groundingdino"
+backbone = "swin_tiny_224_test"
+position_embedding = "sine"
+pe_temperatureH = 20
+pe_temperatureW = 20
+return_interm_indices = [1, 2, 3]
+backbone_freeze_keywords = None
+enc_layers = 1
+dec_layers = 2
+pre_norm = False
+dim_feedforward = 256
+hidden_dim = 256
+dropout = 0.0
+nheads = 8
+num_queries = 30
+query_dim = 4
+num_patterns = 0
+num_feature_levels = 4
+enc_n_points = 4
+dec_n_points = 4
+two_stage_type = "standard"
+two_stage_bbox_embed_share = False
+two_stage_class_embed_share = False
+transformer_activation = "relu"
+dec_pred_bbox_embed_share = True
+dn_box_noise_scale = 1.0
+dn_label_noise_ratio = 0.5
+dn_label_coef = 1.0
+dn_bbox_coef = 1.0
+embed_init_tgt = True
+dn_labelbook_size = 2000
+max_text_len = 256
+text_encoder_type = "tiny-test-bert"
+use_text_enhancer = True
+use_fusion_layer = True
+use_checkpoint = False
+use_transformer_ckpt = False
+use_text_cross_attention = True
+text_dropout = 0.0
+fusion_dropout = 0.0
+fusion_droppath = 0.1
+sub_sentence_present = True
@@ -27,7 +27,13 @@ from groundingdino.util.misc import all_gather
 
 
 class CocoGroundingEvaluator(object):
-    def __init__(self, coco_gt, iou_types, useCats=True):
+    """Accumulates predictions with ``update`` and evaluates them all at once in
+    ``synchronize_between_processes``: one ``loadRes`` and one per-image evaluation for the
+    whole run instead of one per batch. ``fast_matching`` replaces pycocotools' pure Python
+    detection to ground truth matching by ``evaluate_img_fast`` (same results).
+    """
+
+    def __init__(self, coco_gt, iou_types, useCats=True, fast_matching=True):
         assert isinstance(iou_types, (list, tuple))
         coco_gt = copy.deepcopy(coco_gt)
         self.coco_gt = coco_gt
@@ -41,29 +47,48 @@ class CocoGroundingEvaluator(object):
         self.img_ids = []
         self.eval_imgs = {k: [] for k in iou_types}
         self.useCats = useCats
+        self.fast_matching = fast_matching
+        self._pending = {k: [] for k in iou_types}
 
     def update(self, predictions):
         img_ids = list(np.unique(list(predictions.keys())))
         self.img_ids.extend(img_ids)
 
         for iou_type in self.iou_types:
-            results = self.prepare(predictions, iou_type)
+            if iou_type == "bbox":
+                self._pending[iou_type].append(self.prepare_for_coco_detection_array(predictions))
+            else:
+                self._pending[iou_type].extend(self.prepare(predictions, iou_type))
+
+    def _evaluate_all(self):
+        """Evaluate every image passed to ``update``; runs once, from ``synchronize_between_processes``."""
+        if not any(self._pending.values()):
+            return
+        img_ids = list(np.unique(self.img_ids))
+        for iou_type in self.iou_types:
+            results = self._pending[iou_type]
+            if iou_type == "bbox":
+                results = np.concatenate(results) if results else np.zeros((0, 7))
+            self._pending[iou_type] = []
 
             # suppress pycocotools prints
             with open(os.devnull, "w") as devnull:
                 with contextlib.redirect_stdout(devnull):
-                    coco_dt = COCO.loadRes(self.coco_gt, results) if results else COCO()
+                    coco_dt = COCO.loadRes(self.coco_gt, results) if len(results) else COCO()
 
             coco_eval = self.coco_eval[iou_type]
 
             coco_eval.cocoDt = coco_dt
-            coco_eval.params.imgIds = list(img_ids)
+            coco_eval.params.imgIds = img_ids
             coco_eval.params.useCats = self.useCats
-            img_ids, eval_imgs = evaluate(coco_eval)
+            _, eval_imgs = evaluate(coco_eval, fast_matching=self.fast_matching)
 
             self.eval_imgs[iou_type].append(eval_imgs)
+        # eval_imgs columns follow the sorted, de-duplicated ids
+        self.img_ids = img_ids
 
     def synchronize_between_processes(self):
+        self._evaluate_all()
         for iou_type in self.iou_types:
             self.eval_imgs[iou_type] = np.concatenate(self.eval_imgs[iou_type], 2)
             create_common_coco_eval(self.coco_eval[iou_type], self.img_ids, self.eval_imgs[iou_type])
@@ -111,6 +136,33 @@ class CocoGroundingEvaluator(object):
             )
         return coco_results
 
+    def prepare_for_coco_detection_array(self, predictions):
+        """``prepare_for_coco_detection`` as an ``[N, 7]`` array of
+        ``(image_id, x, y, w, h, score, category_id)`` rows, the compact form ``COCO.loadRes``
+        accepts; built with tensor ops instead of one dict per box.
+        """
+        rows = []
+        for original_id, prediction in predictions.items():
+            if len(prediction) == 0 or len(prediction["scores"]) == 0:
+                continue
+            boxes = convert_to_xywh(prediction["boxes"].detach().float().cpu())
+            scores = prediction["scores"].detach().float().cpu()
+            labels = prediction["labels"].detach().cpu()
+            rows.append(
+                torch.cat(
+                    [
+                        torch.full((len(boxes), 1), float(original_id), dtype=torch.float64),
+                        boxes.double(),
+                        scores.double()[:, None],
+                        labels.double()[:, None],
+                    ],
+                    dim=1,
+                )
+            )
+        if not rows:
+            return np.zeros((0, 7))
+        return torch.cat(rows).numpy()
+
     def prepare_for_coco_segmentation(self, predictions):
         coco_results = []
         for original_id, prediction in predictions.items():
@@ -216,7 +268,7 @@ def create_common_coco_eval(coco_eval, img_ids, eval_imgs):
 #################################################################
 
 
-def evaluate(self):
+def evaluate(self, fast_matching=False):
     """
     Run per image evaluation on given images and store results (a list of dict) in self.evalImgs
     :return: None
@@ -248,16 +300,22 @@ def evaluate(self):
         for imgId in p.imgIds 
         for catId in catIds}
 
-    evaluateImg = self.evaluateImg
     maxDet = p.maxDets[-1]
-    evalImgs = [
-        evaluateImg(imgId, catId, areaRng, maxDet) 
-        for catId in catIds 
-        for areaRng in p.areaRng 
-        for imgId in p.imgIds
-    ]
-    # this is NOT in the pycocotools code, but could be done outside
-    evalImgs = np.asarray(evalImgs).reshape(len(catIds), len(p.areaRng), len(p.imgIds))
+    if fast_matching:
+        evalImgs = np.empty((len(catIds), len(p.areaRng), len(p.imgIds)), dtype=object)
+        for c, catId in enumerate(catIds):
+            for i, imgId in enumerate(p.imgIds):
+                evalImgs[c, :, i] = evaluate_img_fast(self, imgId, catId, p.areaRng, maxDet)
+    else:
+        evaluateImg = self.evaluateImg
+        evalImgs = [
+            evaluateImg(imgId, catId, areaRng, maxDet) 
+            for catId in catIds 
+            for areaRng in p.areaRng 
+            for imgId in p.imgIds
+        ]
+        # this is NOT in the pycocotools code, but could be done outside
+        evalImgs = np.asarray(evalImgs).reshape(len(catIds), len(p.areaRng), len(p.imgIds))
     self._paramsEval = copy.deepcopy(self.params)
     # toc = time.time()
     # print('DONE (t={:0.2f}s).'.format(toc-tic))
@@ -267,3 +325,90 @@ def evaluate(self):
 #################################################################
 # end of straight copy from pycocotools, just removing the prints
 #################################################################
+
+
+
+def evaluate_img_fast(self, imgId, catId, areaRngs, maxDet):
+    """``COCOeval.evaluateImg`` for every area range of one image and category at once.
+
+    The greedy matching is vectorized over area ranges, IoU thresholds and ground truths;
+    only the loop over detections (in decreasing score order, at most ``maxDet``) stays in
+    Python, and it skips detections that overlap no ground truth enough and stops once every
+    ground truth is taken. Per threshold, a detection takes the unmatched (or crowd) ground
+    truth with the highest IoU, later ones winning ties as in the sequential scan, and only
+    falls back to ignored ground truths when no regular one qualifies. Returns the
+    ``evaluateImg`` records, one per area range (``None`` without ground truth and
+    detections).
+    """
+    p = self.params
+    if p.useCats:
+        gt = self._gts[imgId, catId]
+        dt = self._dts[imgId, catId]
+    else:
+        gt = [_ for cId in p.catIds for _ in self._gts[imgId, cId]]
+        dt = [_ for cId in p.catIds for _ in self._dts[imgId, cId]]
+    if len(gt) == 0 and len(dt) == 0:
+        return [None] * len(areaRngs)
+
+    A = len(areaRngs)
+    T = len(p.iouThrs)
+    G = len(gt)
+    ranges = np.asarray(areaRngs, dtype=np.float64)  # A, 2
+    gt_area = np.array([g["area"] for g in gt], dtype=np.float64)
+    gt_ids = np.array([g["id"] for g in gt], dtype=np.float64)
+    iscrowd = np.array([int(g["iscrowd"]) for g in gt], dtype=bool)
+    gt_ignore = np.array([int(g["ignore"]) for g in gt], dtype=bool)[None, :] | (
+        (gt_area[None, :] < ranges[:, :1]) | (gt_area[None, :] > ranges[:, 1:])
+    )  # A, G
+    dtind = np.argsort([-d["score"] for d in dt], kind="mergesort")
+    dt = [dt[i] for i in dtind[0:maxDet]]
+    D = len(dt)
+    dt_ids = np.array([d["id"] for d in dt], dtype=np.float64)
+    dt_area = np.array([d["area"] for d in dt], dtype=np.float64)
+    # rows follow the sorted detections (computeIoU sorts them the same way)
+    ious = self.ious[imgId, catId]
+
+    # matching state for all (area range, threshold) pairs, ground truths in input order
+    gtm = np.zeros((A, T, G))
+    dtm = np.zeros((A, T, D))
+    dtIg = np.zeros((A, T, D), dtype=bool)
+    if len(ious) > 0:
+        thresholds = np.minimum(p.iouThrs, 1 - 1e-10)[None, :, None]  # 1, T, 1
+        regular = ~gt_ignore[:, None, :]  # A, 1, G
+        for dind in np.flatnonzero(ious.max(axis=1) >= thresholds.min()):
+            candidates = ((gtm == 0) | iscrowd) & (ious[dind] >= thresholds)  # A, T, G
+            on_regular = candidates & regular
+            candidates = np.where(on_regular.any(axis=2, keepdims=True), on_regular, candidates)
+            aind, tind = np.nonzero(candidates.any(axis=2))
+            if len(aind) == 0:
+                if not iscrowd.any() and gtm.all():
+                    break
+                continue
+            best = np.where(candidates[aind, tind], ious[dind], -1.0)
+            m = G - 1 - np.argmax(best[:, ::-1], axis=1)
+            dtIg[aind, tind, dind] = gt_ignore[aind, m]
+            dtm[aind, tind, dind] = gt_ids[m]
+            gtm[aind, tind, m] = dt_ids[dind]
+
+    records = []
+    for a, aRng in enumerate(areaRngs):
+        # sort gt ignore last
+        gtind = np.argsort(gt_ignore[a], kind="mergesort")
+        # set unmatched detections outside of area range to ignore
+        outside = (dt_area < aRng[0]) | (dt_area > aRng[1])
+        records.append(
+            {
+                "image_id": imgId,
+                "category_id": catId,
+                "aRng": aRng,
+                "maxDet": maxDet,
+                "dtIds": [d["id"] for d in dt],
+                "gtIds": [gt[i]["id"] for i in gtind],
+                "dtMatches": dtm[a],
+                "gtMatches": gtm[a][:, gtind],
+                "dtScores": [d["score"] for d in dt],
+                "gtIgnore": gt_ignore[a][gtind].astype(np.int64),
+                "dtIgnore": dtIg[a] | ((dtm[a] == 0) & outside[None, :]),
+            }
+        )
+    return records
@@ -194,6 +194,7 @@ def build_backbone(args):
         "swin_B_384_22k",
         "swin_L_224_22k",
         "swin_L_384_22k",
+        "swin_tiny_224_test",
     ]:
         pretrain_img_size = int(args.backbone.split("_")[-2])
         backbone = build_swin_transformer(
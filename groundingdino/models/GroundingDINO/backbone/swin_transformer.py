@@ -766,6 +766,7 @@ def build_swin_transformer(modelname, pretrain_img_size, **kw):
         "swin_B_384_22k",
         "swin_L_224_22k",
         "swin_L_384_22k",
+        "swin_tiny_224_test",
     ]
 
     model_para_dict = {
@@ -784,6 +785,10 @@ def build_swin_transformer(modelname, pretrain_img_size, **kw):
         "swin_L_384_22k": dict(
             embed_dim=192, depths=[2, 2, 18, 2], num_heads=[6, 12, 24, 48], window_size=12
         ),
+        # random-init only, see GroundingDINO_Tiny_Test.py
+        "swin_tiny_224_test": dict(
+            embed_dim=32, depths=[1, 1, 1, 1], num_heads=[1, 2, 4, 8], window_size=7
+        ),
     }
     kw_cgf = model_para_dict[modelname]
     kw_cgf.update(kw)
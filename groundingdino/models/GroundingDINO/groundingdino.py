@@ -33,6 +33,7 @@ from groundingdino.util.misc import (
     is_dist_avail_and_initialized,
     nested_tensor_from_tensor_list,
 )
+from groundingdino.util.time_counter import profile_stage
 from groundingdino.util.utils import get_phrases_from_posmap
 from groundingdino.util.visualizer import COCOVisualizer
 from groundingdino.util.vl_utils import create_positive_map_from_span
@@ -198,6 +199,9 @@ class GroundingDINO(nn.Module):
 
             self.refpoint_embed = None
 
+        # inference: box and class heads on the last decoder layer only (see forward)
+        self.final_layer_heads = False
+
         self._reset_parameters()
 
     def _reset_parameters(self):
@@ -224,37 +228,21 @@ class GroundingDINO(nn.Module):
     def init_ref_points(self, use_num_queries):
         self.refpoint_embed = nn.Embedding(use_num_queries, self.query_dim)
 
-    def forward(self, samples: NestedTensor, targets: List = None, **kw):
-        """The forward expects a NestedTensor, which consists of:
-           - samples.tensor: batched images, of shape [batch_size x 3 x H x W]
-           - samples.mask: a binary mask of shape [batch_size x H x W], containing 1 on padded pixels
+    def encode_text(self, captions: List[str], device=None):
+        """Tokenize ``captions`` and run them through BERT and ``feat_map``.
 
-        It returns a dict with the following elements:
-           - "pred_logits": the classification logits (including no-object) for all queries.
-                            Shape= [batch_size x num_queries x num_classes]
-           - "pred_boxes": The normalized boxes coordinates for all queries, represented as
-                           (center_x, center_y, width, height). These values are normalized in [0, 1],
-                           relative to the size of each individual image (disregarding possible padding).
-                           See PostProcess for information on how to retrieve the unnormalized bounding box.
-           - "aux_outputs": Optional, only returned when auxilary losses are activated. It is a list of
-                            dictionnaries containing the two above keys for each decoder layer.
+        Returns the ``text_dict`` consumed by the transformer. Captions longer than
+        ``max_text_len`` tokens are truncated.
         """
-        if targets is None:
-            captions = kw["captions"]
-        else:
-            captions = [t["caption"] for t in targets]
-
-        # encoder texts
-        tokenized = self.tokenizer(captions, padding="longest", return_tensors="pt").to(
-            samples.device
-        )
-        (
-            text_self_attention_masks,
-            position_ids,
-            cate_to_token_mask_list,
-        ) = generate_masks_with_special_tokens_and_transfer_map(
-            tokenized, self.specical_tokens, self.tokenizer
-        )
+        with profile_stage("tokenize"):
+            tokenized = self.tokenizer(captions, padding="longest", return_tensors="pt").to(device)
+            (
+                text_self_attention_masks,
+                position_ids,
+                cate_to_token_mask_list,
+            ) = generate_masks_with_special_tokens_and_transfer_map(
+                tokenized, self.specical_tokens, self.tokenizer
+            )
 
         if text_self_attention_masks.shape[1] > self.max_text_len:
             text_self_attention_masks = text_self_attention_masks[
@@ -274,9 +262,10 @@ class GroundingDINO(nn.Module):
             # import ipdb; ipdb.set_trace()
             tokenized_for_encoder = tokenized
 
-        bert_output = self.bert(**tokenized_for_encoder)  # bs, 195, 768
+        with profile_stage("bert"):
+            bert_output = self.bert(**tokenized_for_encoder)  # bs, 195, 768
 
-        encoded_text = self.feat_map(bert_output["last_hidden_state"])  # bs, 195, d_model
+            encoded_text = self.feat_map(bert_output["last_hidden_state"])  # bs, 195, d_model
         text_token_mask = tokenized.attention_mask.bool()  # bs, 195
         # text_token_mask: True for nomask, False for mask
         # text_self_attention_masks: True for nomask, False for mask
@@ -296,14 +285,22 @@ class GroundingDINO(nn.Module):
             "text_self_attention_masks": text_self_attention_masks,  # bs, 195,195
         }
 
-        # import ipdb; ipdb.set_trace()
+        return text_dict
+
+    def _prepare_image_inputs(self, samples):
+        """Project the backbone features (computed now unless set beforehand) for the transformer.
+
+        Returns the multi-level srcs, masks and position embeddings.
+        """
         if isinstance(samples, (list, torch.Tensor)):
             samples = nested_tensor_from_tensor_list(samples)
         if not hasattr(self, 'features') or not hasattr(self, 'poss'):
-            self.set_image_tensor(samples)
+            with profile_stage("backbone"):
+                self.set_image_tensor(samples)
 
         srcs = []
         masks = []
+        poss = list(self.poss)
         for l, feat in enumerate(self.features):
             src, mask = feat.decompose()
             srcs.append(self.input_proj[l](src))
@@ -321,13 +318,100 @@ class GroundingDINO(nn.Module):
                 pos_l = self.backbone[1](NestedTensor(src, mask)).to(src.dtype)
                 srcs.append(src)
                 masks.append(mask)
-                self.poss.append(pos_l)
+                poss.append(pos_l)
+        return srcs, masks, poss
 
+    def forward_encoder_logits(self, samples: NestedTensor, **kw):
+        """Cheap pass that stops after the encoder: backbone, feature enhancer and the
+        two-stage proposal head (``enc_out_class_embed``), skipping the decoder.
+
+        Accepts ``captions`` or ``text_dict`` like ``forward`` and returns the proposal
+        logits with shape [batch_size x sum(hw) x max_text_len]; padded tokens are -inf.
+        With ``compact_logits=True`` the last dimension only covers the text tokens.
+        """
+        text_dict = kw.get("text_dict")
+        if text_dict is None:
+            text_dict = self.encode_text(kw["captions"], device=samples.device)
+        else:
+            text_dict = dict(text_dict)
+
+        srcs, masks, poss = self._prepare_image_inputs(samples)
+        encoded = self.transformer.encode(srcs, masks, poss, text_dict)
+        _, _, enc_outputs_class = self.transformer.encoder_proposals(
+            encoded["memory"],
+            encoded["mask_flatten"],
+            encoded["spatial_shapes"],
+            text_dict,
+            compact=kw.get("compact_logits", False),
+        )
+        if kw.get('unset_image_tensor', True):
+            self.unset_image_tensor()
+        return enc_outputs_class
+
+    def forward(self, samples: NestedTensor, targets: List = None, **kw):
+        """The forward expects a NestedTensor, which consists of:
+           - samples.tensor: batched images, of shape [batch_size x 3 x H x W]
+           - samples.mask: a binary mask of shape [batch_size x H x W], containing 1 on padded pixels
+
+        It returns a dict with the following elements:
+           - "pred_logits": the classification logits (including no-object) for all queries.
+                            Shape= [batch_size x num_queries x num_classes]
+           - "pred_boxes": The normalized boxes coordinates for all queries, represented as
+                           (center_x, center_y, width, height). These values are normalized in [0, 1],
+                           relative to the size of each individual image (disregarding possible padding).
+                           See PostProcess for information on how to retrieve the unnormalized bounding box.
+           - "aux_outputs": Optional, only returned when auxilary losses are activated. It is a list of
+                            dictionnaries containing the two above keys for each decoder layer.
+
+        With ``compact_logits=True`` (inference) only the last decoder layer's class logits are
+        computed, and "pred_logits" covers the batch's text tokens ([batch_size x num_queries x
+        num_tokens]) instead of being padded with -inf to max_text_len.
+
+        With ``final_layer_heads=True`` (default: the ``final_layer_heads`` attribute) the
+        decoder still refines the reference boxes layer by layer, but only the last layer's
+        output is normed and fed to the box and class heads. The outputs are the same; only
+        the intermediate predictions, which inference discards, are not computed.
+        """
+        text_dict = kw.get("text_dict")
+        if text_dict is None:
+            if targets is None:
+                captions = kw["captions"]
+            else:
+                captions = [t["caption"] for t in targets]
+
+            # encoder texts
+            text_dict = self.encode_text(captions, device=samples.device)
+        else:
+            # the transformer overwrites "encoded_text" in place; keep the caller's dict intact
+            text_dict = dict(text_dict)
+
+        # import ipdb; ipdb.set_trace()
+        srcs, masks, poss = self._prepare_image_inputs(samples)
+
+        final_layer_heads = kw.get("final_layer_heads", self.final_layer_heads)
         input_query_bbox = input_query_label = attn_mask = dn_meta = None
         hs, reference, hs_enc, ref_enc, init_box_proposal = self.transformer(
-            srcs, masks, input_query_bbox, self.poss, input_query_label, attn_mask, text_dict
+            srcs,
+            masks,
+            input_query_bbox,
+            poss,
+            input_query_label,
+            attn_mask,
+            text_dict,
+            final_layer_only=final_layer_heads,
         )
 
+        if final_layer_heads:
+            # hs and reference hold the last layer's output and input reference points
+            outputs_coord = (self.bbox_embed[-1](hs[-1]) + inverse_sigmoid(reference[-1])).sigmoid()
+            outputs_class = self.class_embed[-1](
+                hs[-1], text_dict, compact=kw.get("compact_logits", False)
+            )
+            out = {"pred_logits": outputs_class, "pred_boxes": outputs_coord}
+            if kw.get("unset_image_tensor", True):
+                self.unset_image_tensor()
+            return out
+
         # deformable-detr-like anchor update
         outputs_coord_list = []
         for dec_lid, (layer_ref_sig, layer_bbox_embed, layer_hs) in enumerate(
@@ -340,12 +424,15 @@ class GroundingDINO(nn.Module):
         outputs_coord_list = torch.stack(outputs_coord_list)
 
         # output
-        outputs_class = torch.stack(
-            [
-                layer_cls_embed(layer_hs, text_dict)
-                for layer_cls_embed, layer_hs in zip(self.class_embed, hs)
-            ]
-        )
+        if kw.get("compact_logits", False):
+            outputs_class = self.class_embed[-1](hs[-1], text_dict, compact=True)[None]
+        else:
+            outputs_class = torch.stack(
+                [
+                    layer_cls_embed(layer_hs, text_dict)
+                    for layer_cls_embed, layer_hs in zip(self.class_embed, hs)
+                ]
+            )
         out = {"pred_logits": outputs_class[-1], "pred_boxes": outputs_coord_list[-1]}
 
         # # for intermediate outputs
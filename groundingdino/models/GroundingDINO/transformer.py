@@ -23,6 +23,8 @@ import torch.utils.checkpoint as checkpoint
 from torch import Tensor, nn
 
 from groundingdino.util.misc import inverse_sigmoid
+from groundingdino.util.numerics import check_numerics
+from groundingdino.util.time_counter import profile_stage
 
 from .fuse_modules import BiAttentionBlock
 from .ms_deform_attn import MultiScaleDeformableAttention as MSDeformAttn
@@ -208,15 +210,19 @@ class Transformer(nn.Module):
     def init_ref_points(self, use_num_queries):
         self.refpoint_embed = nn.Embedding(use_num_queries, 4)
 
-    def forward(self, srcs, masks, refpoint_embed, pos_embeds, tgt, attn_mask=None, text_dict=None):
+    def encode(self, srcs, masks, pos_embeds, text_dict):
         """
+        Run the feature enhancer (encoder). text_dict["encoded_text"] is replaced by the
+        enhanced text features.
         Input:
             - srcs: List of multi features [bs, ci, hi, wi]
             - masks: List of multi masks [bs, hi, wi]
-            - refpoint_embed: [bs, num_dn, 4]. None in infer
             - pos_embeds: List of multi pos embeds [bs, ci, hi, wi]
-            - tgt: [bs, num_dn, d_model]. None in infer
-
+        Output: dict with
+            - memory: bs, \sum{hw}, c
+            - mask_flatten: bs, \sum{hw}
+            - lvl_pos_embed_flatten: bs, \sum{hw}, c
+            - spatial_shapes, level_start_index, valid_ratios
         """
         # prepare input for encoder
         src_flatten = []
@@ -255,19 +261,20 @@ class Transformer(nn.Module):
         #########################################################
         # Begin Encoder
         #########################################################
-        memory, memory_text = self.encoder(
-            src_flatten,
-            pos=lvl_pos_embed_flatten,
-            level_start_index=level_start_index,
-            spatial_shapes=spatial_shapes,
-            valid_ratios=valid_ratios,
-            key_padding_mask=mask_flatten,
-            memory_text=text_dict["encoded_text"],
-            text_attention_mask=~text_dict["text_token_mask"],
-            # we ~ the mask . False means use the token; True means pad the token
-            position_ids=text_dict["position_ids"],
-            text_self_attention_masks=text_dict["text_self_attention_masks"],
-        )
+        with profile_stage("encoder"):
+            memory, memory_text = self.encoder(
+                src_flatten,
+                pos=lvl_pos_embed_flatten,
+                level_start_index=level_start_index,
+                spatial_shapes=spatial_shapes,
+                valid_ratios=valid_ratios,
+                key_padding_mask=mask_flatten,
+                memory_text=text_dict["encoded_text"],
+                text_attention_mask=~text_dict["text_token_mask"],
+                # we ~ the mask . False means use the token; True means pad the token
+                position_ids=text_dict["position_ids"],
+                text_self_attention_masks=text_dict["text_self_attention_masks"],
+            )
         #########################################################
         # End Encoder
         # - memory: bs, \sum{hw}, c
@@ -281,16 +288,72 @@ class Transformer(nn.Module):
         #     if memory.isnan().any() | memory.isinf().any():
         #         import ipdb; ipdb.set_trace()
 
-        if self.two_stage_type == "standard":
-            output_memory, output_proposals = gen_encoder_output_proposals(
-                memory, mask_flatten, spatial_shapes
+        return {
+            "memory": memory,
+            "mask_flatten": mask_flatten,
+            "lvl_pos_embed_flatten": lvl_pos_embed_flatten,
+            "spatial_shapes": spatial_shapes,
+            "level_start_index": level_start_index,
+            "valid_ratios": valid_ratios,
+        }
+
+    def encoder_proposals(self, memory, mask_flatten, spatial_shapes, text_dict=None, compact=False):
+        """
+        Score every encoder token as a two-stage proposal.
+        Output:
+            - output_memory: bs, \sum{hw}, d_model
+            - output_proposals: bs, \sum{hw}, 4 (unsigmoid)
+            - enc_outputs_class: bs, \sum{hw}, max_text_len (n_text with ``compact``)
+        """
+        assert self.two_stage_type == "standard", "encoder proposals need two_stage_type standard"
+        output_memory, output_proposals = gen_encoder_output_proposals(
+            memory, mask_flatten, spatial_shapes
+        )
+        output_memory = self.enc_output_norm(self.enc_output(output_memory))
+
+        if text_dict is not None:
+            enc_outputs_class_unselected = self.enc_out_class_embed(
+                output_memory, text_dict, compact=compact
             )
-            output_memory = self.enc_output_norm(self.enc_output(output_memory))
+        else:
+            enc_outputs_class_unselected = self.enc_out_class_embed(output_memory)
+        return output_memory, output_proposals, enc_outputs_class_unselected
 
-            if text_dict is not None:
-                enc_outputs_class_unselected = self.enc_out_class_embed(output_memory, text_dict)
-            else:
-                enc_outputs_class_unselected = self.enc_out_class_embed(output_memory)
+    def forward(
+        self,
+        srcs,
+        masks,
+        refpoint_embed,
+        pos_embeds,
+        tgt,
+        attn_mask=None,
+        text_dict=None,
+        final_layer_only=False,
+    ):
+        """
+        Input:
+            - srcs: List of multi features [bs, ci, hi, wi]
+            - masks: List of multi masks [bs, hi, wi]
+            - refpoint_embed: [bs, num_dn, 4]. None in infer
+            - pos_embeds: List of multi pos embeds [bs, ci, hi, wi]
+            - tgt: [bs, num_dn, d_model]. None in infer
+            - final_layer_only: decoder outputs of the last layer only (see TransformerDecoder)
+
+        """
+        encoded = self.encode(srcs, masks, pos_embeds, text_dict)
+        memory = encoded["memory"]
+        mask_flatten = encoded["mask_flatten"]
+        lvl_pos_embed_flatten = encoded["lvl_pos_embed_flatten"]
+        spatial_shapes = encoded["spatial_shapes"]
+        level_start_index = encoded["level_start_index"]
+        valid_ratios = encoded["valid_ratios"]
+        bs = memory.shape[0]
+
+        if self.two_stage_type == "standard":
+            # only the best token score per proposal is used, so skip the -inf padding
+            output_memory, output_proposals, enc_outputs_class_unselected = self.encoder_proposals(
+                memory, mask_flatten, spatial_shapes, text_dict, compact=text_dict is not None
+            )
 
             topk_logits = enc_outputs_class_unselected.max(-1)[0]
             enc_outputs_coord_unselected = (
@@ -361,20 +424,22 @@ class Transformer(nn.Module):
         #########################################################
         # Begin Decoder
         #########################################################
-        hs, references = self.decoder(
-            tgt=tgt.transpose(0, 1),
-            memory=memory.transpose(0, 1),
-            memory_key_padding_mask=mask_flatten,
-            pos=lvl_pos_embed_flatten.transpose(0, 1),
-            refpoints_unsigmoid=refpoint_embed.transpose(0, 1),
-            level_start_index=level_start_index,
-            spatial_shapes=spatial_shapes,
-            valid_ratios=valid_ratios,
-            tgt_mask=attn_mask,
-            memory_text=text_dict["encoded_text"],
-            text_attention_mask=~text_dict["text_token_mask"],
-            # we ~ the mask . False means use the token; True means pad the token
-        )
+        with profile_stage("decoder"):
+            hs, references = self.decoder(
+                tgt=tgt.transpose(0, 1),
+                memory=memory.transpose(0, 1),
+                memory_key_padding_mask=mask_flatten,
+                pos=lvl_pos_embed_flatten.transpose(0, 1),
+                refpoints_unsigmoid=refpoint_embed.transpose(0, 1),
+                level_start_index=level_start_index,
+                spatial_shapes=spatial_shapes,
+                valid_ratios=valid_ratios,
+                tgt_mask=attn_mask,
+                memory_text=text_dict["encoded_text"],
+                text_attention_mask=~text_dict["text_token_mask"],
+                # we ~ the mask . False means use the token; True means pad the token
+                final_layer_only=final_layer_only,
+            )
         #########################################################
         # End Decoder
         # hs: n_dec, bs, nq, d_model
@@ -396,8 +461,8 @@ class Transformer(nn.Module):
         #########################################################
 
         return hs, references, hs_enc, ref_enc, init_box_proposal
-        # hs: (n_dec, bs, nq, d_model)
-        # references: sigmoid coordinates. (n_dec+1, bs, bq, 4)
+        # hs: (n_dec, bs, nq, d_model), (1, bs, nq, d_model) with final_layer_only
+        # references: sigmoid coordinates. (n_dec+1, bs, bq, 4), (1, bs, nq, 4) with final_layer_only
         # hs_enc: (n_enc+1, bs, nq, d_model) or (1, bs, nq, d_model) or None
         # ref_enc: sigmoid coordinates. \
         #           (n_enc+1, bs, nq, query_dim) or (1, bs, nq, query_dim) or None
@@ -547,51 +612,54 @@ class TransformerEncoder(nn.Module):
             #     if os.environ.get('IPDB_SHILONG_DEBUG', None) == 'INFO':
             #         import ipdb; ipdb.set_trace()
             if self.fusion_layers:
-                if self.use_checkpoint:
-                    output, memory_text = checkpoint.checkpoint(
-                        self.fusion_layers[layer_id],
+                with profile_stage("encoder.fusion", layer_id):
+                    if self.use_checkpoint:
+                        output, memory_text = checkpoint.checkpoint(
+                            self.fusion_layers[layer_id],
+                            output,
+                            memory_text,
+                            key_padding_mask,
+                            text_attention_mask,
+                        )
+                    else:
+                        output, memory_text = self.fusion_layers[layer_id](
+                            v=output,
+                            l=memory_text,
+                            attention_mask_v=key_padding_mask,
+                            attention_mask_l=text_attention_mask,
+                        )
+
+            if self.text_layers:
+                with profile_stage("encoder.text_layer", layer_id):
+                    memory_text = self.text_layers[layer_id](
+                        src=memory_text.transpose(0, 1),
+                        src_mask=~text_self_attention_masks,  # note we use ~ for mask here
+                        src_key_padding_mask=text_attention_mask,
+                        pos=(pos_text.transpose(0, 1) if pos_text is not None else None),
+                    ).transpose(0, 1)
+
+            # main process
+            with profile_stage("encoder.deformable", layer_id):
+                if self.use_transformer_ckpt:
+                    output = checkpoint.checkpoint(
+                        layer,
                         output,
-                        memory_text,
+                        pos,
+                        reference_points,
+                        spatial_shapes,
+                        level_start_index,
                         key_padding_mask,
-                        text_attention_mask,
                     )
                 else:
-                    output, memory_text = self.fusion_layers[layer_id](
-                        v=output,
-                        l=memory_text,
-                        attention_mask_v=key_padding_mask,
-                        attention_mask_l=text_attention_mask,
+                    output = layer(
+                        src=output,
+                        pos=pos,
+                        reference_points=reference_points,
+                        spatial_shapes=spatial_shapes,
+                        level_start_index=level_start_index,
+                        key_padding_mask=key_padding_mask,
                     )
 
-            if self.text_layers:
-                memory_text = self.text_layers[layer_id](
-                    src=memory_text.transpose(0, 1),
-                    src_mask=~text_self_attention_masks,  # note we use ~ for mask here
-                    src_key_padding_mask=text_attention_mask,
-                    pos=(pos_text.transpose(0, 1) if pos_text is not None else None),
-                ).transpose(0, 1)
-
-            # main process
-            if self.use_transformer_ckpt:
-                output = checkpoint.checkpoint(
-                    layer,
-                    output,
-                    pos,
-                    reference_points,
-                    spatial_shapes,
-                    level_start_index,
-                    key_padding_mask,
-                )
-            else:
-                output = layer(
-                    src=output,
-                    pos=pos,
-                    reference_points=reference_points,
-                    spatial_shapes=spatial_shapes,
-                    level_start_index=level_start_index,
-                    key_padding_mask=key_padding_mask,
-                )
-
         return output, memory_text
 
 
@@ -647,6 +715,7 @@ class TransformerDecoder(nn.Module):
         # for text
         memory_text: Optional[Tensor] = None,
         text_attention_mask: Optional[Tensor] = None,
+        final_layer_only: bool = False,
     ):
         """
         Input:
@@ -655,6 +724,9 @@ class TransformerDecoder(nn.Module):
             - pos: hw, bs, d_model
             - refpoints_unsigmoid: nq, bs, 2/4
             - valid_ratios/spatial_shapes: bs, nlevel, 2
+            - final_layer_only: return only the normed output of the last layer and its input
+              reference points; intermediate layers are not normed and the refinement after
+              the last layer (unused by the heads) is skipped
         """
         output = tgt
 
@@ -701,16 +773,11 @@ class TransformerDecoder(nn.Module):
                 self_attn_mask=tgt_mask,
                 cross_attn_mask=memory_mask,
             )
-            if output.isnan().any() | output.isinf().any():
-                print(f"output layer_id {layer_id} is nan")
-                try:
-                    num_nan = output.isnan().sum().item()
-                    num_inf = output.isinf().sum().item()
-                    print(f"num_nan {num_nan}, num_inf {num_inf}")
-                except Exception as e:
-                    print(e)
-                    # if os.environ.get("SHILONG_AMP_INFNAN_DEBUG") == '1':
-                    #     import ipdb; ipdb.set_trace()
+            # counted on device while GDINO_CHECK_NUMERICS is enabled, never synchronizes
+            check_numerics("decoder.layer", output, layer_id)
+
+            if final_layer_only and layer_id == self.num_layers - 1:
+                return [[self.norm(output).transpose(0, 1)], [reference_points.transpose(0, 1)]]
 
             # iter update
             if self.bbox_embed is not None:
@@ -727,7 +794,8 @@ class TransformerDecoder(nn.Module):
                 # if layer_id != self.num_layers - 1:
                 ref_points.append(new_reference_points)
 
-            intermediate.append(self.norm(output))
+            if not final_layer_only:
+                intermediate.append(self.norm(output))
 
         return [
             [itm_out.transpose(0, 1) for itm_out in intermediate],
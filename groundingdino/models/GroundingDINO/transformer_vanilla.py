@@ -107,8 +107,8 @@ class TransformerEncoderLayer(nn.Module):
     ):
         # repeat attn mask
         if src_mask.dim() == 3 and src_mask.shape[0] == src.shape[1]:
-            # bs, num_q, num_k
-            src_mask = src_mask.repeat(self.nhead, 1, 1)
+            # bs, num_q, num_k -> bs*nhead, num_q, num_k (batch-major, as nn.MultiheadAttention expects)
+            src_mask = src_mask.repeat_interleave(self.nhead, dim=0)
 
         q = k = self.with_pos_embed(src, pos)
 
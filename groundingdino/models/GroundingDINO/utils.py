@@ -239,7 +239,7 @@ class ContrastiveEmbed(nn.Module):
         super().__init__()
         self.max_text_len = max_text_len
 
-    def forward(self, x, text_dict):
+    def forward(self, x, text_dict, compact=False):
         """_summary_
 
         Args:
@@ -250,6 +250,8 @@ class ContrastiveEmbed(nn.Module):
                 'text_token_mask': text_token_mask, # bs, 195
                         # True for used tokens. False for padding tokens
             }
+            compact: return the logits of the batch's text positions only (bs, nq, 195)
+                instead of padding them with -inf to max_text_len
         Returns:
             _type_: _description_
         """
@@ -260,6 +262,8 @@ class ContrastiveEmbed(nn.Module):
 
         res = x @ y.transpose(-1, -2)
         res.masked_fill_(~text_token_mask[:, None, :], float("-inf"))
+        if compact:
+            return res
 
         # padding to max_text_len
         new_res = torch.full((*res.shape[:-1], self.max_text_len), float("-inf"), device=res.device)
@@ -131,6 +131,50 @@ def masks_to_boxes(masks):
     return torch.stack([x_min, y_min, x_max, y_max], 1)
 
 
+def weighted_boxes_fusion(boxes, scores, labels=None, iou_threshold=0.55):
+    """
+    Fuse overlapping predictions of the same object, e.g. from overlapping image tiles.
+
+    The boxes should be in [x0, y0, x1, y1] format. Boxes are visited by decreasing score
+    and join the first cluster with the same label whose fused box overlaps them by more
+    than `iou_threshold`; otherwise they start a new cluster. A cluster is replaced by the
+    score-weighted mean of its boxes and keeps its best score.
+
+    Returns fused boxes [K, 4], scores [K] and, for each cluster, the index of its
+    highest-scoring input box [K] (to look up labels or phrases).
+    """
+    if labels is None:
+        labels = torch.zeros_like(scores, dtype=torch.long)
+    order = scores.argsort(descending=True)
+    fused_boxes, fused_scores, best_idx = [], [], []
+    cluster_boxes, cluster_weights, cluster_labels = [], [], []
+    for idx in order.tolist():
+        box, score, label = boxes[idx], scores[idx], labels[idx]
+        match = -1
+        if fused_boxes:
+            candidates = torch.stack(fused_boxes)
+            ious, _ = box_iou(box[None], candidates)
+            ious = ious[0].masked_fill(torch.stack(cluster_labels) != label, -1)
+            best = int(ious.argmax())
+            if ious[best] > iou_threshold:
+                match = best
+        if match < 0:
+            fused_boxes.append(box)
+            fused_scores.append(score)
+            best_idx.append(idx)
+            cluster_boxes.append(box * score)
+            cluster_weights.append(score)
+            cluster_labels.append(label)
+        else:
+            cluster_boxes[match] = cluster_boxes[match] + box * score
+            cluster_weights[match] = cluster_weights[match] + score
+            fused_boxes[match] = cluster_boxes[match] / cluster_weights[match]
+
+    if not fused_boxes:
+        return boxes.new_zeros((0, 4)), scores.new_zeros((0,)), torch.zeros(0, dtype=torch.long)
+    return torch.stack(fused_boxes), torch.stack(fused_scores), torch.as_tensor(best_idx)
+
+
 if __name__ == "__main__":
     x = torch.rand(5, 4)
     y = torch.rand(3, 4)
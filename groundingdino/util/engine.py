@@ -0,0 +1,220 @@
+import threading
+from dataclasses import replace
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import torch
+
+from groundingdino.util.inference import (
+    RawPrediction,
+    filter_raw_prediction,
+    preprocess_caption,
+)
+from groundingdino.util.prompt_bank import PromptBank
+from groundingdino.util.time_counter import profile_stage
+
+
+class _HostSlot:
+    """Pinned staging buffer and the event of the last copy out of it."""
+
+    __slots__ = ("buffer", "event")
+
+    def __init__(self) -> None:
+        self.buffer: Optional[torch.Tensor] = None
+        self.event = None
+
+
+class _Staged:
+    """An image on its way to the device; ``event`` is None when it is already there."""
+
+    __slots__ = ("tensor", "event")
+
+    def __init__(self, tensor: torch.Tensor, event=None) -> None:
+        self.tensor = tensor
+        self.event = event
+
+
+class ExecutionEngine:
+    """Run a GroundingDINO model that stays resident on one device.
+
+    The model is moved to ``device`` once instead of on every call. On CUDA, images are
+    copied into a ring of ``num_host_buffers`` pinned host buffers and sent to the device
+    on a side stream, so ``predict_many`` uploads the next image while the model runs on
+    the current one. Box thresholding (or, for raw predictions, ``RawPrediction.compact``)
+    happens on the device and only the kept queries' scores and boxes are copied back. On CPU the staging is skipped and the same code
+    runs synchronously; results match ``predict``/``predict_raw``.
+    """
+
+    def __init__(self, model, device: str = "cuda", num_host_buffers: int = 2) -> None:
+        if device.startswith("cuda") and not torch.cuda.is_available():
+            device = "cpu"
+        self.device = torch.device(device)
+        self.model = model.to(self.device)
+        self.pinned = self.device.type == "cuda"
+        self._copy_stream = torch.cuda.Stream(self.device) if self.pinned else None
+        self._slots = [_HostSlot() for _ in range(max(1, num_host_buffers))]
+        self._next_slot = 0
+        self._lock = threading.Lock()
+
+    # -- host to device ---------------------------------------------------------
+
+    def _host_buffer(self, image: torch.Tensor) -> Tuple[_HostSlot, torch.Tensor]:
+        slot = self._slots[self._next_slot]
+        self._next_slot = (self._next_slot + 1) % len(self._slots)
+        if slot.event is not None:
+            slot.event.synchronize()  # its previous upload has to finish before reuse
+        if slot.buffer is None or slot.buffer.numel() < image.numel() or slot.buffer.dtype != image.dtype:
+            slot.buffer = torch.empty(image.numel(), dtype=image.dtype, pin_memory=True)
+        return slot, slot.buffer[: image.numel()].view(image.shape)
+
+    def stage(self, image: torch.Tensor) -> _Staged:
+        """Start copying ``image`` to the device without waiting for it."""
+        if not self.pinned or image.device.type != "cpu":
+            return _Staged(image.to(self.device))
+        with self._lock, profile_stage("upload"):
+            slot, host = self._host_buffer(image)
+            host.copy_(image)
+            with torch.cuda.stream(self._copy_stream):
+                tensor = host.to(self.device, non_blocking=True)
+                slot.event = torch.cuda.Event()
+                slot.event.record(self._copy_stream)
+        return _Staged(tensor, slot.event)
+
+    def _ready(self, staged: _Staged) -> torch.Tensor:
+        if staged.event is not None:
+            stream = torch.cuda.current_stream(self.device)
+            stream.wait_event(staged.event)
+            # allocated on the copy stream, used on the compute stream
+            staged.tensor.record_stream(stream)
+        return staged.tensor
+
+    def to_device(self, image: torch.Tensor) -> torch.Tensor:
+        """``image`` on the device, ready for use on the current stream."""
+        return self._ready(self.stage(image))
+
+    # -- model ------------------------------------------------------------------
+
+    def _forward(
+        self,
+        image: torch.Tensor,
+        caption: str,
+        prompt_bank: Optional[PromptBank] = None,
+    ) -> Tuple[dict, List[int]]:
+        if prompt_bank is not None:
+            if len(prompt_bank) != 1:
+                raise ValueError(
+                    "prompt bank spans {} captions, use predict_with_class_chunks".format(len(prompt_bank))
+                )
+            prompt_bank = prompt_bank.to(self.device)
+            with torch.no_grad():
+                outputs = self.model(image[None], text_dict=prompt_bank.chunk_text_dict(0), compact_logits=True)
+            return outputs, prompt_bank.input_ids[0]
+        caption = preprocess_caption(caption=caption)
+        with torch.no_grad():
+            outputs = self.model(image[None], captions=[caption], compact_logits=True)
+        return outputs, self.model.tokenizer(caption)["input_ids"]
+
+    def _kept(self, outputs: dict, input_ids: List[int], box_threshold: float) -> RawPrediction:
+        """The queries above ``box_threshold``, selected on the device and then copied back."""
+        input_ids = [int(token) for token in input_ids]
+        with profile_stage("postprocess"):
+            logits = outputs["pred_logits"][0, :, : len(input_ids)].sigmoid()
+            keep = logits.max(dim=1)[0] > box_threshold
+            return RawPrediction(
+                logits=logits[keep].cpu(),
+                boxes=outputs["pred_boxes"][0][keep].cpu(),
+                input_ids=input_ids,
+            )
+
+    def _raw(self, outputs: dict, input_ids: List[int], top_k: int, token_floor: float) -> RawPrediction:
+        """``RawPrediction`` compacted on the device (see ``RawPrediction.compact``), so only
+        the kept queries are copied back; ``top_k`` of 0 and no ``token_floor`` keep all."""
+        input_ids = [int(token) for token in input_ids]
+        with profile_stage("postprocess"):
+            raw = RawPrediction(
+                logits=outputs["pred_logits"][0, :, : len(input_ids)].sigmoid(),
+                boxes=outputs["pred_boxes"][0],
+                input_ids=input_ids,
+            )
+            if top_k > 0 or token_floor > 0:
+                raw = raw.compact(top_k=top_k, token_floor=token_floor)
+            return replace(raw, logits=raw.logits.cpu(), boxes=raw.boxes.cpu())
+
+    def _stream(self, images: Iterable[torch.Tensor]) -> Iterator[_Staged]:
+        """Stage each image before handing out the previous one, so uploads overlap compute."""
+        images = iter(images)
+        first = next(images, None)
+        if first is None:
+            return
+        staged = self.stage(first)
+        for image in images:
+            upcoming = self.stage(image)
+            yield staged
+            staged = upcoming
+        yield staged
+
+    def _predict_staged(
+        self,
+        staged: _Staged,
+        caption: str,
+        box_threshold: float,
+        text_threshold: float,
+        prompt_bank: Optional[PromptBank] = None,
+        remove_combined: bool = False,
+    ) -> Tuple[torch.Tensor, torch.Tensor, List[str]]:
+        outputs, input_ids = self._forward(self._ready(staged), caption, prompt_bank)
+        kept = self._kept(outputs, input_ids, box_threshold)
+        return filter_raw_prediction(kept, self.model.tokenizer, box_threshold, text_threshold, remove_combined)
+
+    def predict(
+        self,
+        image: torch.Tensor,
+        caption: str,
+        box_threshold: float,
+        text_threshold: float,
+        prompt_bank: Optional[PromptBank] = None,
+        remove_combined: bool = False,
+    ) -> Tuple[torch.Tensor, torch.Tensor, List[str]]:
+        """Same detections as ``predict``, with the thresholding done on the device."""
+        return self._predict_staged(
+            self.stage(image), caption, box_threshold, text_threshold, prompt_bank, remove_combined
+        )
+
+    def predict_raw(
+        self,
+        image: torch.Tensor,
+        caption: str,
+        prompt_bank: Optional[PromptBank] = None,
+        top_k: int = 0,
+        token_floor: float = 0.0,
+    ) -> RawPrediction:
+        """Same as ``predict_raw``; with ``top_k``/``token_floor`` it is compacted on the device."""
+        outputs, input_ids = self._forward(self.to_device(image), caption, prompt_bank)
+        return self._raw(outputs, input_ids, top_k, token_floor)
+
+    def predict_many(
+        self,
+        images: Iterable[torch.Tensor],
+        caption: str,
+        box_threshold: float,
+        text_threshold: float,
+        prompt_bank: Optional[PromptBank] = None,
+        remove_combined: bool = False,
+    ) -> Iterator[Tuple[torch.Tensor, torch.Tensor, List[str]]]:
+        """``predict`` for each image, uploading the next image while the current one runs."""
+        for staged in self._stream(images):
+            yield self._predict_staged(
+                staged, caption, box_threshold, text_threshold, prompt_bank, remove_combined
+            )
+
+    def predict_raw_many(
+        self,
+        images: Iterable[torch.Tensor],
+        caption: str,
+        prompt_bank: Optional[PromptBank] = None,
+        top_k: int = 0,
+        token_floor: float = 0.0,
+    ) -> Iterator[RawPrediction]:
+        """``predict_raw`` for each image, uploading the next image while the current one runs."""
+        for staged in self._stream(images):
+            outputs, input_ids = self._forward(self._ready(staged), caption, prompt_bank)
+            yield self._raw(outputs, input_ids, top_k, token_floor)
@@ -1,5 +1,76 @@
-from transformers import AutoTokenizer, BertModel, BertTokenizer, RobertaModel, RobertaTokenizerFast
+from transformers import (
+    AutoTokenizer,
+    BertConfig,
+    BertModel,
+    BertTokenizer,
+    BertTokenizerFast,
+    RobertaModel,
+    RobertaTokenizerFast,
+)
 import os
+import string
+
+import torch
+
+# Offline stand-in for bert-base-uncased used by GroundingDINO_Tiny_Test.py: an in-memory
+# WordPiece tokenizer and a small randomly initialized BERT. Special-token and punctuation
+# ids match bert-base-uncased ([CLS]=101, [SEP]=102, "."=1012, "?"=1029).
+TINY_TEST_TEXT_ENCODER = "tiny-test-bert"
+TINY_TEST_WORDS = (
+    "a", "an", "the", "and", "of", "on", "in", "with",
+    "person", "people", "man", "woman", "car", "dog", "cat", "bird", "chair", "table",
+    "cup", "bottle", "book", "bicycle", "traffic", "light", "phone", "cell", "laptop",
+)
+
+
+def _tiny_test_vocab():
+    vocab = ["[PAD]"] + [f"[unused{idx}]" for idx in range(99)]
+    vocab += ["[UNK]", "[CLS]", "[SEP]", "[MASK]"]
+    vocab += [f"[unused{idx}]" for idx in range(99, 99 + 999 - len(vocab))]
+    vocab += [chr(code) for code in range(33, 127) if not chr(code).isupper()]
+    vocab += [f"##{char}" for char in string.digits + string.ascii_lowercase]
+    vocab += [word for word in TINY_TEST_WORDS if word not in vocab]
+    return {token: idx for idx, token in enumerate(vocab)}
+
+
+def _build_tiny_test_tokenizer():
+    from tokenizers import Tokenizer, decoders, models, normalizers, pre_tokenizers, processors
+
+    vocab = _tiny_test_vocab()
+    tokenizer = Tokenizer(models.WordPiece(vocab, unk_token="[UNK]"))
+    tokenizer.normalizer = normalizers.BertNormalizer(lowercase=True)
+    tokenizer.pre_tokenizer = pre_tokenizers.BertPreTokenizer()
+    tokenizer.post_processor = processors.TemplateProcessing(
+        single="[CLS] $A [SEP]",
+        pair="[CLS] $A [SEP] $B:1 [SEP]:1",
+        special_tokens=[("[CLS]", vocab["[CLS]"]), ("[SEP]", vocab["[SEP]"])],
+    )
+    tokenizer.decoder = decoders.WordPiece(prefix="##")
+    return BertTokenizerFast(
+        tokenizer_object=tokenizer,
+        unk_token="[UNK]",
+        sep_token="[SEP]",
+        pad_token="[PAD]",
+        cls_token="[CLS]",
+        mask_token="[MASK]",
+        model_max_length=512,
+        clean_up_tokenization_spaces=True,
+    )
+
+
+def _build_tiny_test_language_model(seed=0):
+    config = BertConfig(
+        vocab_size=len(_tiny_test_vocab()),
+        hidden_size=32,
+        num_hidden_layers=1,
+        num_attention_heads=2,
+        intermediate_size=64,
+        max_position_embeddings=512,
+    )
+    with torch.random.fork_rng(devices=[]):
+        torch.manual_seed(seed)
+        return BertModel(config)
+
 
 def get_tokenlizer(text_encoder_type):
     if not isinstance(text_encoder_type, str):
@@ -15,12 +86,16 @@ def get_tokenlizer(text_encoder_type):
                 "Unknown type of text_encoder_type: {}".format(type(text_encoder_type))
             )
     print("final text_encoder_type: {}".format(text_encoder_type))
+    if text_encoder_type == TINY_TEST_TEXT_ENCODER:
+        return _build_tiny_test_tokenizer()
 
     tokenizer = AutoTokenizer.from_pretrained(text_encoder_type)
     return tokenizer
 
 
 def get_pretrained_language_model(text_encoder_type):
+    if text_encoder_type == TINY_TEST_TEXT_ENCODER:
+        return _build_tiny_test_language_model()
     if text_encoder_type == "bert-base-uncased" or (os.path.isdir(text_encoder_type) and os.path.exists(text_encoder_type)):
         return BertModel.from_pretrained(text_encoder_type)
     if text_encoder_type == "roberta-base":
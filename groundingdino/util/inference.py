@@ -1,17 +1,24 @@
-from typing import Tuple, List
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Tuple, List, Optional
 
 import cv2
 import numpy as np
 import supervision as sv
 import torch
 from PIL import Image
-from torchvision.ops import box_convert
+from torchvision.ops import batched_nms, box_convert, nms
 import bisect
 
 import groundingdino.datasets.transforms as T
 from groundingdino.models import build_model
-from groundingdino.util.misc import clean_state_dict
+from groundingdino.util import box_ops
+from groundingdino.util.misc import NestedTensor, clean_state_dict, nested_tensor_from_tensor_list
+from groundingdino.util.postprocess import GroundingPostProcessor
+from groundingdino.util.prompt_bank import PromptBank
 from groundingdino.util.slconfig import SLConfig
+from groundingdino.util.time_counter import profile_stage
+from groundingdino.util.tracker import ObjectTracker
 from groundingdino.util.utils import get_phrases_from_posmap
 
 # ----------------------------------------------------------------------------------------------------------------------
@@ -26,30 +33,170 @@ def preprocess_caption(caption: str) -> str:
     return result + "."
 
 
-def load_model(model_config_path: str, model_checkpoint_path: str, device: str = "cuda"):
+def load_model(
+    model_config_path: str,
+    model_checkpoint_path: Optional[str],
+    device: str = "cuda",
+    random_init: bool = False,
+):
+    """Build the model and load its checkpoint.
+
+    Configs with ``random_init = True`` (e.g. ``GroundingDINO_Tiny_Test.py``) ignore the
+    checkpoint and are seeded with ``seed`` so repeated builds produce identical weights.
+    ``random_init=True`` does the same for any config. Otherwise ``model_checkpoint_path``
+    is required.
+    """
     args = SLConfig.fromfile(model_config_path)
     args.device = device
-    model = build_model(args)
-    checkpoint = torch.load(model_checkpoint_path, map_location="cpu")
-    model.load_state_dict(clean_state_dict(checkpoint["model"]), strict=False)
+    if random_init or args.get("random_init", False):
+        with torch.random.fork_rng(devices=[]):
+            torch.manual_seed(args.get("seed", 0))
+            model = build_model(args)
+    else:
+        if not model_checkpoint_path:
+            raise ValueError(
+                "No checkpoint given for '{}', which does not set random_init".format(model_config_path)
+            )
+        model = build_model(args)
+        checkpoint = torch.load(model_checkpoint_path, map_location="cpu")
+        model.load_state_dict(clean_state_dict(checkpoint["model"]), strict=False)
     model.eval()
     return model
 
 
-def load_image(image_path: str) -> Tuple[np.array, torch.Tensor]:
+def load_image(image_path: str, size: int = 800, max_size: int = 1333) -> Tuple[np.array, torch.Tensor]:
     transform = T.Compose(
         [
-            T.RandomResize([800], max_size=1333),
+            T.RandomResize([size], max_size=max_size),
             T.ToTensor(),
             T.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
         ]
     )
-    image_source = Image.open(image_path).convert("RGB")
-    image = np.asarray(image_source)
-    image_transformed, _ = transform(image_source, None)
+    with profile_stage("decode"):
+        image_source = Image.open(image_path).convert("RGB")
+        image = np.asarray(image_source)
+    with profile_stage("preprocess"):
+        image_transformed, _ = transform(image_source, None)
     return image, image_transformed
 
 
+@dataclass
+class RawPrediction:
+    """Threshold-independent model output for one image and caption.
+
+    ``logits`` are sigmoid token scores truncated to the caption's tokens (scores past
+    the caption are masked to exactly 0), so filtering the raw prediction with any
+    thresholds gives the same detections as ``predict`` with those thresholds.
+    A `compact` copy is exact only for thresholds at or above ``min_box_threshold`` and
+    ``min_text_threshold``.
+    """
+
+    logits: torch.Tensor  # (nq, n_tokens)
+    boxes: torch.Tensor  # (nq, 4), normalized cxcywh
+    input_ids: List[int]
+    min_box_threshold: float = 0.0
+    min_text_threshold: float = 0.0
+
+    def covers(self, box_threshold: float, text_threshold: float) -> bool:
+        return box_threshold >= self.min_box_threshold and text_threshold >= self.min_text_threshold
+
+    def compact(self, top_k: int = 100, token_floor: float = 0.05) -> "RawPrediction":
+        """Keep the ``top_k`` best queries (in their original order) and zero token scores
+        at or below ``token_floor``.
+
+        A query dropped here scores at most the best dropped score, and a zeroed token
+        cannot pass a text threshold >= ``token_floor``, so filtering stays exact above
+        the recorded minimum thresholds.
+        """
+        scores = self.logits.max(dim=1)[0] if len(self.logits) else self.logits.new_zeros(0)
+        min_box = max(self.min_box_threshold, token_floor)
+        keep = torch.arange(len(scores), device=scores.device)
+        if 0 < top_k < len(scores):
+            order = scores.argsort(descending=True)
+            min_box = max(min_box, float(scores[order[top_k]]))
+            keep = order[:top_k].sort().values
+        logits = self.logits[keep]
+        logits = logits.masked_fill(logits <= token_floor, 0.0)
+        return RawPrediction(
+            logits=logits,
+            boxes=self.boxes[keep],
+            input_ids=list(self.input_ids),
+            min_box_threshold=min_box,
+            min_text_threshold=max(self.min_text_threshold, token_floor),
+        )
+
+
+def predict_raw(
+        model,
+        image: torch.Tensor,
+        caption: str,
+        device: str = "cuda",
+        prompt_bank: Optional[PromptBank] = None
+) -> RawPrediction:
+    """The part of `predict` that runs the model; see `filter_raw_prediction`."""
+    model = model.to(device)
+    image = image.to(device)
+
+    if prompt_bank is not None:
+        if len(prompt_bank) != 1:
+            raise ValueError(
+                "prompt bank spans {} captions, use predict_with_class_chunks".format(len(prompt_bank)))
+        prompt_bank = prompt_bank.to(device)
+        with torch.no_grad():
+            outputs = model(image[None], text_dict=prompt_bank.chunk_text_dict(0), compact_logits=True)
+        input_ids = prompt_bank.input_ids[0]
+    else:
+        caption = preprocess_caption(caption=caption)
+        with torch.no_grad():
+            outputs = model(image[None], captions=[caption], compact_logits=True)
+        input_ids = model.tokenizer(caption)["input_ids"]
+
+    return raw_prediction_from_outputs(outputs, input_ids)
+
+
+def raw_prediction_from_outputs(outputs: dict, input_ids: List[int]) -> RawPrediction:
+    """`RawPrediction` of the first image of a model forward's `outputs`."""
+    input_ids = [int(token) for token in input_ids]
+    with profile_stage("postprocess"):
+        prediction_logits = outputs["pred_logits"][0, :, : len(input_ids)].cpu().sigmoid()
+        prediction_boxes = outputs["pred_boxes"].cpu()[0]  # prediction_boxes.shape = (nq, 4)
+    return RawPrediction(logits=prediction_logits, boxes=prediction_boxes, input_ids=input_ids)
+
+
+def filter_raw_prediction(
+        raw: RawPrediction,
+        tokenizer,
+        box_threshold: float,
+        text_threshold: float,
+        remove_combined: bool = False
+) -> Tuple[torch.Tensor, torch.Tensor, List[str]]:
+    """Apply `box_threshold`/`text_threshold` to a `RawPrediction`, as `predict` does."""
+    with profile_stage("postprocess"):
+        tokenized = {"input_ids": raw.input_ids}
+        mask = raw.logits.max(dim=1)[0] > box_threshold
+        logits = raw.logits[mask]  # logits.shape = (n, n_tokens)
+        boxes = raw.boxes[mask]  # boxes.shape = (n, 4)
+
+        if remove_combined:
+            sep_idx = [i for i in range(len(tokenized['input_ids'])) if tokenized['input_ids'][i] in [101, 102, 1012]]
+
+            phrases = []
+            for logit in logits:
+                max_idx = logit.argmax()
+                insert_idx = bisect.bisect_left(sep_idx, max_idx)
+                right_idx = sep_idx[insert_idx]
+                left_idx = sep_idx[insert_idx - 1]
+                phrases.append(get_phrases_from_posmap(logit > text_threshold, tokenized, tokenizer, left_idx, right_idx).replace('.', ''))
+        else:
+            phrases = [
+                get_phrases_from_posmap(logit > text_threshold, tokenized, tokenizer).replace('.', '')
+                for logit
+                in logits
+            ]
+
+    return boxes, logits.max(dim=1)[0], phrases
+
+
 def predict(
         model,
         image: torch.Tensor,
@@ -57,47 +204,244 @@ def predict(
         box_threshold: float,
         text_threshold: float,
         device: str = "cuda",
-        remove_combined: bool = False
+        remove_combined: bool = False,
+        prompt_bank: Optional[PromptBank] = None
 ) -> Tuple[torch.Tensor, torch.Tensor, List[str]]:
-    caption = preprocess_caption(caption=caption)
+    """
+    Pass a single-chunk `prompt_bank` instead of `caption` to skip tokenization and the
+    text encoder; `caption` is ignored in that case.
+    """
+    raw = predict_raw(model, image, caption, device=device, prompt_bank=prompt_bank)
+    return filter_raw_prediction(raw, model.tokenizer, box_threshold, text_threshold, remove_combined)
 
+
+def predict_caption_score(
+        model,
+        image: torch.Tensor,
+        caption: str,
+        device: str = "cuda",
+        encoder_only: bool = True
+) -> float:
+    """
+    Best token score of `caption` anywhere in `image`, used to cheaply reject images.
+
+    With `encoder_only` the decoder is skipped and the two-stage proposal logits of the
+    encoder are used instead; they rank images like the final scores but run lower.
+    """
+    caption = preprocess_caption(caption=caption)
     model = model.to(device)
     image = image.to(device)
 
     with torch.no_grad():
-        outputs = model(image[None], captions=[caption])
+        if encoder_only:
+            logits = model.forward_encoder_logits(image[None], captions=[caption], compact_logits=True)
+        else:
+            logits = model(image[None], captions=[caption], compact_logits=True)["pred_logits"]
+    return logits.sigmoid().max().item()
 
-    prediction_logits = outputs["pred_logits"].cpu().sigmoid()[0]  # prediction_logits.shape = (nq, 256)
-    prediction_boxes = outputs["pred_boxes"].cpu()[0]  # prediction_boxes.shape = (nq, 4)
 
-    mask = prediction_logits.max(dim=1)[0] > box_threshold
-    logits = prediction_logits[mask]  # logits.shape = (n, 256)
-    boxes = prediction_boxes[mask]  # boxes.shape = (n, 4)
-
-    tokenizer = model.tokenizer
-    tokenized = tokenizer(caption)
-    
-    if remove_combined:
-        sep_idx = [i for i in range(len(tokenized['input_ids'])) if tokenized['input_ids'][i] in [101, 102, 1012]]
-        
-        phrases = []
-        for logit in logits:
-            max_idx = logit.argmax()
-            insert_idx = bisect.bisect_left(sep_idx, max_idx)
-            right_idx = sep_idx[insert_idx]
-            left_idx = sep_idx[insert_idx - 1]
-            phrases.append(get_phrases_from_posmap(logit > text_threshold, tokenized, tokenizer, left_idx, right_idx).replace('.', ''))
+def predict_with_class_chunks(
+        model,
+        image: torch.Tensor,
+        classes: Optional[List[str]],
+        box_threshold: float,
+        text_threshold: float,
+        device: str = "cuda",
+        nms_threshold: float = 0.5,
+        prompt_bank: Optional[PromptBank] = None
+) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+    """
+    Detect a class list that does not fit into a single caption.
+
+    The classes are split into captions of at most `model.max_text_len` tokens. The image
+    backbone runs once and its features are shared by all captions, which go through the
+    encoder/decoder as one batch. A query is kept when its best token score exceeds
+    `box_threshold` and the score of its best class (mean token score over the class tokens)
+    exceeds `text_threshold`. Duplicates across chunks are removed with class-agnostic NMS.
+    A prebuilt `prompt_bank` replaces `classes` and skips the text encoder.
+
+    Returns:
+    boxes (torch.Tensor): normalized cxcywh boxes, shape (n, 4).
+    scores (torch.Tensor): box scores, shape (n,).
+    class_ids (torch.Tensor): indices into the class list, shape (n,).
+    """
+    model = model.to(device)
+    image = image.to(device)
+    if prompt_bank is None:
+        prompt_bank = PromptBank.build(model, classes, device=device)
     else:
-        phrases = [
-            get_phrases_from_posmap(logit > text_threshold, tokenized, tokenizer).replace('.', '')
-            for logit
-            in logits
+        prompt_bank = prompt_bank.to(device)
+    num_chunks = len(prompt_bank)
+
+    with torch.no_grad():
+        samples = nested_tensor_from_tensor_list(image[None])
+        features, poss = model.backbone(samples)
+        model.set_image_features(
+            [
+                NestedTensor(
+                    feat.tensors.expand(num_chunks, -1, -1, -1),
+                    feat.mask.expand(num_chunks, -1, -1))
+                for feat in features
+            ],
+            [pos.expand(num_chunks, -1, -1, -1) for pos in poss],
+        )
+        batched_samples = NestedTensor(
+            samples.tensors.expand(num_chunks, -1, -1, -1),
+            samples.mask.expand(num_chunks, -1, -1))
+        try:
+            outputs = model(batched_samples, text_dict=prompt_bank.text_dict, compact_logits=True)
+        finally:
+            model.unset_image_tensor()
+
+    prediction_logits = outputs["pred_logits"].sigmoid()  # (num_chunks, nq, n_tokens)
+    num_tokens = prediction_logits.shape[-1]
+    prediction_boxes = outputs["pred_boxes"]  # (num_chunks, nq, 4)
+
+    kept_boxes, kept_scores, kept_class_ids = [], [], []
+    for chunk_logits, chunk_boxes, positive_map, class_ids in zip(
+            prediction_logits, prediction_boxes, prompt_bank.positive_maps, prompt_bank.class_ids):
+        class_scores, class_idx = (chunk_logits @ positive_map[:, :num_tokens].T).max(dim=1)  # (nq,)
+        scores = chunk_logits.max(dim=1)[0]
+        mask = (scores > box_threshold) & (class_scores > text_threshold)
+        kept_boxes.append(chunk_boxes[mask])
+        kept_scores.append(scores[mask])
+        kept_class_ids.append(
+            torch.as_tensor(class_ids, device=class_idx.device)[class_idx[mask]])
+
+    boxes = torch.cat(kept_boxes)
+    scores = torch.cat(kept_scores)
+    class_ids = torch.cat(kept_class_ids)
+    if num_chunks > 1 and nms_threshold is not None:
+        keep = nms(box_ops.box_cxcywh_to_xyxy(boxes), scores, nms_threshold)
+        boxes, scores, class_ids = boxes[keep], scores[keep], class_ids[keep]
+    return boxes.cpu(), scores.cpu(), class_ids.cpu()
+
+
+def get_tile_windows(height: int, width: int, tile_size: int, overlap: float = 0.2) -> List[Tuple[int, int, int, int]]:
+    """
+    Pixel windows (x0, y0, x1, y1) of `tile_size` covering the image, neighbours overlapping by
+    `overlap` (fraction of `tile_size`). The last row/column is shifted inward instead of padded,
+    so every window has the same size and the tiles can be stacked into one batch.
+    """
+    if not 0.0 <= overlap < 1.0:
+        raise ValueError("overlap must be within [0, 1)")
+    stride = max(1, int(tile_size * (1 - overlap)))
+
+    def starts(length: int) -> List[int]:
+        if length <= tile_size:
+            return [0]
+        return list(range(0, length - tile_size, stride)) + [length - tile_size]
+
+    tile_w, tile_h = min(tile_size, width), min(tile_size, height)
+    return [(x0, y0, x0 + tile_w, y0 + tile_h) for y0 in starts(height) for x0 in starts(width)]
+
+
+def predict_tiled(
+        model,
+        image_source: np.ndarray,
+        caption: str,
+        box_threshold: float,
+        text_threshold: float,
+        device: str = "cuda",
+        tile_size: int = 800,
+        tile_overlap: float = 0.2,
+        batch_size: int = 4,
+        merge: str = "nms",
+        iou_threshold: float = 0.5,
+        full_image_pass: bool = True
+) -> Tuple[torch.Tensor, torch.Tensor, List[str]]:
+    """
+    SAHI-style inference for high-resolution images whose small objects do not survive the
+    resize to an 800px short side.
+
+    `image_source` (RGB, as returned by `load_image`) is cut into overlapping tiles at native
+    resolution, which run through the model `batch_size` at a time against a caption encoded
+    once. Tile boxes are mapped back to the full image and, optionally together with a regular
+    full-image pass that keeps large objects whole, merged per phrase with NMS (`merge="nms"`)
+    or weighted box fusion (`merge="wbf"`).
+
+    Returns the same (boxes, logits, phrases) as `predict`, boxes normalized to the full image.
+    """
+    if merge not in ("nms", "wbf"):
+        raise ValueError("merge must be 'nms' or 'wbf', got '{}'".format(merge))
+    model = model.to(device)
+    caption = preprocess_caption(caption=caption)
+    tokenized = model.tokenizer(caption)
+    height, width = image_source.shape[:2]
+    windows = get_tile_windows(height, width, tile_size, tile_overlap)
+    normalize = T.Compose(
+        [
+            T.ToTensor(),
+            T.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
         ]
+    )
 
-    return boxes, logits.max(dim=1)[0], phrases
+    # (logits, boxes) per pass, boxes as normalized cxcywh of the full image
+    passes = []
+    with torch.no_grad():
+        text_dict = model.encode_text([caption], device=device)
+        for start in range(0, len(windows), batch_size):
+            batch_windows = windows[start:start + batch_size]
+            tiles = torch.stack([
+                normalize(Image.fromarray(image_source[y0:y1, x0:x1]), None)[0]
+                for x0, y0, x1, y1 in batch_windows
+            ]).to(device)
+            outputs = model(
+                tiles,
+                text_dict={k: v.expand(len(batch_windows), *v.shape[1:]) for k, v in text_dict.items()},
+                compact_logits=True)
+            for tile_logits, tile_boxes, (x0, y0, x1, y1) in zip(
+                    outputs["pred_logits"], outputs["pred_boxes"], batch_windows):
+                scale = tile_boxes.new_tensor([x1 - x0, y1 - y0, x1 - x0, y1 - y0])
+                offset = tile_boxes.new_tensor([x0, y0, 0, 0])
+                size = tile_boxes.new_tensor([width, height, width, height])
+                passes.append((tile_logits, (tile_boxes * scale + offset) / size))
+        if full_image_pass and len(windows) > 1:
+            resize = T.Compose([T.RandomResize([800], max_size=1333), normalize])
+            image, _ = resize(Image.fromarray(image_source), None)
+            outputs = model(image[None].to(device), text_dict=text_dict, compact_logits=True)
+            passes.append((outputs["pred_logits"][0], outputs["pred_boxes"][0]))
+
+    prediction_logits = torch.cat([logits for logits, _ in passes]).cpu().sigmoid()
+    prediction_boxes = torch.cat([boxes for _, boxes in passes]).cpu()
+    mask = prediction_logits.max(dim=1)[0] > box_threshold
+    logits = prediction_logits[mask]
+    boxes = prediction_boxes[mask]
+    scores = logits.max(dim=1)[0]
+    phrases = [
+        get_phrases_from_posmap(logit > text_threshold, tokenized, model.tokenizer).replace('.', '')
+        for logit
+        in logits
+    ]
+    if len(passes) == 1:
+        return boxes, scores, phrases
+
+    phrase_ids = {phrase: idx for idx, phrase in enumerate(dict.fromkeys(phrases))}
+    labels = torch.as_tensor([phrase_ids[phrase] for phrase in phrases], dtype=torch.long)
+    xyxy = box_ops.box_cxcywh_to_xyxy(boxes)
+    if merge == "nms":
+        keep = batched_nms(xyxy, scores, labels, iou_threshold)
+        return boxes[keep], scores[keep], [phrases[idx] for idx in keep.tolist()]
+    fused_xyxy, fused_scores, best_idx = box_ops.weighted_boxes_fusion(xyxy, scores, labels, iou_threshold)
+    return box_ops.box_xyxy_to_cxcywh(fused_xyxy), fused_scores, [phrases[idx] for idx in best_idx.tolist()]
+
+
+@lru_cache(maxsize=1)
+def _get_annotators() -> Tuple[sv.BoxAnnotator, sv.LabelAnnotator]:
+    # annotators are stateless between calls, build them once
+    return (
+        sv.BoxAnnotator(color_lookup=sv.ColorLookup.INDEX),
+        sv.LabelAnnotator(color_lookup=sv.ColorLookup.INDEX),
+    )
 
 
-def annotate(image_source: np.ndarray, boxes: torch.Tensor, logits: torch.Tensor, phrases: List[str]) -> np.ndarray:
+def annotate(
+        image_source: np.ndarray,
+        boxes: torch.Tensor,
+        logits: torch.Tensor,
+        phrases: List[str],
+        out: Optional[np.ndarray] = None
+) -> np.ndarray:
     """    
     This function annotates an image with bounding boxes and labels.
 
@@ -106,9 +450,11 @@ def annotate(image_source: np.ndarray, boxes: torch.Tensor, logits: torch.Tensor
     boxes (torch.Tensor): A tensor containing bounding box coordinates.
     logits (torch.Tensor): A tensor containing confidence scores for each bounding box.
     phrases (List[str]): A list of labels for each bounding box.
+    out (np.ndarray, optional): A BGR buffer of the same shape to draw into, e.g. reused
+        across video frames. A new buffer is allocated when omitted.
 
     Returns:
-    np.ndarray: The annotated image.
+    np.ndarray: The annotated image (BGR), drawn in place on a single buffer.
     """
     h, w, _ = image_source.shape
     boxes = boxes * torch.Tensor([w, h, w, h])
@@ -121,11 +467,10 @@ def annotate(image_source: np.ndarray, boxes: torch.Tensor, logits: torch.Tensor
         in zip(phrases, logits)
     ]
 
-    bbox_annotator = sv.BoxAnnotator(color_lookup=sv.ColorLookup.INDEX)
-    label_annotator = sv.LabelAnnotator(color_lookup=sv.ColorLookup.INDEX)
-    annotated_frame = cv2.cvtColor(image_source, cv2.COLOR_RGB2BGR)
-    annotated_frame = bbox_annotator.annotate(scene=annotated_frame, detections=detections)
-    annotated_frame = label_annotator.annotate(scene=annotated_frame, detections=detections, labels=labels)
+    bbox_annotator, label_annotator = _get_annotators()
+    annotated_frame = cv2.cvtColor(image_source, cv2.COLOR_RGB2BGR, dst=out)
+    bbox_annotator.annotate(scene=annotated_frame, detections=detections)
+    label_annotator.annotate(scene=annotated_frame, detections=detections, labels=labels)
     return annotated_frame
 
 
@@ -148,6 +493,10 @@ class Model:
             device=device
         ).to(device)
         self.device = device
+        self.tracker: Optional[ObjectTracker] = None
+        # caches the caption and positive map of every class list it has seen
+        self.postprocessor = GroundingPostProcessor(
+            self.model.tokenizer, max_text_len=self.model.max_text_len)
 
     def predict_with_caption(
         self,
@@ -190,12 +539,63 @@ class Model:
             logits=logits)
         return detections, phrases
 
+    def track_with_caption(
+        self,
+        image: np.ndarray,
+        caption: str,
+        box_threshold: float = 0.35,
+        text_threshold: float = 0.25,
+        detect_every: int = 5,
+        tracker: Optional[ObjectTracker] = None
+    ) -> Tuple[sv.Detections, List[str]]:
+        """
+        Call once per video frame: the model runs every `detect_every` frames (or sooner
+        when a track's confidence decays) and the tracks are propagated in between.
+        `detections.tracker_id` holds stable track ids, `confidence` the decayed score.
+
+        model = Model(model_config_path=CONFIG_PATH, model_checkpoint_path=WEIGHTS_PATH)
+        for frame in frames:
+            detections, labels = model.track_with_caption(image=frame, caption=caption)
+
+        Pass your own `tracker` (see `ObjectTracker`) to follow several streams; the
+        default one lives on the model until `reset_tracker()`.
+        """
+        if tracker is None:
+            if self.tracker is None:
+                self.tracker = ObjectTracker(detect_every=detect_every)
+            tracker = self.tracker
+        if tracker.should_detect():
+            processed_image = Model.preprocess_image(image_bgr=image).to(self.device)
+            boxes, logits, phrases = predict(
+                model=self.model,
+                image=processed_image,
+                caption=caption,
+                box_threshold=box_threshold,
+                text_threshold=text_threshold,
+                device=self.device)
+            tracks = tracker.update(boxes, logits, phrases)
+        else:
+            tracks = tracker.propagate()
+        boxes, confidences, labels, track_ids = tracker.to_tensors(tracks)
+        source_h, source_w, _ = image.shape
+        detections = Model.post_process_result(
+            source_h=source_h,
+            source_w=source_w,
+            boxes=boxes,
+            logits=confidences)
+        detections.tracker_id = np.array(track_ids, dtype=int)
+        return detections, labels
+
+    def reset_tracker(self) -> None:
+        self.tracker = None
+
     def predict_with_classes(
         self,
         image: np.ndarray,
-        classes: List[str],
+        classes: Optional[List[str]],
         box_threshold: float,
-        text_threshold: float
+        text_threshold: float,
+        prompt_bank: Optional[PromptBank] = None
     ) -> sv.Detections:
         """
         import cv2
@@ -210,36 +610,74 @@ class Model:
             text_threshold=TEXT_THRESHOLD
         )
 
+        # or encode the class list once and reuse it for every image
+        prompt_bank = model.build_prompt_bank(classes=CLASSES)
+        detections = model.predict_with_classes(
+            image=image,
+            classes=None,
+            box_threshold=BOX_THRESHOLD,
+            text_threshold=TEXT_THRESHOLD,
+            prompt_bank=prompt_bank
+        )
 
         import supervision as sv
 
         box_annotator = sv.BoxAnnotator()
         annotated_image = box_annotator.annotate(scene=image, detections=detections)
+
+        A query is kept when its best token score exceeds `box_threshold` and its best class
+        (mean score over the class tokens) exceeds `text_threshold`; `class_id` indexes
+        `classes`.
         """
-        caption = ". ".join(classes)
+        if prompt_bank is not None:
+            classes = prompt_bank.classes
+            use_chunks = True
+        else:
+            try:
+                caption = self.postprocessor.caption(classes)
+                use_chunks = False
+            except ValueError:
+                # the caption would be truncated, detect the classes chunk by chunk instead
+                use_chunks = True
         processed_image = Model.preprocess_image(image_bgr=image).to(self.device)
-        boxes, logits, phrases = predict(
-            model=self.model,
-            image=processed_image,
-            caption=caption,
-            box_threshold=box_threshold,
-            text_threshold=text_threshold,
-            device=self.device)
         source_h, source_w, _ = image.shape
+        if use_chunks:
+            boxes, logits, class_id = predict_with_class_chunks(
+                model=self.model,
+                image=processed_image,
+                classes=classes,
+                box_threshold=box_threshold,
+                text_threshold=text_threshold,
+                device=self.device,
+                prompt_bank=prompt_bank)
+            detections = Model.post_process_result(
+                source_h=source_h,
+                source_w=source_w,
+                boxes=boxes,
+                logits=logits)
+            detections.class_id = class_id.numpy()
+            return detections
+        with torch.no_grad():
+            outputs = self.model(processed_image[None], captions=[caption], compact_logits=True)
+        ((boxes, logits, class_id),) = self.postprocessor.select(
+            outputs, classes, box_threshold=box_threshold, text_threshold=text_threshold)
         detections = Model.post_process_result(
             source_h=source_h,
             source_w=source_w,
-            boxes=boxes,
-            logits=logits)
-        class_id = Model.phrases2classes(phrases=phrases, classes=classes)
-        detections.class_id = class_id
+            boxes=boxes.cpu(),
+            logits=logits.cpu())
+        detections.class_id = class_id.cpu().numpy()
         return detections
 
+    def build_prompt_bank(self, classes: List[str]) -> PromptBank:
+        """Encode `classes` once; save it with `PromptBank.save` and reload with `PromptBank.load`."""
+        return PromptBank.build(self.model, classes, device=self.device)
+
     @staticmethod
-    def preprocess_image(image_bgr: np.ndarray) -> torch.Tensor:
+    def preprocess_image(image_bgr: np.ndarray, size: int = 800, max_size: int = 1333) -> torch.Tensor:
         transform = T.Compose(
             [
-                T.RandomResize([800], max_size=1333),
+                T.RandomResize([size], max_size=max_size),
                 T.ToTensor(),
                 T.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
             ]
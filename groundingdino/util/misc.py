@@ -422,17 +422,22 @@ class NestedTensor(object):
             res.append(torch.Tensor([maxH, maxW]))
         return res
 
-    def to(self, device):
-        # type: (Device) -> NestedTensor # noqa
-        cast_tensor = self.tensors.to(device)
+    def to(self, device, non_blocking=False):
+        # type: (Device, bool) -> NestedTensor # noqa
+        cast_tensor = self.tensors.to(device, non_blocking=non_blocking)
         mask = self.mask
         if mask is not None:
             assert mask is not None
-            cast_mask = mask.to(device)
+            cast_mask = mask.to(device, non_blocking=non_blocking)
         else:
             cast_mask = None
         return NestedTensor(cast_tensor, cast_mask)
 
+    def pin_memory(self):
+        # called by DataLoader(pin_memory=True) so batches can be copied asynchronously
+        mask = self.mask.pin_memory() if self.mask is not None else None
+        return NestedTensor(self.tensors.pin_memory(), mask)
+
     def to_img_list_single(self, tensor, mask):
         assert tensor.dim() == 3, "dim of tensor should be 3 but {}".format(tensor.dim())
         maxH = (~mask).sum(0).max()
@@ -0,0 +1,65 @@
+import threading
+
+
+class NumericsMonitor:
+    """
+    Opt-in NaN/Inf counting for intermediate activations.
+
+    While disabled (the default) `check()` returns immediately. While enabled, each check
+    adds the tensor's NaN and Inf counts to an accumulator on the tensor's device without
+    reading them back, so checks in the hot path never force a device-to-host sync; the
+    totals are only copied to the host by `counts()`, e.g. when metrics are scraped.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._checks = {}
+        self._pending = {}  # (name, device) -> tensor([num_nan, num_inf])
+        self._totals = {}  # name -> [num_nan, num_inf]
+
+    def configure(self, enabled: bool = True):
+        self.enabled = enabled
+
+    def check(self, name: str, tensor, index=None):
+        if not self.enabled:
+            return
+        import torch
+
+        name = name if index is None else "{}.{}".format(name, index)
+        with torch.no_grad():
+            found = torch.stack([tensor.isnan().sum(), tensor.isinf().sum()])
+        with self._lock:
+            self._checks[name] = self._checks.get(name, 0) + 1
+            key = (name, found.device)
+            pending = self._pending.get(key)
+            self._pending[key] = found if pending is None else pending + found
+
+    def counts(self):
+        """{name: {"checks": ..., "nan": ..., "inf": ...}} over everything checked so far."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            for (name, _), found in pending.items():
+                num_nan, num_inf = found.tolist()
+                totals = self._totals.setdefault(name, [0, 0])
+                totals[0] += num_nan
+                totals[1] += num_inf
+            counts = {}
+            for name, checks in self._checks.items():
+                num_nan, num_inf = self._totals.get(name, (0, 0))
+                counts[name] = {"checks": checks, "nan": num_nan, "inf": num_inf}
+            return counts
+
+    def reset(self):
+        with self._lock:
+            self._checks = {}
+            self._pending = {}
+            self._totals = {}
+
+
+NUMERICS = NumericsMonitor()
+
+
+def check_numerics(name: str, tensor, index=None):
+    """Count NaN/Inf values of `tensor` under `name` (`name.index`) when checks are enabled."""
+    NUMERICS.check(name, tensor, index)
@@ -0,0 +1,145 @@
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import torch
+
+from groundingdino.util import box_ops
+from groundingdino.util.vl_utils import (
+    build_chunked_captions_and_token_span,
+    create_positive_map_from_span,
+)
+
+
+class GroundingPostProcessor:
+    """Turn GroundingDINO outputs into class-level detections for a fixed category list.
+
+    The categories are joined into one caption (``caption``; feed exactly that caption to
+    the model) and a token-to-category positive map is built for it, so a category's score
+    for a query is the mean sigmoid score of its tokens. Captions and positive maps are
+    cached per category list (and device), so a vocabulary used for many images costs one
+    matmul per batch; scoring, top-k, box conversion and scaling are batched tensor ops.
+    Category lists that do not fit into ``max_text_len`` tokens need a ``PromptBank``.
+    """
+
+    def __init__(self, tokenizer, max_text_len: int = 256, cache_size: int = 16) -> None:
+        self.tokenizer = tokenizer
+        self.max_text_len = max_text_len
+        self.cache_size = cache_size
+        self._vocabularies: "OrderedDict[Tuple[str, ...], Tuple[str, List[int], List]]" = OrderedDict()
+        self._positive_maps: "OrderedDict[Tuple[Tuple[str, ...], str], Tuple[torch.Tensor, torch.Tensor]]" = (
+            OrderedDict()
+        )
+
+    def _cached(self, cache: OrderedDict, key, build):
+        value = cache.get(key)
+        if value is None:
+            value = cache[key] = build()
+            while len(cache) > self.cache_size:
+                cache.popitem(last=False)
+        cache.move_to_end(key)
+        return value
+
+    def _vocabulary(self, categories: Sequence[str]) -> Tuple[str, List[int], List]:
+        def build():
+            chunks = build_chunked_captions_and_token_span(
+                list(categories), self.tokenizer, max_text_len=self.max_text_len
+            )
+            if len(chunks) != 1:
+                raise ValueError(
+                    "{} categories do not fit into one caption of {} tokens; "
+                    "use a PromptBank instead".format(len(categories), self.max_text_len)
+                )
+            return chunks[0]
+
+        return self._cached(self._vocabularies, tuple(categories), build)
+
+    def caption(self, categories: Sequence[str]) -> str:
+        """The caption the positive map of ``categories`` refers to (lowercase, " . " separated)."""
+        return self._vocabulary(categories)[0]
+
+    def positive_map(self, categories: Sequence[str], device=None) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Row-normalized token map of the categories, shape (num_kept, max_text_len), and the
+        index into ``categories`` of each row (categories with an empty name are dropped)."""
+
+        def build():
+            caption, class_ids, token_spans = self._vocabulary(categories)
+            positive_map = create_positive_map_from_span(
+                self.tokenizer(caption), token_spans, max_text_len=self.max_text_len
+            )
+            return positive_map.to(device), torch.as_tensor(class_ids, device=device)
+
+        return self._cached(self._positive_maps, (tuple(categories), str(device)), build)
+
+    def category_scores(self, outputs: Dict[str, torch.Tensor], categories: Sequence[str]) -> torch.Tensor:
+        """Per query and category scores, shape (bs, num_queries, num_kept)."""
+        prob_to_token = outputs["pred_logits"].sigmoid()  # bs, nq, 256 (n_tokens when compact)
+        positive_map, _ = self.positive_map(categories, prob_to_token.device)
+        return prob_to_token @ positive_map[:, : prob_to_token.shape[-1]].T
+
+    @torch.no_grad()
+    def __call__(
+        self,
+        outputs: Dict[str, torch.Tensor],
+        categories: Sequence[str],
+        target_sizes: Optional[torch.Tensor] = None,
+        num_select: int = 300,
+        label_ids: Optional[Sequence[int]] = None,
+        not_to_xyxy: bool = False,
+    ) -> List[Dict[str, torch.Tensor]]:
+        """Top ``num_select`` (query, category) pairs per image, as the COCO evaluation wants.
+
+        A query can be reported for several categories. Labels are indices into
+        ``categories``, or ``label_ids[index]`` (e.g. COCO category ids) when given. Boxes
+        are xyxy (cxcywh with ``not_to_xyxy``), scaled to ``target_sizes`` ([bs, 2] of
+        height, width) or normalized without it.
+        """
+        prob = self.category_scores(outputs, categories)  # bs, nq, num_kept
+        bs, _, num_kept = prob.shape
+        num_select = min(num_select, prob.shape[1] * num_kept)
+        scores, topk_indexes = torch.topk(prob.reshape(bs, -1), num_select, dim=1)
+        topk_boxes = topk_indexes // num_kept
+        _, class_ids = self.positive_map(categories, prob.device)
+        labels = class_ids[topk_indexes % num_kept]
+        if label_ids is not None:
+            labels = torch.as_tensor(label_ids, device=labels.device)[labels]
+
+        boxes = outputs["pred_boxes"]
+        if not not_to_xyxy:
+            boxes = box_ops.box_cxcywh_to_xyxy(boxes)
+        boxes = torch.gather(boxes, 1, topk_boxes.unsqueeze(-1).expand(-1, -1, 4))
+        if target_sizes is not None:
+            # from relative [0, 1] to absolute [0, height] coordinates
+            assert target_sizes.shape == (bs, 2)
+            img_h, img_w = target_sizes.to(boxes).unbind(1)
+            boxes = boxes * torch.stack([img_w, img_h, img_w, img_h], dim=1)[:, None, :]
+
+        return [
+            {"scores": s, "labels": l, "boxes": b} for s, l, b in zip(scores, labels, boxes)
+        ]
+
+    @torch.no_grad()
+    def select(
+        self,
+        outputs: Dict[str, torch.Tensor],
+        categories: Sequence[str],
+        box_threshold: float,
+        text_threshold: float,
+    ) -> List[Tuple[torch.Tensor, torch.Tensor, torch.Tensor]]:
+        """Thresholded detections with one category per query, as ``predict`` reports them.
+
+        A query is kept when its best token score exceeds ``box_threshold`` and the score of
+        its best category exceeds ``text_threshold``. Returns per image the normalized cxcywh
+        boxes, the box scores and the indices into ``categories``.
+        """
+        prob = self.category_scores(outputs, categories)
+        class_scores, best = prob.max(dim=2)  # bs, nq
+        scores = outputs["pred_logits"].sigmoid().max(dim=2)[0]
+        keep = (scores > box_threshold) & (class_scores > text_threshold)
+        _, class_ids = self.positive_map(categories, prob.device)
+        class_ids = class_ids[best]
+        return [
+            (boxes[mask], image_scores[mask], image_class_ids[mask])
+            for boxes, image_scores, image_class_ids, mask in zip(
+                outputs["pred_boxes"], scores, class_ids, keep
+            )
+        ]
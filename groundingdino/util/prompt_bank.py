@@ -0,0 +1,131 @@
+from typing import Dict, List, Optional
+
+import torch
+
+from groundingdino.util.vl_utils import (
+    build_chunked_captions_and_token_span,
+    create_positive_map_from_span,
+)
+
+PROMPT_BANK_VERSION = 1
+
+
+class PromptBank:
+    """A fixed class list encoded once by the text branch (BERT + feat_map) of GroundingDINO.
+
+    The class list is split into captions that fit into max_text_len tokens (one chunk for
+    most vocabularies). For every chunk the bank keeps the encoded text, the masks and position
+    ids the transformer needs, the token ids used to decode phrases and the token-to-class
+    positive map. Running the model with a bank needs no tokenizer or BERT forward.
+    """
+
+    def __init__(
+        self,
+        classes: List[str],
+        captions: List[str],
+        class_ids: List[List[int]],
+        token_spans: List[List[List[List[int]]]],
+        input_ids: List[List[int]],
+        positive_maps: List[torch.Tensor],
+        text_dict: Dict[str, torch.Tensor],
+        max_text_len: int = 256,
+    ) -> None:
+        self.classes = list(classes)
+        self.captions = captions
+        self.class_ids = class_ids
+        self.token_spans = token_spans
+        self.input_ids = input_ids
+        self.positive_maps = positive_maps
+        self.text_dict = text_dict
+        self.max_text_len = max_text_len
+
+    def __len__(self):
+        return len(self.captions)
+
+    def __repr__(self):
+        return "PromptBank(num_classes={}, num_chunks={})".format(len(self.classes), len(self))
+
+    @property
+    def device(self):
+        return self.text_dict["encoded_text"].device
+
+    @classmethod
+    @torch.no_grad()
+    def build(cls, model, classes: List[str], device=None) -> "PromptBank":
+        if device is None:
+            device = next(model.parameters()).device
+        tokenizer = model.tokenizer
+        chunks = build_chunked_captions_and_token_span(
+            classes, tokenizer, max_text_len=model.max_text_len
+        )
+        if len(chunks) == 0:
+            raise ValueError("cannot build a prompt bank from an empty class list")
+
+        captions = [caption for caption, _, _ in chunks]
+        input_ids, positive_maps = [], []
+        for caption, _, token_spans in chunks:
+            tokenized = tokenizer(caption)
+            input_ids.append(list(tokenized["input_ids"]))
+            positive_maps.append(
+                create_positive_map_from_span(
+                    tokenized, token_spans, max_text_len=model.max_text_len
+                ).to(device)
+            )
+        text_dict = model.encode_text(captions, device=device)
+        return cls(
+            classes=classes,
+            captions=captions,
+            class_ids=[class_ids for _, class_ids, _ in chunks],
+            token_spans=[token_spans for _, _, token_spans in chunks],
+            input_ids=input_ids,
+            positive_maps=positive_maps,
+            text_dict={k: v.detach() for k, v in text_dict.items()},
+            max_text_len=model.max_text_len,
+        )
+
+    def to(self, device) -> "PromptBank":
+        return PromptBank(
+            classes=self.classes,
+            captions=self.captions,
+            class_ids=self.class_ids,
+            token_spans=self.token_spans,
+            input_ids=self.input_ids,
+            positive_maps=[positive_map.to(device) for positive_map in self.positive_maps],
+            text_dict={k: v.to(device) for k, v in self.text_dict.items()},
+            max_text_len=self.max_text_len,
+        )
+
+    def chunk_text_dict(self, chunk_idx: int, batch_size: int = 1) -> Dict[str, torch.Tensor]:
+        """text_dict of a single chunk, expanded to batch_size images."""
+        return {
+            k: v[chunk_idx : chunk_idx + 1].expand(batch_size, *v.shape[1:])
+            for k, v in self.text_dict.items()
+        }
+
+    def state_dict(self) -> dict:
+        return {
+            "version": PROMPT_BANK_VERSION,
+            "classes": self.classes,
+            "captions": self.captions,
+            "class_ids": self.class_ids,
+            "token_spans": self.token_spans,
+            "input_ids": self.input_ids,
+            "positive_maps": [positive_map.cpu() for positive_map in self.positive_maps],
+            "text_dict": {k: v.cpu() for k, v in self.text_dict.items()},
+            "max_text_len": self.max_text_len,
+        }
+
+    def save(self, path) -> None:
+        torch.save(self.state_dict(), path)
+
+    @classmethod
+    def load(cls, path, map_location: Optional[str] = "cpu") -> "PromptBank":
+        state = torch.load(path, map_location=map_location)
+        version = state.pop("version", None)
+        if version != PROMPT_BANK_VERSION:
+            raise ValueError(
+                "unsupported prompt bank version {} (expected {})".format(
+                    version, PROMPT_BANK_VERSION
+                )
+            )
+        return cls(**state)
@@ -7,6 +7,7 @@ import os.path as osp
 import shutil
 import sys
 import tempfile
+import threading
 from argparse import Action
 from importlib import import_module
 
@@ -16,6 +17,8 @@ from yapf.yapflib.yapf_api import FormatCode
 BASE_KEY = "_base_"
 DELETE_KEY = "_delete_"
 RESERVED_KEYS = ["filename", "text", "pretty_text", "get", "dump", "merge_from_dict"]
+# python configs are imported through a temporary sys.path entry, one at a time
+_IMPORT_LOCK = threading.Lock()
 
 
 def check_file_exist(filename, msg_tmpl='file "{}" does not exist'):
@@ -85,15 +88,18 @@ class SLConfig(object):
                     temp_config_file.close()
                 shutil.copyfile(filename, osp.join(temp_config_dir, temp_config_name))
                 temp_module_name = osp.splitext(temp_config_name)[0]
-                sys.path.insert(0, temp_config_dir)
                 SLConfig._validate_py_syntax(filename)
-                mod = import_module(temp_module_name)
-                sys.path.pop(0)
-                cfg_dict = {
-                    name: value for name, value in mod.__dict__.items() if not name.startswith("__")
-                }
-                # delete imported module
-                del sys.modules[temp_module_name]
+                with _IMPORT_LOCK:
+                    sys.path.insert(0, temp_config_dir)
+                    mod = import_module(temp_module_name)
+                    sys.path.pop(0)
+                    cfg_dict = {
+                        name: value
+                        for name, value in mod.__dict__.items()
+                        if not name.startswith("__")
+                    }
+                    # delete imported module
+                    del sys.modules[temp_module_name]
                 # close temp file
                 temp_config_file.close()
         elif filename.lower().endswith((".yml", ".yaml", ".json")):
@@ -0,0 +1,166 @@
+import math
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import torch
+import torch.nn.functional as F
+
+from groundingdino.util.misc import NestedTensor, nested_tensor_from_tensor_list
+from groundingdino.util.time_counter import profile_stage
+
+# stride of the coarsest backbone level; change blocks and backbone crops align to it so
+# that every level's features can be pasted at integer offsets
+FEATURE_STRIDE = 32
+
+TEMPORAL_MODES = ("keyframe", "partial", "reuse")
+
+
+class TemporalFeatureCache:
+    """Reuse backbone features and outputs across consecutive frames of a static camera.
+
+    Frames are compared with the frame the cached features describe, block by block
+    (``block_size`` pixels of the resized input, mean absolute difference over the
+    normalized channels). Every call takes one of three paths:
+
+    - ``"keyframe"``: the full model runs and its multi-level backbone features are cached.
+      Taken for the first frame, after a size change, every ``keyframe_interval`` frames
+      and when the changed area exceeds ``refresh_fraction`` of the frame.
+    - ``"partial"``: the backbone runs only on the bounding box of the changed blocks plus
+      ``margin`` blocks of context; the features of the changed blocks are pasted into the
+      cached levels (``set_image_features``) and the encoder and decoder run on the result.
+    - ``"reuse"``: no block changed and the text is the same, so the transformer input is
+      the cached one and the previous outputs are returned without running the model.
+
+    Pasted features ignore context beyond the margin, so they drift slightly from a full
+    forward; keyframes bound the drift. Single image, single text chunk.
+    """
+
+    def __init__(
+        self,
+        model,
+        block_size: int = 32,
+        block_threshold: float = 0.1,
+        refresh_fraction: float = 0.3,
+        keyframe_interval: int = 30,
+        margin: int = 1,
+    ) -> None:
+        if block_size <= 0 or block_size % FEATURE_STRIDE:
+            raise ValueError("block_size must be a positive multiple of {}".format(FEATURE_STRIDE))
+        self.model = model
+        self.block_size = block_size
+        self.block_threshold = block_threshold
+        self.refresh_fraction = refresh_fraction
+        self.keyframe_interval = keyframe_interval
+        self.margin = margin
+        self.counts = {mode: 0 for mode in TEMPORAL_MODES}
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget the cached frame; the next call is a keyframe."""
+        self._reference: Optional[torch.Tensor] = None
+        self._features: Optional[List[NestedTensor]] = None
+        self._poss: Optional[List[torch.Tensor]] = None
+        self._outputs: Optional[Dict[str, torch.Tensor]] = None
+        self._text_key: Optional[Hashable] = None
+        self._since_keyframe = 0
+
+    def changed_blocks(self, image: torch.Tensor) -> torch.Tensor:
+        """Boolean (ceil(H / block_size), ceil(W / block_size)) grid of changed blocks."""
+        diff = (image - self._reference).abs().mean(0, keepdim=True)
+        pooled = F.avg_pool2d(diff[None], self.block_size, ceil_mode=True)
+        return pooled[0, 0] > self.block_threshold
+
+    def _changed_box(self, changed: torch.Tensor) -> Optional[Tuple[int, int, int, int]]:
+        rows = changed.any(dim=1).nonzero()
+        cols = changed.any(dim=0).nonzero()
+        if rows.numel() == 0:
+            return None
+        return int(rows[0]), int(rows[-1]) + 1, int(cols[0]), int(cols[-1]) + 1
+
+    @torch.no_grad()
+    def __call__(
+        self,
+        image: torch.Tensor,
+        text_dict: Dict[str, torch.Tensor],
+        text_key: Hashable = None,
+    ) -> Tuple[Dict[str, torch.Tensor], str]:
+        """Model outputs for ``image`` (3, H, W, preprocessed) and the path taken.
+
+        ``text_key`` identifies ``text_dict`` (e.g. the caption); outputs are only reused
+        for the same key, cached backbone features for any text.
+        """
+        mode, box = self._plan(image, text_key)
+        if mode == "reuse":
+            self._since_keyframe += 1
+            self.counts[mode] += 1
+            return self._outputs, mode
+
+        samples = nested_tensor_from_tensor_list([image])
+        if mode == "keyframe":
+            with profile_stage("backbone"):
+                features, poss = self.model.backbone(samples)
+            self._features, self._poss = list(features), list(poss)
+            self._reference = image.clone()
+            self._since_keyframe = 1
+        else:
+            if box is not None:
+                self._splice(image, box)
+            self._since_keyframe += 1
+
+        self.model.set_image_features(list(self._features), list(self._poss))
+        outputs = self.model(samples, text_dict=text_dict, unset_image_tensor=True, compact_logits=True)
+        self._outputs = outputs
+        self._text_key = text_key
+        self.counts[mode] += 1
+        return outputs, mode
+
+    def _plan(self, image: torch.Tensor, text_key: Hashable) -> Tuple[str, Optional[Tuple[int, int, int, int]]]:
+        if (
+            self._reference is None
+            or self._reference.shape != image.shape
+            or (self.keyframe_interval > 0 and self._since_keyframe >= self.keyframe_interval)
+        ):
+            return "keyframe", None
+        box = self._changed_box(self.changed_blocks(image))
+        if box is None:
+            return ("reuse" if text_key == self._text_key else "partial"), None
+        height, width = image.shape[-2:]
+        r0, r1, c0, c1 = self._crop_blocks(box, image)
+        area = min(r1 * self.block_size, height) - r0 * self.block_size
+        area *= min(c1 * self.block_size, width) - c0 * self.block_size
+        if area > self.refresh_fraction * height * width:
+            return "keyframe", None
+        return "partial", box
+
+    def _crop_blocks(self, box: Tuple[int, int, int, int], image: torch.Tensor) -> Tuple[int, int, int, int]:
+        rows = math.ceil(image.shape[-2] / self.block_size)
+        cols = math.ceil(image.shape[-1] / self.block_size)
+        r0, r1, c0, c1 = box
+        return (
+            max(0, r0 - self.margin),
+            min(rows, r1 + self.margin),
+            max(0, c0 - self.margin),
+            min(cols, c1 + self.margin),
+        )
+
+    def _splice(self, image: torch.Tensor, box: Tuple[int, int, int, int]) -> None:
+        """Recompute the features of the changed blocks from a crop with context margin."""
+        size = self.block_size
+        height, width = image.shape[-2:]
+        r0, r1, c0, c1 = box
+        cr0, cr1, cc0, cc1 = self._crop_blocks(box, image)
+        y0, x0 = cr0 * size, cc0 * size
+        crop = image[:, y0 : min(cr1 * size, height), x0 : min(cc1 * size, width)]
+        with profile_stage("backbone"):
+            crop_features = list(self.model.backbone[0](nested_tensor_from_tensor_list([crop])).values())
+
+        # consecutive levels ending at FEATURE_STRIDE (8/16/32 for return_interm_indices [1, 2, 3])
+        num_levels = len(self._features)
+        iy0, iy1 = r0 * size, min(r1 * size, height)
+        ix0, ix1 = c0 * size, min(c1 * size, width)
+        for level, (cached, fresh) in enumerate(zip(self._features, crop_features)):
+            stride = FEATURE_STRIDE // 2 ** (num_levels - 1 - level)
+            fy0, fy1 = iy0 // stride, math.ceil(iy1 / stride)
+            fx0, fx1 = ix0 // stride, math.ceil(ix1 / stride)
+            oy, ox = y0 // stride, x0 // stride
+            cached.tensors[..., fy0:fy1, fx0:fx1] = fresh.tensors[..., fy0 - oy : fy1 - oy, fx0 - ox : fx1 - ox]
+        self._reference[:, iy0:iy1, ix0:ix1] = image[:, iy0:iy1, ix0:ix1]
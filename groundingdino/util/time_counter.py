@@ -1,4 +1,9 @@
+import bisect
+import contextlib
+import contextvars
+import itertools
 import json
+import threading
 import time
 
 
@@ -60,3 +65,138 @@ class AverageMeter(object):
         else:
             fmtstr = "{name} {val" + self.fmt + "} ({avg" + self.fmt + "})"
         return fmtstr.format(**self.__dict__)
+
+
+# ----------------------------------------------------------------------------------------------------------------------
+# Per-stage latency profiling
+# ----------------------------------------------------------------------------------------------------------------------
+
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    """Histogram of durations in seconds with Prometheus-style `le` buckets."""
+
+    def __init__(self, buckets=DEFAULT_LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # the last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        return list(itertools.accumulate(self.counts))
+
+    def copy(self):
+        other = LatencyHistogram(self.buckets)
+        other.counts = list(self.counts)
+        other.sum = self.sum
+        other.count = self.count
+        return other
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        if self.profiler.sync_cuda:
+            _cuda_synchronize()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self.profiler.sync_cuda:
+            _cuda_synchronize()
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def _cuda_synchronize():
+    import torch
+
+    if torch.cuda.is_available():
+        torch.cuda.synchronize()
+
+
+class StageProfiler:
+    """
+    Opt-in wall-time profiler for named inference stages.
+
+    Stages are aggregated into one `LatencyHistogram` per name, and additionally summed per
+    request inside a `collect()` block. While disabled (the default) `stage()` hands out a
+    shared no-op context manager, so instrumentation can stay in the hot path. CUDA kernels
+    run asynchronously; set `sync_cuda` to synchronize around stages when measuring on GPU.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.sync_cuda = False
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._request = contextvars.ContextVar("stage_timings", default=None)
+
+    def configure(self, enabled: bool = True, sync_cuda: bool = False):
+        self.enabled = enabled
+        self.sync_cuda = sync_cuda
+
+    def stage(self, name: str, index=None):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name if index is None else "{}.{}".format(name, index))
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = LatencyHistogram()
+            histogram.observe(seconds)
+        timings = self._request.get()
+        if timings is not None:
+            timings[name] = timings.get(name, 0.0) + seconds
+
+    @contextlib.contextmanager
+    def collect(self):
+        """Yield a dict that receives the stage timings (seconds) recorded in this context."""
+        timings = {}
+        token = self._request.set(timings)
+        try:
+            yield timings
+        finally:
+            self._request.reset(token)
+
+    def histograms(self):
+        with self._lock:
+            return {name: histogram.copy() for name, histogram in self._histograms.items()}
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}
+
+
+PROFILER = StageProfiler()
+
+
+def profile_stage(name: str, index=None):
+    """`with profile_stage("backbone"):` times the block when profiling is enabled."""
+    return PROFILER.stage(name, index)
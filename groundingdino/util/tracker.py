@@ -0,0 +1,209 @@
+"""SORT-style multi-object tracking on top of GroundingDINO detections.
+
+Each track runs a constant-velocity Kalman filter on its box; detections are assigned to
+the predicted boxes by IoU (Hungarian matching). Between two detector runs the tracks are
+only propagated by their filters, so a video can be detected every few frames while every
+frame still gets boxes with stable ids. Boxes are normalized cxcywh, as the model outputs.
+"""
+from collections import Counter
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+import torch
+
+from groundingdino.util import box_ops
+
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:  # pragma: no cover - scipy comes with supervision
+    linear_sum_assignment = None
+
+# the filter noise below is tuned (as in SORT) for pixel units; normalized boxes are
+# scaled to a 1000 pixel frame internally
+_SCALE = 1000.0
+
+
+class KalmanBoxFilter:
+    """Kalman filter with state (cx, cy, area, aspect, d_cx, d_cy, d_area), one step per frame."""
+
+    _F = np.eye(7)
+    _F[0, 4] = _F[1, 5] = _F[2, 6] = 1.0
+    _H = np.eye(4, 7)
+    _Q = np.diag([1.0, 1.0, 1.0, 1.0, 0.01, 0.01, 0.0001])
+    _R = np.diag([1.0, 1.0, 10.0, 10.0])
+
+    def __init__(self, box: Sequence[float]) -> None:
+        self.x = np.zeros(7)
+        self.x[:4] = self._to_measurement(box)
+        self.P = np.diag([10.0, 10.0, 10.0, 10.0, 1e4, 1e4, 1e4])
+
+    @staticmethod
+    def _to_measurement(box: Sequence[float]) -> np.ndarray:
+        cx, cy, w, h = (float(v) * _SCALE for v in box)
+        return np.array([cx, cy, w * h, w / max(h, 1e-6)])
+
+    def predict(self) -> None:
+        if self.x[2] + self.x[6] <= 0:
+            self.x[6] = 0.0
+        self.x = self._F @ self.x
+        self.P = self._F @ self.P @ self._F.T + self._Q
+
+    def update(self, box: Sequence[float]) -> None:
+        residual = self._to_measurement(box) - self._H @ self.x
+        covariance = self._H @ self.P @ self._H.T + self._R
+        gain = self.P @ self._H.T @ np.linalg.inv(covariance)
+        self.x = self.x + gain @ residual
+        self.P = (np.eye(7) - gain @ self._H) @ self.P
+
+    def box(self) -> List[float]:
+        area, aspect = max(self.x[2], 0.0), max(self.x[3], 1e-6)
+        w = np.sqrt(area * aspect)
+        h = area / w if w > 0 else 0.0
+        return [self.x[0] / _SCALE, self.x[1] / _SCALE, w / _SCALE, h / _SCALE]
+
+
+class Track:
+    """One tracked object: filtered box, detector score and the phrases it was matched with."""
+
+    def __init__(self, track_id: int, box: Sequence[float], score: float, phrase: str) -> None:
+        self.id = track_id
+        self.score = score
+        self.hits = 1
+        self.misses = 0  # detector runs in a row without a matching detection
+        self.frames_since_update = 0
+        self._filter = KalmanBoxFilter(box)
+        self._phrases = Counter({phrase: score})
+
+    @property
+    def box(self) -> List[float]:
+        return self._filter.box()
+
+    @property
+    def label(self) -> str:
+        """Phrase with the highest accumulated score, stable against one-off mislabels."""
+        return self._phrases.most_common(1)[0][0]
+
+    def confidence(self, decay: float) -> float:
+        return self.score * decay ** self.frames_since_update
+
+    def predict(self) -> None:
+        self._filter.predict()
+        self.frames_since_update += 1
+
+    def update(self, box: Sequence[float], score: float, phrase: str) -> None:
+        self._filter.update(box)
+        self.score = score
+        self.hits += 1
+        self.misses = 0
+        self.frames_since_update = 0
+        self._phrases[phrase] += score
+
+
+def _match(ious: torch.Tensor, iou_threshold: float) -> List[Tuple[int, int]]:
+    if ious.numel() == 0:
+        return []
+    if linear_sum_assignment is not None:
+        rows, cols = linear_sum_assignment(-ious.numpy())
+        pairs = zip(rows.tolist(), cols.tolist())
+    else:  # greedy by decreasing IoU
+        order = ious.flatten().argsort(descending=True).tolist()
+        used_rows, used_cols, pairs = set(), set(), []
+        for flat in order:
+            row, col = divmod(flat, ious.shape[1])
+            if row not in used_rows and col not in used_cols:
+                used_rows.add(row)
+                used_cols.add(col)
+                pairs.append((row, col))
+    return [(row, col) for row, col in pairs if ious[row, col] >= iou_threshold]
+
+
+class ObjectTracker:
+    """Assign ids to detections and propagate them between detector runs.
+
+    Per frame call ``should_detect()``: when True run the detector and pass its output to
+    ``update``, otherwise call ``propagate``. The detector is due every ``detect_every``
+    frames, or earlier once a track's confidence (its last score, decayed by
+    ``confidence_decay`` per frame without a detection) drops below ``min_confidence``.
+    Tracks unmatched for more than ``max_misses`` detector runs are dropped; tracks are
+    reported once they were matched ``min_hits`` times.
+    """
+
+    def __init__(
+        self,
+        detect_every: int = 5,
+        iou_threshold: float = 0.3,
+        max_misses: int = 1,
+        min_hits: int = 1,
+        min_confidence: float = 0.1,
+        confidence_decay: float = 0.95,
+    ) -> None:
+        self.detect_every = max(1, detect_every)
+        self.iou_threshold = iou_threshold
+        self.max_misses = max_misses
+        self.min_hits = min_hits
+        self.min_confidence = min_confidence
+        self.confidence_decay = confidence_decay
+        self.reset()
+
+    def reset(self) -> None:
+        self.tracks: List[Track] = []
+        self.tracks_created = 0
+        self._frames_since_detection: Optional[int] = None
+
+    def should_detect(self) -> bool:
+        if self._frames_since_detection is None or self._frames_since_detection >= self.detect_every:
+            return True
+        return any(
+            track.confidence(self.confidence_decay) < self.min_confidence for track in self.active_tracks()
+        )
+
+    def active_tracks(self) -> List[Track]:
+        return [track for track in self.tracks if track.hits >= self.min_hits]
+
+    def propagate(self) -> List[Track]:
+        """Advance every track by one frame without a detection."""
+        for track in self.tracks:
+            track.predict()
+        if self._frames_since_detection is not None:
+            self._frames_since_detection += 1
+        return self.active_tracks()
+
+    def update(self, boxes: torch.Tensor, scores: torch.Tensor, phrases: Sequence[str]) -> List[Track]:
+        """Advance by one frame and match this frame's detections (cxcywh, normalized)."""
+        for track in self.tracks:
+            track.predict()
+        boxes = boxes.detach().cpu().float().reshape(-1, 4)
+        scores = scores.detach().cpu().float().reshape(-1)
+
+        matches: List[Tuple[int, int]] = []
+        if self.tracks and len(boxes):
+            predicted = torch.tensor([track.box for track in self.tracks], dtype=torch.float32)
+            ious, _ = box_ops.box_iou(
+                box_ops.box_cxcywh_to_xyxy(predicted), box_ops.box_cxcywh_to_xyxy(boxes)
+            )
+            matches = _match(ious, self.iou_threshold)
+
+        matched_tracks = {row for row, _ in matches}
+        matched_detections = {col for _, col in matches}
+        for row, col in matches:
+            self.tracks[row].update(boxes[col].tolist(), float(scores[col]), phrases[col])
+        for row, track in enumerate(self.tracks):
+            if row not in matched_tracks:
+                track.misses += 1
+        self.tracks = [track for track in self.tracks if track.misses <= self.max_misses]
+        for col in range(len(boxes)):
+            if col not in matched_detections:
+                self.tracks_created += 1
+                self.tracks.append(
+                    Track(self.tracks_created, boxes[col].tolist(), float(scores[col]), phrases[col])
+                )
+        self._frames_since_detection = 1
+        return self.active_tracks()
+
+    def to_tensors(self, tracks: Sequence[Track]) -> Tuple[torch.Tensor, torch.Tensor, List[str], List[int]]:
+        """Boxes, decayed confidences, labels and ids, in the layout `predict` returns."""
+        boxes = torch.tensor([track.box for track in tracks], dtype=torch.float32).reshape(-1, 4)
+        confidences = torch.tensor(
+            [track.confidence(self.confidence_decay) for track in tracks], dtype=torch.float32
+        )
+        return boxes, confidences, [track.label for track in tracks], [track.id for track in tracks]
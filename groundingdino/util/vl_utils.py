@@ -98,3 +98,43 @@ def build_id2posspan_and_caption(category_dict: dict):
     caption, cat2posspan = build_captions_and_token_span(cat_list, force_lowercase=True)
     id2posspan = {catid: cat2posspan[catname] for catid, catname in id2catname.items()}
     return id2posspan, caption
+
+
+def build_chunked_captions_and_token_span(cat_list, tokenizer, max_text_len=256, force_lowercase=True):
+    """Split cat_list into captions that each fit into max_text_len tokens.
+
+    Categories are packed greedily in order, so a chunk never splits a category.
+    Return:
+        chunks: list of (caption, class_ids, token_spans)
+            - caption: str, formatted like build_captions_and_token_span
+            - class_ids: indices into cat_list of the categories in this caption
+            - token_spans: char spans of each category, aligned with class_ids
+    """
+    budget = max_text_len - 2  # [CLS] and [SEP]
+    chunks = []
+    captions, class_ids, token_spans, num_tokens = "", [], [], 0
+    for class_id, catname in enumerate(cat_list):
+        sub_caption, cat2tokenspan = build_captions_and_token_span([catname], force_lowercase)
+        if len(cat2tokenspan) == 0:
+            continue
+        sub_num_tokens = len(tokenizer.tokenize(sub_caption))
+        if sub_num_tokens > budget:
+            raise ValueError(
+                "category '{}' needs {} tokens, more than max_text_len allows".format(
+                    catname, sub_num_tokens
+                )
+            )
+        if len(class_ids) > 0 and num_tokens + sub_num_tokens > budget:
+            chunks.append((captions, class_ids, token_spans))
+            captions, class_ids, token_spans, num_tokens = "", [], [], 0
+
+        offset = len(captions) + 1 if len(captions) > 0 else 0
+        (spans,) = cat2tokenspan.values()
+        token_spans.append([[beg + offset, end + offset] for beg, end in spans])
+        class_ids.append(class_id)
+        captions = captions + " " + sub_caption if len(captions) > 0 else sub_caption
+        num_tokens += sub_num_tokens
+
+    if len(class_ids) > 0:
+        chunks.append((captions, class_ids, token_spans))
+    return chunks
@@ -2,17 +2,23 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Tuple
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
 
 import numpy as np
 import torch
 
+from groundingdino.util.engine import ExecutionEngine
 from groundingdino.util.inference import (
+    RawPrediction,
     annotate,
+    filter_raw_prediction,
     load_image,
     load_model,
-    predict,
+    predict_caption_score,
+    predict_tiled,
+    predict_with_class_chunks,
 )
+from groundingdino.util.prompt_bank import PromptBank
 
 
 @dataclass
@@ -31,26 +37,117 @@ class GroundingDinoModelAdapter:
         config_path: Path,
         weights_path: Path,
         device: str = "cuda",
+        prompt_bank_path: Optional[Path] = None,
+        model: Optional[torch.nn.Module] = None,
+        final_layer_heads: bool = True,
+        on_prompt_bank_lookup: Optional[Callable[[str], None]] = None,
     ) -> None:
+        """Pass an already built ``model`` (e.g. random-init for benchmarks) to skip loading.
+
+        ``on_prompt_bank_lookup`` is called with ``"hit"`` or ``"miss"`` whenever a caption
+        is matched against the prompt bank, e.g. to count lookups in the service metrics.
+
+        ``final_layer_heads`` runs the box and class heads on the last decoder layer only;
+        the detections are the same, the discarded intermediate predictions are skipped.
+        The model stays on the resolved device and runs through an ``ExecutionEngine``.
+        """
         self.device = device
-        self._model = load_model(
-            model_config_path=str(config_path),
-            model_checkpoint_path=str(weights_path),
-            device=device,
-        )
+        if model is None:
+            model = load_model(
+                model_config_path=str(config_path),
+                model_checkpoint_path=str(weights_path),
+                device=device,
+            )
+            self.model_version = self._file_version(config_path, weights_path)
+        else:
+            self.model_version = f"in-memory-{id(model):x}"
+        self._model = model
+        self._model.final_layer_heads = final_layer_heads
+        self._engine = ExecutionEngine(self._model, self.resolve_device())
+        self._prompt_bank: Optional[PromptBank] = None
+        self._prompt_bank_classes: Optional[List[str]] = None
+        self._on_prompt_bank_lookup = on_prompt_bank_lookup
+        if prompt_bank_path is not None:
+            self.set_prompt_bank(PromptBank.load(prompt_bank_path))
 
     @property
     def model(self):
         return self._model
 
+    @staticmethod
+    def _file_version(*paths: Path) -> str:
+        """Changes whenever the config or checkpoint file is replaced (path, size, mtime)."""
+        parts = []
+        for path in paths:
+            try:
+                stat = Path(path).stat()
+            except OSError:
+                parts.append(f"{path}:missing")
+                continue
+            parts.append(f"{Path(path).resolve()}:{stat.st_size}:{stat.st_mtime_ns}")
+        return "|".join(parts)
+
     def resolve_device(self) -> str:
         if self.device == "cuda" and not torch.cuda.is_available():
             return "cpu"
         return self.device
 
+    @property
+    def prompt_bank(self) -> Optional[PromptBank]:
+        return self._prompt_bank
+
+    def set_prompt_bank(self, prompt_bank: Optional[PromptBank]) -> None:
+        """Serve captions naming exactly the bank's classes from the precomputed text encoding."""
+        if prompt_bank is None:
+            self._prompt_bank = None
+            self._prompt_bank_classes = None
+            return
+        self._prompt_bank = prompt_bank.to(self.resolve_device())
+        self._prompt_bank_classes = self._split_caption(". ".join(prompt_bank.classes))
+
+    @staticmethod
+    def _split_caption(caption: str) -> List[str]:
+        return [part.strip().lower() for part in caption.split(".") if part.strip()]
+
+    def build_prompt_bank(self, caption: str) -> PromptBank:
+        """Encode the classes of ``caption`` once, e.g. to reuse across video frames."""
+        return PromptBank.build(
+            self._model, self._split_caption(caption), device=self.resolve_device()
+        )
+
+    def _match_prompt_bank(self, caption: str) -> Optional[PromptBank]:
+        if self._prompt_bank is None:
+            return None
+        hit = self._split_caption(caption) == self._prompt_bank_classes
+        if self._on_prompt_bank_lookup is not None:
+            self._on_prompt_bank_lookup("hit" if hit else "miss")
+        return self._prompt_bank if hit else None
+
     def load_image(self, image_path: Path) -> Tuple[np.ndarray, torch.Tensor]:
         return load_image(str(image_path))
 
+    def prefilter_score(
+        self,
+        image_path: Path,
+        caption: str,
+        *,
+        short_side: int = 400,
+        encoder_only: bool = True,
+    ) -> float:
+        """Cheap relevance score of ``caption`` for an image, computed at reduced resolution."""
+        _, image = load_image(
+            str(image_path),
+            size=short_side,
+            max_size=int(round(short_side * 1333 / 800)),
+        )
+        return predict_caption_score(
+            model=self._model,
+            image=image,
+            caption=caption,
+            device=self.resolve_device(),
+            encoder_only=encoder_only,
+        )
+
     def predict(
         self,
         *,
@@ -58,15 +155,151 @@ class GroundingDinoModelAdapter:
         caption: str,
         box_threshold: float,
         text_threshold: float,
+        prompt_bank: Optional[PromptBank] = None,
     ) -> PredictionResult:
+        """An explicit ``prompt_bank`` (see ``build_prompt_bank``) takes precedence over
+        the adapter's own bank and ``caption``."""
         device = self.resolve_device()
-        boxes, logits, phrases = predict(
+        if prompt_bank is None:
+            prompt_bank = self._match_prompt_bank(caption)
+        if prompt_bank is not None and len(prompt_bank) > 1:
+            boxes, logits, class_ids = predict_with_class_chunks(
+                model=self._model,
+                image=self._engine.to_device(image),
+                classes=None,
+                box_threshold=box_threshold,
+                text_threshold=text_threshold,
+                device=device,
+                prompt_bank=prompt_bank,
+            )
+            phrases = [prompt_bank.classes[class_id] for class_id in class_ids.tolist()]
+        else:
+            boxes, logits, phrases = self._engine.predict(
+                image,
+                caption,
+                box_threshold=box_threshold,
+                text_threshold=text_threshold,
+                prompt_bank=prompt_bank,
+            )
+        return PredictionResult(
+            boxes=boxes,
+            logits=logits,
+            phrases=phrases,
+        )
+
+    def predict_many(
+        self,
+        *,
+        images: Iterable[torch.Tensor],
+        caption: str,
+        box_threshold: float,
+        text_threshold: float,
+        prompt_bank: Optional[PromptBank] = None,
+    ) -> Iterator[PredictionResult]:
+        """``predict`` for a stream of images of one caption; on CUDA the next image is
+        uploaded while the current one runs. Captions spanning several text chunks fall
+        back to one ``predict`` per image."""
+        if prompt_bank is None:
+            prompt_bank = self._match_prompt_bank(caption)
+        if prompt_bank is not None and len(prompt_bank) > 1:
+            for image in images:
+                yield self.predict(
+                    image=image,
+                    caption=caption,
+                    box_threshold=box_threshold,
+                    text_threshold=text_threshold,
+                    prompt_bank=prompt_bank,
+                )
+            return
+        for boxes, logits, phrases in self._engine.predict_many(
+            images,
+            caption,
+            box_threshold=box_threshold,
+            text_threshold=text_threshold,
+            prompt_bank=prompt_bank,
+        ):
+            yield PredictionResult(boxes=boxes, logits=logits, phrases=phrases)
+
+    def predict_raw(
+        self,
+        *,
+        image: torch.Tensor,
+        caption: str,
+        top_k: int = 0,
+        token_floor: float = 0.0,
+    ) -> Optional[RawPrediction]:
+        """Pre-threshold output for caching, compacted on the device with ``top_k`` and
+        ``token_floor`` (see ``RawPrediction.compact``); None when the caption needs
+        several text chunks."""
+        prompt_bank = self._match_prompt_bank(caption)
+        if prompt_bank is not None and len(prompt_bank) > 1:
+            return None
+        return self._engine.predict_raw(
+            image, caption, prompt_bank=prompt_bank, top_k=top_k, token_floor=token_floor
+        )
+
+    def predict_raw_many(
+        self,
+        *,
+        images: Iterable[torch.Tensor],
+        caption: str,
+        top_k: int = 0,
+        token_floor: float = 0.0,
+    ) -> Iterator[Optional[RawPrediction]]:
+        """``predict_raw`` for a stream of images of one caption, uploading the next image
+        while the current one runs."""
+        prompt_bank = self._match_prompt_bank(caption)
+        if prompt_bank is not None and len(prompt_bank) > 1:
+            for _ in images:
+                yield None
+            return
+        yield from self._engine.predict_raw_many(
+            images, caption, prompt_bank=prompt_bank, top_k=top_k, token_floor=token_floor
+        )
+
+    def filter_raw(
+        self,
+        raw: RawPrediction,
+        *,
+        box_threshold: float,
+        text_threshold: float,
+    ) -> PredictionResult:
+        boxes, logits, phrases = filter_raw_prediction(
+            raw,
+            self._model.tokenizer,
+            box_threshold=box_threshold,
+            text_threshold=text_threshold,
+        )
+        return PredictionResult(boxes=boxes, logits=logits, phrases=phrases)
+
+    def predict_tiled(
+        self,
+        *,
+        image_source: np.ndarray,
+        caption: str,
+        box_threshold: float,
+        text_threshold: float,
+        tile_size: int,
+        overlap: float = 0.2,
+        batch_size: int = 4,
+        merge: str = "nms",
+        iou_threshold: float = 0.5,
+        full_image_pass: bool = True,
+    ) -> PredictionResult:
+        """Detect on overlapping native-resolution tiles of ``image_source`` (RGB)."""
+        boxes, logits, phrases = predict_tiled(
             model=self._model,
-            image=image,
+            image_source=image_source,
             caption=caption,
             box_threshold=box_threshold,
             text_threshold=text_threshold,
-            device=device,
+            device=self.resolve_device(),
+            tile_size=tile_size,
+            tile_overlap=overlap,
+            batch_size=batch_size,
+            merge=merge,
+            iou_threshold=iou_threshold,
+            full_image_pass=full_image_pass,
         )
         return PredictionResult(
             boxes=boxes,
@@ -81,11 +314,13 @@ class GroundingDinoModelAdapter:
         boxes: torch.Tensor,
         logits: torch.Tensor,
         phrases: List[str],
+        out: Optional[np.ndarray] = None,
     ) -> np.ndarray:
         return annotate(
             image_source=image_source,
             boxes=boxes,
             logits=logits,
             phrases=phrases,
+            out=out,
         )
 
@@ -2,9 +2,11 @@ from __future__ import annotations
 
 import argparse
 import json
+import sys
 from pathlib import Path
 from typing import Iterable, Iterator, List, Sequence
 
+from src.services.dedup import DEDUP_MODES, group_images
 from src.services.factory import create_detection_service
 
 
@@ -47,6 +49,19 @@ def parse_args(argv: Iterable[str] | None = None) -> argparse.Namespace:
         default=None,
         help="Override detection text threshold.",
     )
+    parser.add_argument(
+        "--dedup",
+        choices=DEDUP_MODES,
+        default="exact",
+        help="Detect byte-identical ('exact') or also visually near-identical ('near') "
+        "images once and copy the result to their duplicates.",
+    )
+    parser.add_argument(
+        "--near-dup-distance",
+        type=int,
+        default=4,
+        help="Max Hamming distance between 64-bit perceptual hashes for --dedup near.",
+    )
     return parser.parse_args(argv)
 
 
@@ -64,37 +79,52 @@ def run_batch(argv: Iterable[str] | None = None) -> None:
     service = create_detection_service()
     results: List[dict] = []
 
-    for image_path in sorted(set(iter_images(directory, args.patterns))):
-        if not image_path.is_file():
-            continue
-        detection = service.detect_from_path(
-            image_path=image_path,
-            caption=args.text,
-            box_threshold=args.box_threshold,
-            text_threshold=args.text_threshold,
-        )
-        payload = {
-            "image": str(image_path),
-            "detections": [
-                {
-                    "box": det.box,
-                    "label": det.label,
-                    "score": det.score,
-                }
-                for det in detection.items
-            ],
-            "annotated": str(detection.annotated_path)
-            if detection.annotated_path
-            else None,
-        }
-        results.append(payload)
-        print(json.dumps(payload, ensure_ascii=False))
+    image_paths = [
+        path for path in sorted(set(iter_images(directory, args.patterns))) if path.is_file()
+    ]
+    groups, report = group_images(
+        image_paths,
+        mode=args.dedup,
+        max_distance=args.near_dup_distance,
+    )
+    detections_per_group = service.detect_many(
+        image_paths=[group.representative for group in groups],
+        caption=args.text,
+        box_threshold=args.box_threshold,
+        text_threshold=args.text_threshold,
+    )
+    for group, detection in zip(groups, detections_per_group):
+        annotated_path = detection.resolve_annotated_path()
+        detections = [
+            {
+                "box": det.box,
+                "label": det.label,
+                "score": det.score,
+            }
+            for det in detection.items
+        ]
+        for image_path in group.members:
+            payload = {
+                "image": str(image_path),
+                "detections": detections,
+                "annotated": str(annotated_path) if annotated_path else None,
+                "duplicate_of": (
+                    str(group.representative) if image_path != group.representative else None
+                ),
+            }
+            results.append(payload)
+            print(json.dumps(payload, ensure_ascii=False))
+
+    summary = report.to_dict()
+    print(json.dumps({"dedup": summary}, ensure_ascii=False), file=sys.stderr)
 
     if args.output:
         args.output.parent.mkdir(parents=True, exist_ok=True)
         with args.output.open("w", encoding="utf-8") as fh:
             for record in results:
                 fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+        report_path = args.output.with_name(args.output.stem + ".dedup.json")
+        report_path.write_text(json.dumps(summary, ensure_ascii=False, indent=2), encoding="utf-8")
 
 
 if __name__ == "__main__":
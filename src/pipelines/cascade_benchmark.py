@@ -0,0 +1,203 @@
+"""Benchmark cascaded (prefiltered) gallery search against a full scan."""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from config.runtime import get_settings
+from src.adapters.grounding_dino import GroundingDinoModelAdapter
+from src.pipelines.batch_scan import iter_images
+from src.services.detection_service import DetectionService
+from src.services.prefilter import (
+    GalleryPrefilter,
+    build_adapter_prefilter,
+    build_grounding_dino_prefilter,
+)
+
+
+def parse_args(argv: Iterable[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Run a full GroundingDINO scan and compare it with prefiltered scans: "
+            "fraction of images pruned, recall of images with detections and speedup."
+        ),
+    )
+    parser.add_argument(
+        "--input-dir",
+        type=Path,
+        required=True,
+        help="Directory containing images to scan.",
+    )
+    parser.add_argument(
+        "--text",
+        required=True,
+        help='Caption to search for (e.g. "chips . snack . bottle").',
+    )
+    parser.add_argument(
+        "--patterns",
+        nargs="*",
+        default=["*.jpg", "*.png", "*.jpeg", "*.bmp", "*.webp"],
+        help="Glob patterns (relative to input directory) to include.",
+    )
+    parser.add_argument(
+        "--modes",
+        nargs="+",
+        default=["encoder", "downscale"],
+        choices=["encoder", "downscale", "omdet"],
+        help="Prefilter stages to evaluate.",
+    )
+    parser.add_argument(
+        "--thresholds",
+        nargs="+",
+        type=float,
+        default=[0.1, 0.15, 0.2],
+        help="Prefilter score thresholds to evaluate.",
+    )
+    parser.add_argument(
+        "--min-keep-fraction",
+        type=float,
+        default=0.0,
+        help="Recall guard: always keep at least this fraction of images.",
+    )
+    parser.add_argument(
+        "--short-side",
+        type=int,
+        default=400,
+        help="Image short side used by the GroundingDINO prefilter stages.",
+    )
+    parser.add_argument(
+        "--box-threshold",
+        type=float,
+        default=None,
+        help="Override detection box threshold for the full pass.",
+    )
+    parser.add_argument(
+        "--text-threshold",
+        type=float,
+        default=None,
+        help="Override detection text threshold for the full pass.",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="Optional JSON file for the report.",
+    )
+    return parser.parse_args(argv)
+
+
+def _build_omdet_adapter():
+    from src.services.factory import _maybe_build_omdet_turbo_adapter
+
+    omdet_adapter = _maybe_build_omdet_turbo_adapter(get_settings())
+    if omdet_adapter is None:
+        raise ValueError("Prefilter mode 'omdet' requires OmDet Turbo to be configured.")
+    return omdet_adapter
+
+
+def _build_prefilter(
+    mode: str,
+    threshold: float,
+    args: argparse.Namespace,
+    adapter: GroundingDinoModelAdapter,
+    omdet_adapter=None,
+) -> GalleryPrefilter:
+    if mode == "omdet":
+        return build_adapter_prefilter(
+            omdet_adapter,
+            threshold=threshold,
+            min_keep_fraction=args.min_keep_fraction,
+        )
+    return build_grounding_dino_prefilter(
+        adapter,
+        mode=mode,
+        threshold=threshold,
+        min_keep_fraction=args.min_keep_fraction,
+        short_side=args.short_side,
+    )
+
+
+def run_benchmark(argv: Iterable[str] | None = None) -> dict:
+    args = parse_args(argv)
+    directory = args.input_dir.expanduser().resolve()
+    if not directory.exists():
+        raise FileNotFoundError(f"Input directory not found: {directory}")
+
+    settings = get_settings()
+    adapter = GroundingDinoModelAdapter(
+        config_path=settings.model_config_path,
+        weights_path=settings.weights_path,
+        device=settings.device,
+    )
+    service = DetectionService(
+        model_adapter=adapter,
+        model_name="grounding_dino",
+        images_dir=settings.images_dir,
+        results_dir=settings.results_dir,
+        search_dir=directory,
+        default_box_threshold=settings.box_threshold,
+        default_text_threshold=settings.text_threshold,
+        annotate_results=False,
+    )
+    image_paths = [
+        path for path in sorted(set(iter_images(directory, args.patterns))) if path.is_file()
+    ]
+
+    full_seconds: Dict[Path, float] = {}
+    positives = set()
+    for image_path in image_paths:
+        start = time.perf_counter()
+        result = service.detect_from_path(
+            image_path=image_path,
+            caption=args.text,
+            box_threshold=args.box_threshold,
+            text_threshold=args.text_threshold,
+        )
+        full_seconds[image_path] = time.perf_counter() - start
+        if result.items:
+            positives.add(image_path)
+    full_total = sum(full_seconds.values())
+
+    # built once and shared by every threshold
+    omdet_adapter = _build_omdet_adapter() if "omdet" in args.modes else None
+    cascades: List[dict] = []
+    for mode in args.modes:
+        for threshold in args.thresholds:
+            prefilter = _build_prefilter(mode, threshold, args, adapter, omdet_adapter)
+            start = time.perf_counter()
+            selection = prefilter.select(image_paths, args.text)
+            prefilter_seconds = time.perf_counter() - start
+            kept = set(selection.kept)
+            cascade_total = prefilter_seconds + sum(full_seconds[path] for path in kept)
+            record = {
+                "mode": mode,
+                "threshold": threshold,
+                "min_keep_fraction": args.min_keep_fraction,
+                "kept": len(kept),
+                "pruned_fraction": selection.pruned_fraction,
+                "recall": len(positives & kept) / len(positives) if positives else 1.0,
+                "prefilter_seconds": prefilter_seconds,
+                "cascade_seconds": cascade_total,
+                "speedup": full_total / cascade_total if cascade_total else None,
+            }
+            cascades.append(record)
+            print(json.dumps(record, ensure_ascii=False))
+
+    report = {
+        "images": len(image_paths),
+        "images_with_detections": len(positives),
+        "full_seconds": full_total,
+        "cascades": cascades,
+    }
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    return report
+
+
+if __name__ == "__main__":
+    run_benchmark()
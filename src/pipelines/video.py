@@ -0,0 +1,590 @@
+"""Continuous GroundingDINO detection on a video file or camera.
+
+Frames are decoded on a reader thread into a small buffer. For live sources the buffer
+drops its oldest frame when the detector falls behind, so detection always runs on a
+recent frame instead of working through a growing backlog. A scheduler caps detection
+at ``target_fps`` and, for live sources, stretches the interval to the measured
+inference latency. The caption is encoded once (prompt bank) and reused for every frame.
+With ``incremental`` (static cameras) backbone features and outputs are reused across
+frames for unchanged regions, see ``TemporalFeatureCache``. With ``track`` the detector
+runs every few frames and an ``ObjectTracker`` propagates ids and boxes in between.
+
+Detections are written as JSONL (one record per detected frame, boxes normalized
+cxcywh as in the API) and/or drawn onto an output video, where frames between two
+detections show the most recent result.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import IO, Deque, Iterable, Iterator, List, Optional
+
+import cv2
+import numpy as np
+
+from groundingdino.util.inference import Model, raw_prediction_from_outputs
+from groundingdino.util.temporal import TemporalFeatureCache
+from groundingdino.util.tracker import ObjectTracker, Track
+from src.adapters.grounding_dino import PredictionResult
+
+
+@dataclass
+class Frame:
+    index: int
+    timestamp: float  # seconds: stream position, or time since start for live sources
+    image: np.ndarray  # BGR, as decoded by OpenCV
+
+
+@dataclass
+class VideoStats:
+    frames_read: int = 0
+    frames_dropped: int = 0
+    frames_detected: int = 0
+    frames_skipped: int = 0
+    elapsed_sec: float = 0.0
+    mean_latency_ms: float = 0.0
+    temporal: Optional[dict] = None  # frames per TemporalFeatureCache path
+    tracks_created: Optional[int] = None
+
+    def to_dict(self) -> dict:
+        payload = asdict(self)
+        payload["elapsed_sec"] = round(self.elapsed_sec, 3)
+        payload["mean_latency_ms"] = round(self.mean_latency_ms, 2)
+        payload["detect_fps"] = (
+            round(self.frames_detected / self.elapsed_sec, 2) if self.elapsed_sec else 0.0
+        )
+        return payload
+
+
+def is_device_source(source: str) -> bool:
+    return source.isdigit() or source.startswith("/dev/video")
+
+
+def open_capture(source: str) -> cv2.VideoCapture:
+    """``0``/``/dev/video0`` opens a camera, anything else a file or stream URL."""
+    if source.isdigit():
+        capture = cv2.VideoCapture(int(source))
+    elif source.startswith("/dev/video"):
+        capture = cv2.VideoCapture(source, cv2.CAP_V4L2)
+    else:
+        capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        capture.release()
+        raise RuntimeError(f"Cannot open video source: {source}")
+    return capture
+
+
+class FrameReader:
+    """Decode frames from ``capture`` on a background thread.
+
+    With ``drop_stale`` a full buffer discards its oldest frame (live sources); without
+    it the reader waits for the consumer, so every frame of a file is delivered.
+    ``realtime`` stamps frames with the time since start instead of the stream
+    position, and ``pace_fps`` throttles decoding to that rate (replaying a file as if
+    it were a camera).
+    """
+
+    def __init__(
+        self,
+        capture,
+        *,
+        buffer_size: int = 2,
+        drop_stale: bool = True,
+        realtime: bool = True,
+        pace_fps: float = 0.0,
+    ) -> None:
+        self._capture = capture
+        self._buffer: Deque[Frame] = deque()
+        self._buffer_size = max(1, buffer_size)
+        self._drop_stale = drop_stale
+        self._realtime = realtime
+        self._pace_fps = pace_fps
+        self._fps = float(capture.get(cv2.CAP_PROP_FPS) or 0.0)
+        self._cond = threading.Condition()
+        self._stopped = False
+        self._finished = False
+        self._thread = threading.Thread(target=self._run, name="video-reader", daemon=True)
+        self.frames_read = 0
+        self.frames_dropped = 0
+
+    @property
+    def fps(self) -> float:
+        return self._fps
+
+    def start(self) -> "FrameReader":
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: float = 2.0) -> None:
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    def _timestamp(self, index: int, started: float) -> float:
+        if self._realtime:
+            return time.monotonic() - started
+        if self._fps > 0:
+            return index / self._fps
+        return float(self._capture.get(cv2.CAP_PROP_POS_MSEC) or 0.0) / 1000.0
+
+    def _run(self) -> None:
+        started = time.monotonic()
+        index = 0
+        try:
+            while not self._stopped:
+                if self._pace_fps > 0:
+                    delay = started + index / self._pace_fps - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                ok, image = self._capture.read()
+                if not ok or image is None:
+                    break
+                frame = Frame(index=index, timestamp=self._timestamp(index, started), image=image)
+                index += 1
+                with self._cond:
+                    while (
+                        not self._drop_stale
+                        and len(self._buffer) >= self._buffer_size
+                        and not self._stopped
+                    ):
+                        self._cond.wait()
+                    if self._stopped:
+                        break
+                    if len(self._buffer) >= self._buffer_size:
+                        self._buffer.popleft()
+                        self.frames_dropped += 1
+                    self._buffer.append(frame)
+                    self.frames_read += 1
+                    self._cond.notify_all()
+        finally:
+            with self._cond:
+                self._finished = True
+                self._cond.notify_all()
+
+    def __iter__(self) -> Iterator[Frame]:
+        while True:
+            with self._cond:
+                while not self._buffer and not self._finished:
+                    self._cond.wait()
+                if not self._buffer:
+                    return
+                frame = self._buffer.popleft()
+                self._cond.notify_all()
+            yield frame
+
+
+class FrameScheduler:
+    """Decide which frames to run detection on.
+
+    A frame is detected once ``1 / target_fps`` seconds of stream time have passed since
+    the last detected frame (``target_fps`` of 0 detects every frame). With ``adaptive``
+    the interval is at least the moving average of the inference latency plus
+    ``headroom``, so a detector slower than ``target_fps`` skips frames evenly and
+    leaves CPU time for decoding and writing instead of running back to back.
+    """
+
+    def __init__(
+        self,
+        target_fps: float = 0.0,
+        *,
+        adaptive: bool = False,
+        headroom: float = 0.25,
+        smoothing: float = 0.2,
+    ) -> None:
+        self._min_interval = 1.0 / target_fps if target_fps > 0 else 0.0
+        self._adaptive = adaptive
+        self._headroom = headroom
+        self._smoothing = smoothing
+        self._latency: Optional[float] = None
+        self._last: Optional[float] = None
+
+    @property
+    def interval(self) -> float:
+        if self._adaptive and self._latency is not None:
+            return max(self._min_interval, self._latency * (1.0 + self._headroom))
+        return self._min_interval
+
+    def should_detect(self, timestamp: float) -> bool:
+        # small tolerance so 30 fps -> 10 fps picks exactly every third frame
+        if self._last is not None and timestamp < self._last + self.interval - 1e-6:
+            return False
+        self._last = timestamp
+        return True
+
+    def record_latency(self, seconds: float) -> None:
+        if self._latency is None:
+            self._latency = seconds
+        else:
+            self._latency += self._smoothing * (seconds - self._latency)
+
+
+class VideoDetector:
+    """Per-frame detection with the caption encoded once.
+
+    ``temporal`` holds ``TemporalFeatureCache`` options (e.g. ``keyframe_interval``) to
+    reuse features across frames; the caption must then fit into a single text chunk.
+    """
+
+    def __init__(
+        self,
+        adapter,
+        caption: str,
+        *,
+        box_threshold: float = 0.35,
+        text_threshold: float = 0.25,
+        size: int = 800,
+        max_size: int = 1333,
+        temporal: Optional[dict] = None,
+    ) -> None:
+        self._adapter = adapter
+        self._caption = caption
+        self._box_threshold = box_threshold
+        self._text_threshold = text_threshold
+        self._size = size
+        self._max_size = max_size
+        self._prompt_bank = adapter.build_prompt_bank(caption)
+        self.temporal: Optional[TemporalFeatureCache] = None
+        if temporal is not None:
+            if len(self._prompt_bank) != 1:
+                raise ValueError("incremental mode needs a caption that fits into one text chunk")
+            self.temporal = TemporalFeatureCache(adapter.model, **temporal)
+
+    def detect(self, image_bgr: np.ndarray):
+        image = Model.preprocess_image(image_bgr, size=self._size, max_size=self._max_size)
+        if self.temporal is not None:
+            outputs, _ = self.temporal(
+                image.to(self._adapter.resolve_device()),
+                self._prompt_bank.chunk_text_dict(0),
+                text_key=self._caption,
+            )
+            raw = raw_prediction_from_outputs(outputs, self._prompt_bank.input_ids[0])
+            return self._adapter.filter_raw(
+                raw,
+                box_threshold=self._box_threshold,
+                text_threshold=self._text_threshold,
+            )
+        return self._adapter.predict(
+            image=image,
+            caption=self._caption,
+            box_threshold=self._box_threshold,
+            text_threshold=self._text_threshold,
+            prompt_bank=self._prompt_bank,
+        )
+
+
+def prediction_record(frame: Frame, prediction, latency: float) -> dict:
+    return {
+        "frame": frame.index,
+        "timestamp": round(frame.timestamp, 3),
+        "latency_ms": round(latency * 1000.0, 2),
+        "detections": [
+            {
+                "box": [float(v) for v in box.tolist()],
+                "label": str(phrase),
+                "score": float(score),
+            }
+            for box, score, phrase in zip(
+                prediction.boxes.cpu(), prediction.logits.cpu(), prediction.phrases
+            )
+        ],
+    }
+
+
+def tracks_record(frame: Frame, tracker: ObjectTracker, tracks: List[Track], detected: bool, latency: float) -> dict:
+    return {
+        "frame": frame.index,
+        "timestamp": round(frame.timestamp, 3),
+        "detected": detected,
+        "latency_ms": round(latency * 1000.0, 2),
+        "tracks": [
+            {
+                "id": track.id,
+                "box": [float(v) for v in track.box],
+                "label": track.label,
+                "score": round(track.confidence(tracker.confidence_decay), 4),
+            }
+            for track in tracks
+        ],
+    }
+
+
+def run_video(
+    *,
+    adapter,
+    source: str,
+    caption: str,
+    box_threshold: float = 0.35,
+    text_threshold: float = 0.25,
+    target_fps: float = 0.0,
+    realtime: Optional[bool] = None,
+    size: int = 800,
+    buffer_size: int = 2,
+    jsonl: Optional[IO[str]] = None,
+    output_video: Optional[Path] = None,
+    max_frames: int = 0,
+    max_seconds: float = 0.0,
+    temporal: Optional[dict] = None,
+    track: Optional[dict] = None,
+) -> VideoStats:
+    """Run the detection loop until the source ends or a limit is reached.
+
+    ``realtime`` defaults to True for cameras: frames are dropped when detection cannot
+    keep up and the scheduler adapts to the measured latency. Files are processed
+    frame by frame by default; ``realtime=True`` replays them at their native rate.
+    ``temporal`` enables feature reuse with the given ``TemporalFeatureCache`` options.
+    ``track`` (``ObjectTracker`` options such as ``detect_every``) replaces the FPS
+    scheduler: the tracker decides when to detect and every frame gets a record.
+    """
+    if realtime is None:
+        realtime = is_device_source(source)
+    detector = VideoDetector(
+        adapter,
+        caption,
+        box_threshold=box_threshold,
+        text_threshold=text_threshold,
+        size=size,
+        max_size=int(round(size * 1333 / 800)),
+        temporal=temporal,
+    )
+    capture = open_capture(source)
+    reader = FrameReader(
+        capture,
+        buffer_size=buffer_size,
+        drop_stale=realtime,
+        realtime=realtime,
+        pace_fps=capture.get(cv2.CAP_PROP_FPS) if realtime and not is_device_source(source) else 0.0,
+    )
+    scheduler = FrameScheduler(target_fps, adaptive=realtime)
+    tracker = ObjectTracker(**track) if track is not None else None
+    stats = VideoStats()
+    writer = None
+    latest = None
+    latency_total = 0.0
+    started = time.monotonic()
+    reader.start()
+    try:
+        for frame in reader:
+            if max_frames and frame.index >= max_frames:
+                break
+            if max_seconds and time.monotonic() - started >= max_seconds:
+                break
+            image_rgb = None
+            latency = 0.0
+            if tracker is not None:
+                due = tracker.should_detect()
+            else:
+                due = scheduler.should_detect(frame.timestamp)
+            if due:
+                tick = time.perf_counter()
+                prediction = detector.detect(frame.image)
+                latency = time.perf_counter() - tick
+                scheduler.record_latency(latency)
+                latency_total += latency
+                stats.frames_detected += 1
+            else:
+                prediction = None
+                stats.frames_skipped += 1
+
+            record = None
+            if tracker is not None:
+                if prediction is not None:
+                    tracks = tracker.update(prediction.boxes, prediction.logits, prediction.phrases)
+                else:
+                    tracks = tracker.propagate()
+                boxes, confidences, labels, track_ids = tracker.to_tensors(tracks)
+                latest = PredictionResult(
+                    boxes=boxes,
+                    logits=confidences,
+                    phrases=[f"#{track_id} {label}" for track_id, label in zip(track_ids, labels)],
+                )
+                record = tracks_record(frame, tracker, tracks, due, latency)
+            elif prediction is not None:
+                latest = prediction
+                record = prediction_record(frame, prediction, latency)
+            if jsonl is not None and record is not None:
+                jsonl.write(json.dumps(record, ensure_ascii=False) + "\n")
+                jsonl.flush()
+
+            if output_video is not None:
+                if writer is None:
+                    writer = _open_writer(output_video, frame.image, reader.fps or target_fps or 10.0)
+                if latest is not None and len(latest.phrases):
+                    if image_rgb is None:
+                        image_rgb = cv2.cvtColor(frame.image, cv2.COLOR_BGR2RGB)
+                    # draws into the decoded frame's buffer, no per-frame allocation
+                    adapter.annotate(
+                        image_source=image_rgb,
+                        boxes=latest.boxes.cpu(),
+                        logits=latest.logits.cpu(),
+                        phrases=latest.phrases,
+                        out=frame.image,
+                    )
+                writer.write(frame.image)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        reader.stop()
+        capture.release()
+        if writer is not None:
+            writer.release()
+    stats.frames_read = reader.frames_read
+    stats.frames_dropped = reader.frames_dropped
+    stats.elapsed_sec = time.monotonic() - started
+    stats.mean_latency_ms = latency_total * 1000.0 / stats.frames_detected if stats.frames_detected else 0.0
+    if detector.temporal is not None:
+        stats.temporal = dict(detector.temporal.counts)
+    if tracker is not None:
+        stats.tracks_created = tracker.tracks_created
+    return stats
+
+
+def _open_writer(path: Path, first_frame: np.ndarray, fps: float) -> cv2.VideoWriter:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fourcc = "MJPG" if path.suffix.lower() == ".avi" else "mp4v"
+    height, width = first_frame.shape[:2]
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*fourcc), fps, (width, height))
+    if not writer.isOpened():
+        raise RuntimeError(f"Cannot write video: {path}")
+    return writer
+
+
+def parse_args(argv: Iterable[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Run GroundingDINO continuously on a video file or camera.",
+    )
+    parser.add_argument(
+        "--source",
+        required=True,
+        help="Video file, stream URL, camera index (0) or device (/dev/video0).",
+    )
+    parser.add_argument(
+        "--text",
+        required=True,
+        help='Caption to search for (e.g. "person . car").',
+    )
+    parser.add_argument(
+        "--target-fps",
+        type=float,
+        default=2.0,
+        help="Maximum detections per second of video (0 = every frame).",
+    )
+    parser.add_argument(
+        "--realtime",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Drop stale frames and adapt to inference latency. Default: on for cameras, "
+        "off for files (every frame is decoded and scheduled by stream time).",
+    )
+    parser.add_argument(
+        "--size",
+        type=int,
+        default=800,
+        help="Short side the frames are resized to before inference.",
+    )
+    parser.add_argument("--box-threshold", type=float, default=None)
+    parser.add_argument("--text-threshold", type=float, default=None)
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="JSONL file for detections (default: stdout).",
+    )
+    parser.add_argument(
+        "--output-video",
+        type=Path,
+        default=None,
+        help="Write an annotated video (.mp4 or .avi).",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Static cameras: reuse backbone features of unchanged regions between frames.",
+    )
+    parser.add_argument(
+        "--keyframe-interval",
+        type=int,
+        default=30,
+        help="With --incremental, run the full model every N detected frames.",
+    )
+    parser.add_argument(
+        "--change-threshold",
+        type=float,
+        default=0.1,
+        help="With --incremental, mean absolute difference (normalized units) above which "
+        "a 32x32 block counts as changed.",
+    )
+    parser.add_argument(
+        "--refresh-fraction",
+        type=float,
+        default=0.3,
+        help="With --incremental, run the full model when changes cover more of the frame.",
+    )
+    parser.add_argument(
+        "--track",
+        action="store_true",
+        help="Track objects across frames; detect only every --detect-every frames.",
+    )
+    parser.add_argument(
+        "--detect-every",
+        type=int,
+        default=5,
+        help="With --track, run the detector every N frames (sooner when tracks fade).",
+    )
+    parser.add_argument("--max-frames", type=int, default=0, help="Stop after N frames.")
+    parser.add_argument("--max-seconds", type=float, default=0.0, help="Stop after N seconds.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Iterable[str] | None = None) -> None:
+    from config.runtime import get_settings
+    from src.services.factory import create_grounding_dino_adapter
+
+    args = parse_args(argv)
+    settings = get_settings()
+    adapter = create_grounding_dino_adapter(settings)
+    output: IO[str] = sys.stdout
+    if args.output is not None:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        output = args.output.open("w", encoding="utf-8")
+    try:
+        stats = run_video(
+            adapter=adapter,
+            source=args.source,
+            caption=args.text,
+            box_threshold=args.box_threshold if args.box_threshold is not None else settings.box_threshold,
+            text_threshold=args.text_threshold if args.text_threshold is not None else settings.text_threshold,
+            target_fps=args.target_fps,
+            realtime=args.realtime,
+            size=args.size,
+            jsonl=output,
+            output_video=args.output_video,
+            max_frames=args.max_frames,
+            max_seconds=args.max_seconds,
+            temporal=(
+                {
+                    "keyframe_interval": args.keyframe_interval,
+                    "block_threshold": args.change_threshold,
+                    "refresh_fraction": args.refresh_fraction,
+                }
+                if args.incremental
+                else None
+            ),
+            track={"detect_every": args.detect_every} if args.track else None,
+        )
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    print(json.dumps({"video": stats.to_dict()}), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""Per-worker CPU thread layout: torch intra/inter-op thread counts and core pinning.
+
+Every uvicorn worker is a separate process and PyTorch defaults each one to as many
+intra-op threads as there are cores, so ``N`` workers oversubscribe the machine ``N``
+times over. The layout splits the cores available to the server between the workers
+and (optionally) pins each worker to its own slice.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import tempfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+import torch
+
+try:  # POSIX only; elsewhere workers fall back to pid-based slots
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+@dataclass(frozen=True)
+class ThreadLayout:
+    worker_index: int
+    num_workers: int
+    intra_op_threads: int
+    inter_op_threads: int
+    cpus: Optional[Tuple[int, ...]] = None  # pinned cores, None = not pinned
+
+    def describe(self) -> str:
+        pinned = format_cpu_list(self.cpus) if self.cpus is not None else "not pinned"
+        return (
+            f"worker {self.worker_index + 1}/{self.num_workers}: "
+            f"intra-op threads={self.intra_op_threads}, "
+            f"inter-op threads={self.inter_op_threads}, cores={pinned}"
+        )
+
+
+def format_cpu_list(cpus: Sequence[int]) -> str:
+    """``[0, 1, 2, 3, 8]`` -> ``0-3,8`` (the inverse of ``parse_cpu_list``)."""
+    ranges: List[str] = []
+    ordered = sorted(cpus)
+    start = previous = ordered[0] if ordered else None
+    for cpu in ordered[1:] + [None]:
+        if cpu is not None and cpu == previous + 1:
+            previous = cpu
+            continue
+        ranges.append(str(start) if start == previous else f"{start}-{previous}")
+        start = previous = cpu
+    return ",".join(ranges)
+
+
+def available_cpus() -> List[int]:
+    """Cores this process may run on (respects taskset/cgroup cpusets where exposed)."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def parse_cpu_list(text: str) -> List[int]:
+    """``"0-3,8"`` (the sysfs cpulist format) -> ``[0, 1, 2, 3, 8]``."""
+    cpus: List[int] = []
+    for chunk in text.strip().split(","):
+        if not chunk:
+            continue
+        start, _, end = chunk.partition("-")
+        cpus.extend(range(int(start), int(end or start) + 1))
+    return cpus
+
+
+def numa_node_cpus(sysfs_root: Path = Path("/sys/devices/system/node")) -> List[Tuple[int, ...]]:
+    """Available cores of each NUMA node; a single node with every core when unknown."""
+    allowed = set(available_cpus())
+    nodes: List[Tuple[int, ...]] = []
+    for path in sorted(sysfs_root.glob("node[0-9]*/cpulist"), key=lambda p: int(p.parent.name[4:])):
+        try:
+            cpus = tuple(cpu for cpu in parse_cpu_list(path.read_text()) if cpu in allowed)
+        except (OSError, ValueError):
+            continue
+        if cpus:
+            nodes.append(cpus)
+    return nodes or [tuple(sorted(allowed))]
+
+
+def plan_thread_layout(
+    cpus: Sequence[int],
+    *,
+    num_workers: int,
+    worker_index: int,
+    intra_op_threads: int = 0,
+    inter_op_threads: int = 0,
+    pin_cores: bool = False,
+) -> ThreadLayout:
+    """Split ``cpus`` evenly between ``num_workers`` and pick this worker's share.
+
+    ``intra_op_threads``/``inter_op_threads`` of 0 mean auto: the worker's share of
+    cores (at least one) and a single inter-op thread. With ``pin_cores`` the worker
+    gets a contiguous slice of ``cpus``; slices wrap around when there are more
+    workers than cores.
+    """
+    cpus = sorted(cpus) or [0]
+    num_workers = max(1, num_workers)
+    worker_index = worker_index % num_workers
+    share = max(1, len(cpus) // num_workers)
+    intra = intra_op_threads if intra_op_threads > 0 else share
+    inter = inter_op_threads if inter_op_threads > 0 else 1
+
+    pinned: Optional[Tuple[int, ...]] = None
+    if pin_cores:
+        start = (worker_index * share) % len(cpus)
+        pinned = tuple(cpus[(start + offset) % len(cpus)] for offset in range(share))
+    return ThreadLayout(
+        worker_index=worker_index,
+        num_workers=num_workers,
+        intra_op_threads=intra,
+        inter_op_threads=inter,
+        cpus=pinned,
+    )
+
+
+_slot_handle = None
+
+
+def claim_worker_slot(num_workers: int, *, lock_dir: Optional[Path] = None) -> int:
+    """Index of this worker among ``num_workers`` sibling processes.
+
+    ``GDINO_WORKER_INDEX`` wins when set. Otherwise each process takes the first free
+    slot by holding an exclusive lock on ``<lock_dir>/gdino-worker-<slot>.lock`` for its
+    lifetime, so restarted workers reuse the slot (and cores) of the one they replace.
+    Deployments sharing a host need their own ``lock_dir``.
+    """
+    global _slot_handle
+
+    explicit = os.getenv("GDINO_WORKER_INDEX")
+    if explicit is not None and explicit.strip().isdigit():
+        return int(explicit) % max(1, num_workers)
+    if num_workers <= 1:
+        return 0
+    if fcntl is None:
+        return os.getpid() % num_workers
+    if _slot_handle is not None:
+        return _slot_handle[0]
+
+    directory = lock_dir or Path(tempfile.gettempdir())
+    directory.mkdir(parents=True, exist_ok=True)
+    for slot in range(num_workers):
+        handle = open(directory / f"gdino-worker-{slot}.lock", "a+")
+        try:
+            fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            continue
+        _slot_handle = (slot, handle)
+        return slot
+    return os.getpid() % num_workers
+
+
+def apply_thread_layout(layout: ThreadLayout) -> None:
+    """Pin the process (if requested) and size the torch and OpenCV thread pools."""
+    if layout.cpus is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, layout.cpus)
+    torch.set_num_threads(layout.intra_op_threads)
+    try:
+        torch.set_num_interop_threads(layout.inter_op_threads)
+    except RuntimeError:
+        # Only settable before the first inter-op parallel region (e.g. a reload in a
+        # warm interpreter); the intra-op pool is what matters for inference.
+        pass
+    try:
+        import cv2
+
+        cv2.setNumThreads(layout.intra_op_threads)
+    except ImportError:  # pragma: no cover - cv2 is a core dependency
+        pass
+
+
+def configure_worker_threads(
+    *,
+    num_workers: int,
+    intra_op_threads: int = 0,
+    inter_op_threads: int = 0,
+    pin_cores: bool = False,
+    lock_dir: Optional[Path] = None,
+    logger: Optional[logging.Logger] = None,
+) -> ThreadLayout:
+    """Resolve this worker's layout, apply it and report it."""
+    layout = plan_thread_layout(
+        available_cpus(),
+        num_workers=num_workers,
+        worker_index=claim_worker_slot(num_workers, lock_dir=lock_dir),
+        intra_op_threads=intra_op_threads,
+        inter_op_threads=inter_op_threads,
+        pin_cores=pin_cores,
+    )
+    apply_thread_layout(layout)
+    (logger or logging.getLogger("uvicorn.error")).info(
+        "CPU thread layout (pid %d): %s", os.getpid(), layout.describe()
+    )
+    return layout
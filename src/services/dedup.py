@@ -0,0 +1,161 @@
+"""Scan-time deduplication of gallery images.
+
+Exact duplicates share a content hash. Near duplicates (re-encodes, resized thumbnails)
+share a 64-bit difference hash (dHash) within a small Hamming distance; the hash is
+computed from a reduced-size decode (JPEG draft mode), so it costs a fraction of the
+full decode. Each group is detected once on its representative (the largest image) and
+the normalized boxes are fanned out to every member.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from src.services.result_cache import file_digest
+
+DEDUP_MODES = ("off", "exact", "near")
+
+
+@dataclass
+class ImageGroup:
+    representative: Path
+    members: List[Path]  # includes the representative
+    kind: str = "unique"  # "unique", "exact" or "near"
+
+    @property
+    def duplicates(self) -> List[Path]:
+        return [path for path in self.members if path != self.representative]
+
+
+@dataclass
+class DedupReport:
+    mode: str
+    total: int
+    unique: int
+    exact_duplicates: int = 0
+    near_duplicates: int = 0
+    groups: List[Dict[str, object]] = field(default_factory=list)
+
+    @property
+    def skipped_fraction(self) -> float:
+        return 1.0 - self.unique / self.total if self.total else 0.0
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "mode": self.mode,
+            "total": self.total,
+            "unique": self.unique,
+            "exact_duplicates": self.exact_duplicates,
+            "near_duplicates": self.near_duplicates,
+            "skipped_fraction": round(self.skipped_fraction, 4),
+            "groups": self.groups,
+        }
+
+
+def merge_reports(mode: str, reports: Sequence[DedupReport]) -> DedupReport:
+    """One report over galleries (or chunks of one) that were grouped separately."""
+    return DedupReport(
+        mode=mode,
+        total=sum(report.total for report in reports),
+        unique=sum(report.unique for report in reports),
+        exact_duplicates=sum(report.exact_duplicates for report in reports),
+        near_duplicates=sum(report.near_duplicates for report in reports),
+        groups=[group for report in reports for group in report.groups],
+    )
+
+
+def difference_hash(path: Path, hash_size: int = 8) -> Tuple[int, int]:
+    """64-bit dHash of the image and its full-resolution pixel count."""
+    from PIL import Image
+
+    with Image.open(path) as image:
+        width, height = image.size
+        image.draft("L", (hash_size * 4, hash_size * 4))  # DCT-domain downscale for JPEGs
+        small = image.convert("L").resize((hash_size + 1, hash_size), Image.BILINEAR)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = (pixels[:, 1:] > pixels[:, :-1]).flatten()
+    return int(np.packbits(bits).view(">u8")[0]), width * height
+
+
+def _hamming(values: np.ndarray, target: int) -> np.ndarray:
+    xor = np.bitwise_xor(values, np.uint64(target))
+    return np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+def group_images(
+    paths: Sequence[Path],
+    *,
+    mode: str = "exact",
+    max_distance: int = 4,
+) -> Tuple[List[ImageGroup], DedupReport]:
+    """Group ``paths`` (order preserved by first member) and summarize the savings."""
+    if mode not in DEDUP_MODES:
+        raise ValueError(f"Unknown dedup mode '{mode}'. Expected one of: {', '.join(DEDUP_MODES)}")
+    if mode == "off":
+        groups = [ImageGroup(representative=path, members=[path]) for path in paths]
+        return groups, DedupReport(mode=mode, total=len(paths), unique=len(paths))
+
+    by_digest: Dict[str, ImageGroup] = {}
+    groups: List[ImageGroup] = []
+    for path in paths:
+        digest = file_digest(path)
+        group = by_digest.get(digest)
+        if group is None:
+            group = by_digest[digest] = ImageGroup(representative=path, members=[path])
+            groups.append(group)
+        else:
+            group.members.append(path)
+            group.kind = "exact"
+    exact_duplicates = sum(len(group.members) - 1 for group in groups)
+
+    near_duplicates = 0
+    if mode == "near" and len(groups) > 1:
+        merged: List[ImageGroup] = []
+        candidates: List[ImageGroup] = []  # groups with a readable hash, aligned with hashes
+        hashes = np.zeros(len(groups), dtype=np.uint64)
+        sizes: List[int] = []
+        for group in groups:
+            try:
+                dhash, pixels = difference_hash(group.representative)
+            except OSError:  # unreadable here; let detection report the error
+                merged.append(group)
+                continue
+            if candidates:
+                distances = _hamming(hashes[: len(candidates)], dhash)
+                best = int(distances.argmin())
+                if distances[best] <= max_distance:
+                    target = candidates[best]
+                    near_duplicates += len(group.members)
+                    target.members.extend(group.members)
+                    target.kind = "near"
+                    if pixels > sizes[best]:  # detect on the highest-resolution copy
+                        target.representative = group.representative
+                        sizes[best] = pixels
+                    continue
+            hashes[len(candidates)] = dhash
+            candidates.append(group)
+            sizes.append(pixels)
+            merged.append(group)
+        groups = merged
+
+    report = DedupReport(
+        mode=mode,
+        total=len(paths),
+        unique=len(groups),
+        exact_duplicates=exact_duplicates,
+        near_duplicates=near_duplicates,
+        groups=[
+            {
+                "representative": str(group.representative),
+                "kind": group.kind,
+                "duplicates": [str(path) for path in group.duplicates],
+            }
+            for group in groups
+            if len(group.members) > 1
+        ],
+    )
+    return groups, report
@@ -1,11 +1,23 @@
 from __future__ import annotations
 
+import io
 import logging
-from dataclasses import dataclass
+import time
+from collections import deque
+from dataclasses import astuple, dataclass, replace
 from pathlib import Path
-from typing import Any, List, Optional, Protocol, Tuple
+from typing import Any, Deque, Iterable, Iterator, List, Optional, Protocol, Tuple
 
-from src.utils.file_io import ensure_directory, write_bytes_to_temp, write_image
+from src.services.dedup import DEDUP_MODES, DedupReport, ImageGroup, group_images, merge_reports
+from src.services.metrics import METRICS
+from src.services.prefilter import GalleryPrefilter
+from src.services.rendering import ANNOTATION_MODES, AnnotationHandle, AnnotationWriter
+from src.services.result_cache import ResultCache, file_digest, make_cache_key
+from src.utils.file_io import ensure_directory, read_rgb_image, write_bytes_to_temp
+
+
+# images grouped for dedup at a time when a scan has a limit
+SCAN_CHUNK_SIZE = 256
 
 
 @dataclass
@@ -18,8 +30,48 @@ class Detection:
 @dataclass
 class DetectionResultPayload:
     items: List[Detection]
-    source_path: Path
+    source_path: Optional[Path]  # None for ``refilter`` results, which keep no image
     annotated_path: Optional[Path]
+    annotation: Optional[AnnotationHandle] = None
+    cache_hit: bool = False
+    result_id: Optional[str] = None  # pass to ``DetectionService.refilter``
+    duplicate_of: Optional[Path] = None  # set on scan results fanned out from a duplicate
+
+    def resolve_annotated_path(self, timeout: Optional[float] = None) -> Optional[Path]:
+        """Path of the annotated image, waiting for (or triggering) its rendering."""
+        if self.annotation is not None:
+            return self.annotation.path(timeout=timeout)
+        return self.annotated_path
+
+
+@dataclass(frozen=True)
+class TilingOptions:
+    """Tiled inference for images larger than ``tile_size`` (see ``predict_tiled``)."""
+
+    tile_size: int
+    overlap: float = 0.2
+    batch_size: int = 4
+    merge: str = "nms"
+    iou_threshold: float = 0.5
+    full_image_pass: bool = True
+
+
+@dataclass
+class _PendingImage:
+    """An image of a ``detect_many`` stream waiting for its prediction."""
+
+    image_path: Path
+    start: float
+    cache_key: Optional[str] = None
+    raw: Any = None  # cached (or just computed) raw prediction
+    image_source: Any = None
+    image_tensor: Any = None  # set when the model runs on the image
+
+
+@dataclass
+class ScanResult:
+    results: List[DetectionResultPayload]
+    dedup: DedupReport
 
 
 class ModelPredictionProtocol(Protocol):
@@ -65,7 +117,23 @@ class DetectionService:
         default_box_threshold: float,
         default_text_threshold: float,
         annotate_results: bool = True,
+        prefilter: Optional[GalleryPrefilter] = None,
+        tiling: Optional[TilingOptions] = None,
+        annotation_mode: str = "sync",
+        annotation_writer: Optional[AnnotationWriter] = None,
+        result_cache: Optional[ResultCache] = None,
+        dedup_mode: str = "off",
+        near_dup_distance: int = 4,
     ) -> None:
+        if annotation_mode not in ANNOTATION_MODES:
+            raise ValueError(
+                f"Unknown annotation mode '{annotation_mode}'. "
+                f"Expected one of: {', '.join(ANNOTATION_MODES)}"
+            )
+        if dedup_mode not in DEDUP_MODES:
+            raise ValueError(
+                f"Unknown dedup mode '{dedup_mode}'. Expected one of: {', '.join(DEDUP_MODES)}"
+            )
         self._adapter = model_adapter
         self._model_name = model_name
         base_logger = logging.getLogger("uvicorn.error")
@@ -77,6 +145,70 @@ class DetectionService:
         self._default_box_threshold = default_box_threshold
         self._default_text_threshold = default_text_threshold
         self._annotate_results = annotate_results
+        self._prefilter = prefilter
+        self._tiling = tiling
+        self._annotation_mode = annotation_mode
+        self._annotation_writer = annotation_writer or AnnotationWriter()
+        self._dedup_mode = dedup_mode
+        self._near_dup_distance = near_dup_distance
+        # Only adapters that expose pre-threshold outputs can be served from the cache.
+        self._result_cache = (
+            result_cache
+            if result_cache is not None and hasattr(model_adapter, "predict_raw")
+            else None
+        )
+        self._ready = False
+        METRICS.set("gdino_model_ready", 0, model_name)
+
+    @property
+    def model_name(self) -> str:
+        return self._model_name
+
+    @property
+    def search_dir(self) -> Path:
+        return self._search_dir
+
+    @property
+    def ready(self) -> bool:
+        """True once ``warmup`` has completed."""
+        return self._ready
+
+    def warmup(self, caption: str = "object") -> None:
+        """Run one throwaway prediction so lazy initialisation (CUDA context, kernel
+        selection, tokenizer caches) happens before the first real request."""
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (64, 64)).save(buffer, format="JPEG")
+        image_path = write_bytes_to_temp(
+            buffer.getvalue(),
+            filename="warmup.jpg",
+            directory=self._images_dir,
+        )
+        try:
+            _, image_tensor = self._adapter.load_image(image_path)
+            self._adapter.predict(
+                image=image_tensor,
+                caption=caption,
+                box_threshold=self._default_box_threshold,
+                text_threshold=self._default_text_threshold,
+            )
+        finally:
+            image_path.unlink(missing_ok=True)
+        self.mark_ready()
+        self._logger.info("Model='%s' is warmed up", self._model_name)
+
+    def memory_bytes(self) -> int:
+        """Parameter and buffer bytes of the wrapped model (0 when it is not a torch module)."""
+        model = getattr(self._adapter, "model", None)
+        if model is None or not hasattr(model, "parameters"):
+            return 0
+        tensors = list(model.parameters()) + list(model.buffers())
+        return sum(tensor.numel() * tensor.element_size() for tensor in tensors)
+
+    def mark_ready(self) -> None:
+        self._ready = True
+        METRICS.set("gdino_model_ready", 1, self._model_name)
 
     def detect_from_bytes(
         self,
@@ -88,6 +220,9 @@ class DetectionService:
         text_threshold: Optional[float] = None,
         persist_input: bool = False,
     ) -> DetectionResultPayload:
+        """Detect on uploaded bytes. No path is returned, so the annotation is always a
+        lazy handle, whatever ``annotation_mode`` says; with ``persist_input`` off it can
+        only be rendered from a cache miss, whose decoded image it keeps."""
         self._logger.info(
             "Running detection with model='%s' from upload filename='%s'",
             self._model_name,
@@ -104,6 +239,7 @@ class DetectionService:
                 caption=caption,
                 box_threshold=box_threshold,
                 text_threshold=text_threshold,
+                annotation_mode="lazy",
             )
         finally:
             if not persist_input and image_path.exists():
@@ -119,25 +255,196 @@ class DetectionService:
         caption: str,
         box_threshold: Optional[float] = None,
         text_threshold: Optional[float] = None,
+        annotation_mode: Optional[str] = None,
     ) -> DetectionResultPayload:
+        """``annotation_mode`` overrides the service's mode for this result."""
         self._logger.info(
             "Running detection with model='%s' on image='%s'",
             self._model_name,
             image_path,
         )
-        image_source, image_tensor = self._adapter.load_image(image_path)
-        prediction = self._adapter.predict(
-            image=image_tensor,
+        start = time.perf_counter()
+        cache_key = self._cache_key(image_path, caption)
+        prediction, image_source, cache_hit = self._predict(
+            image_path=image_path,
+            cache_key=cache_key,
             caption=caption,
             box_threshold=box_threshold or self._default_box_threshold,
             text_threshold=text_threshold or self._default_text_threshold,
         )
+        return self._payload(
+            image_path=image_path,
+            prediction=prediction,
+            image_source=image_source,
+            start=start,
+            cache_key=cache_key,
+            cache_hit=cache_hit,
+            annotation_mode=annotation_mode,
+        )
+
+    def detect_many(
+        self,
+        *,
+        image_paths: Iterable[Path],
+        caption: str,
+        box_threshold: Optional[float] = None,
+        text_threshold: Optional[float] = None,
+    ) -> Iterator[DetectionResultPayload]:
+        """``detect_from_path`` for each image, lazily and in order.
+
+        The images the model has to run on go to the adapter as one stream (on CUDA the
+        next image is uploaded while the current one runs): with a result cache, cached
+        images are answered first and only the misses are streamed through
+        ``predict_raw_many``; without one, every image goes through ``predict_many``.
+        Tiling is decided per image, so it falls back to one ``detect_from_path`` each.
+        """
+        box_threshold = box_threshold or self._default_box_threshold
+        text_threshold = text_threshold or self._default_text_threshold
+        if self._tiling is None:
+            if self._result_cache is not None and hasattr(self._adapter, "predict_raw_many"):
+                return self._detect_cached_stream(image_paths, caption, box_threshold, text_threshold)
+            if self._result_cache is None and hasattr(self._adapter, "predict_many"):
+                return self._detect_stream(image_paths, caption, box_threshold, text_threshold)
+        return (
+            self.detect_from_path(
+                image_path=image_path,
+                caption=caption,
+                box_threshold=box_threshold,
+                text_threshold=text_threshold,
+            )
+            for image_path in image_paths
+        )
+
+    def _detect_stream(
+        self,
+        image_paths: Iterable[Path],
+        caption: str,
+        box_threshold: float,
+        text_threshold: float,
+    ) -> Iterator[DetectionResultPayload]:
+        pending: Deque[_PendingImage] = deque()
+
+        def images() -> Iterator[Any]:
+            for image_path in image_paths:
+                entry = self._start_image(image_path)
+                entry.image_source, image_tensor = self._adapter.load_image(image_path)
+                pending.append(entry)
+                yield image_tensor
+
+        predictions = self._adapter.predict_many(
+            images=images(),
+            caption=caption,
+            box_threshold=box_threshold,
+            text_threshold=text_threshold,
+        )
+        for prediction in predictions:
+            entry = pending.popleft()
+            yield self._payload(
+                image_path=entry.image_path,
+                prediction=prediction,
+                image_source=entry.image_source,
+                start=entry.start,
+            )
+
+    def _detect_cached_stream(
+        self,
+        image_paths: Iterable[Path],
+        caption: str,
+        box_threshold: float,
+        text_threshold: float,
+    ) -> Iterator[DetectionResultPayload]:
+        # ``pending`` holds, in order, cached images and the misses already handed to the
+        # adapter; each raw prediction belongs to the first miss, after the hits before it
+        pending: Deque[_PendingImage] = deque()
+
+        def misses() -> Iterator[Any]:
+            for image_path in image_paths:
+                entry = self._start_image(image_path)
+                entry.cache_key = self._cache_key(image_path, caption)
+                entry.raw = self._result_cache.get(
+                    entry.cache_key, box_threshold=box_threshold, text_threshold=text_threshold
+                )
+                if entry.raw is None:
+                    entry.image_source, entry.image_tensor = self._adapter.load_image(image_path)
+                    pending.append(entry)
+                    yield entry.image_tensor
+                else:
+                    pending.append(entry)
+
+        def finish(entry: _PendingImage) -> DetectionResultPayload:
+            if entry.raw is not None and entry.raw.covers(box_threshold, text_threshold):
+                prediction = self._adapter.filter_raw(
+                    entry.raw, box_threshold=box_threshold, text_threshold=text_threshold
+                )
+            else:  # several text chunks, or the top_k cut dropped queries the thresholds keep
+                prediction = self._adapter.predict(
+                    image=entry.image_tensor,
+                    caption=caption,
+                    box_threshold=box_threshold,
+                    text_threshold=text_threshold,
+                )
+            return self._payload(
+                image_path=entry.image_path,
+                prediction=prediction,
+                image_source=entry.image_source,
+                start=entry.start,
+                cache_key=entry.cache_key,
+                cache_hit=entry.image_tensor is None,
+            )
+
+        raws = self._adapter.predict_raw_many(
+            images=misses(),
+            caption=caption,
+            **self._raw_compaction(box_threshold, text_threshold),
+        )
+        for raw in raws:
+            while pending[0].image_tensor is None:
+                yield finish(pending.popleft())
+            entry = pending.popleft()
+            if raw is not None:
+                self._result_cache.put(entry.cache_key, raw)
+                entry.raw = raw
+            yield finish(entry)
+        while pending:
+            yield finish(pending.popleft())
+
+    def _raw_compaction(self, box_threshold: float, text_threshold: float) -> dict:
+        # Raw predictions are compacted on the device before they are copied back. The
+        # token floor must stay below the request's thresholds so its detections come
+        # out exact; the cache compacts again to its own floor when storing them.
+        return {
+            "top_k": self._result_cache.top_k,
+            "token_floor": min(self._result_cache.token_floor, box_threshold, text_threshold),
+        }
+
+    def _start_image(self, image_path: Path) -> _PendingImage:
+        self._logger.info(
+            "Running detection with model='%s' on image='%s'",
+            self._model_name,
+            image_path,
+        )
+        return _PendingImage(image_path=image_path, start=time.perf_counter())
+
+    def _payload(
+        self,
+        *,
+        image_path: Path,
+        prediction: ModelPredictionProtocol,
+        image_source: Any,
+        start: float,
+        cache_key: Optional[str] = None,
+        cache_hit: bool = False,
+        annotation_mode: Optional[str] = None,
+    ) -> DetectionResultPayload:
         detections = self._build_detections(prediction)
-        annotated_path = self._maybe_annotate(
+        annotated_path, annotation = self._maybe_annotate(
             image_source=image_source,
             prediction=prediction,
             original_path=image_path,
+            annotation_mode=annotation_mode or self._annotation_mode,
         )
+        METRICS.observe("gdino_model_inference_seconds", time.perf_counter() - start, self._model_name)
+        METRICS.observe("gdino_detections_per_image", len(detections), self._model_name)
         self._logger.info(
             "Model='%s' finished image='%s' with %d detections",
             self._model_name,
@@ -148,6 +455,44 @@ class DetectionService:
             items=detections,
             source_path=image_path,
             annotated_path=annotated_path,
+            annotation=annotation,
+            cache_hit=cache_hit,
+            result_id=cache_key if cache_key is not None and cache_key in self._result_cache else None,
+        )
+
+    def refilter(
+        self,
+        *,
+        result_id: str,
+        box_threshold: Optional[float] = None,
+        text_threshold: Optional[float] = None,
+    ) -> DetectionResultPayload:
+        """Detections of an earlier request under new thresholds, without the model.
+
+        Raises ``KeyError`` when the stored result is unknown or evicted and ``ValueError``
+        when a threshold is below what the compact stored result can answer exactly.
+        """
+        raw = self._result_cache.get(result_id) if self._result_cache is not None else None
+        if raw is None:
+            raise KeyError(f"Unknown or expired result '{result_id}'.")
+        box_threshold = box_threshold or self._default_box_threshold
+        text_threshold = text_threshold or self._default_text_threshold
+        if not raw.covers(box_threshold, text_threshold):
+            raise ValueError(
+                f"Stored result '{result_id}' only supports box_threshold >= "
+                f"{raw.min_box_threshold:.4f} and text_threshold >= {raw.min_text_threshold:.4f}."
+            )
+        prediction = self._adapter.filter_raw(
+            raw, box_threshold=box_threshold, text_threshold=text_threshold
+        )
+        detections = self._build_detections(prediction)
+        METRICS.observe("gdino_detections_per_image", len(detections), self._model_name)
+        return DetectionResultPayload(
+            items=detections,
+            source_path=None,
+            annotated_path=None,
+            cache_hit=True,
+            result_id=result_id,
         )
 
     def detect_in_directory(
@@ -160,34 +505,230 @@ class DetectionService:
         text_threshold: Optional[float] = None,
         limit: Optional[int] = None,
         only_with_detections: bool = True,
+        use_prefilter: bool = True,
     ) -> List[DetectionResultPayload]:
+        return self.scan_directory(
+            caption=caption,
+            directory=directory,
+            patterns=patterns,
+            box_threshold=box_threshold,
+            text_threshold=text_threshold,
+            limit=limit,
+            only_with_detections=only_with_detections,
+            use_prefilter=use_prefilter,
+        ).results
+
+    def scan_directory(
+        self,
+        *,
+        caption: str,
+        directory: Optional[Path] = None,
+        patterns: Optional[List[str]] = None,
+        box_threshold: Optional[float] = None,
+        text_threshold: Optional[float] = None,
+        limit: Optional[int] = None,
+        only_with_detections: bool = True,
+        use_prefilter: bool = True,
+        dedup: Optional[str] = None,
+    ) -> ScanResult:
+        """``detect_in_directory`` plus the dedup report.
+
+        ``dedup`` (default: the service setting) groups duplicate files so each group is
+        detected once; duplicates get the representative's detections and annotation
+        with ``duplicate_of`` set. With a ``limit`` the gallery is grouped and detected
+        ``SCAN_CHUNK_SIZE`` (at least ``limit``) images at a time and the scan stops at the
+        first chunk that reaches it; the report covers the chunks scanned.
+        """
+        image_paths = self.list_images(directory=directory, patterns=patterns)
+        mode = dedup or self._dedup_mode
+        # Grouping reads every file, so with a limit the gallery is grouped chunk by chunk
+        # and the scan can stop early; duplicates in different chunks are detected twice.
+        chunk_size = len(image_paths) if limit is None else max(limit, SCAN_CHUNK_SIZE)
+        collected: List[DetectionResultPayload] = []
+        reports: List[DedupReport] = []
+        for start in range(0, len(image_paths), max(chunk_size, 1)):
+            groups, report = group_images(
+                image_paths[start : start + chunk_size],
+                mode=mode,
+                max_distance=self._near_dup_distance,
+            )
+            reports.append(report)
+            if self._scan_groups(
+                groups,
+                collected,
+                caption=caption,
+                box_threshold=box_threshold,
+                text_threshold=text_threshold,
+                limit=limit,
+                only_with_detections=only_with_detections,
+                use_prefilter=use_prefilter,
+            ):
+                break
+
+        report = merge_reports(mode, reports)
+        if report.unique < report.total:
+            self._logger.info(
+                "Dedup '%s' collapsed %d images into %d unique (%.1f%% skipped)",
+                report.mode,
+                report.total,
+                report.unique,
+                100.0 * report.skipped_fraction,
+            )
+        return ScanResult(results=collected, dedup=report)
+
+    def _scan_groups(
+        self,
+        groups: List[ImageGroup],
+        collected: List[DetectionResultPayload],
+        *,
+        caption: str,
+        box_threshold: Optional[float],
+        text_threshold: Optional[float],
+        limit: Optional[int],
+        only_with_detections: bool,
+        use_prefilter: bool,
+    ) -> bool:
+        """Detect each group once and append its members' results; True once ``limit`` is hit."""
+        # Images without detections are dropped anyway, so a cheap first pass can
+        # skip the full model on images that are unlikely to match.
+        representatives = [group.representative for group in groups]
+        if use_prefilter and only_with_detections:
+            kept = set(self.prefilter_images(representatives, caption))
+            groups = [group for group in groups if group.representative in kept]
+
+        results = self.detect_many(
+            image_paths=[group.representative for group in groups],
+            caption=caption,
+            box_threshold=box_threshold,
+            text_threshold=text_threshold,
+        )
+        for group, result in zip(groups, results):
+            if only_with_detections and not result.items:
+                continue
+            for member in group.members:
+                if member == group.representative:
+                    collected.append(result)
+                else:
+                    collected.append(
+                        replace(result, source_path=member, duplicate_of=group.representative)
+                    )
+                if limit is not None and len(collected) >= limit:
+                    return True
+        return False
+
+    def list_images(
+        self,
+        *,
+        directory: Optional[Path] = None,
+        patterns: Optional[List[str]] = None,
+    ) -> List[Path]:
+        """Sorted image files in ``directory`` (default: the search directory)."""
         target_dir = directory or self._search_dir
         if not target_dir.exists():
             raise FileNotFoundError(f"Search directory not found: {target_dir}")
 
         glob_patterns = patterns or ["*.jpg", "*.jpeg", "*.png", "*.bmp", "*.webp"]
-        collected: List[DetectionResultPayload] = []
-
         candidates = set()
         for pattern in glob_patterns:
             candidates.update(target_dir.glob(pattern))
+        return [path for path in sorted(candidates) if path.is_file()]
 
-        for image_path in sorted(candidates):
-            if not image_path.is_file():
-                continue
-            result = self.detect_from_path(
-                image_path=image_path,
+    def prefilter_images(self, image_paths: List[Path], caption: str) -> List[Path]:
+        """Images the configured prefilter keeps for ``caption`` (all of them without one)."""
+        if self._prefilter is None:
+            return list(image_paths)
+        selection = self._prefilter.select(image_paths, caption)
+        self._logger.info(
+            "Prefilter '%s' pruned %d of %d images (%.1f%%)",
+            self._prefilter.name,
+            selection.pruned,
+            selection.total,
+            100.0 * selection.pruned_fraction,
+        )
+        return selection.kept
+
+    def _predict(
+        self,
+        *,
+        image_path: Path,
+        cache_key: Optional[str],
+        caption: str,
+        box_threshold: float,
+        text_threshold: float,
+    ) -> Tuple[ModelPredictionProtocol, Any, bool]:
+        """Prediction, decoded image (None when served from the cache) and cache-hit flag."""
+        if cache_key is not None:
+            raw = self._result_cache.get(
+                cache_key, box_threshold=box_threshold, text_threshold=text_threshold
+            )
+            if raw is not None:
+                prediction = self._adapter.filter_raw(
+                    raw, box_threshold=box_threshold, text_threshold=text_threshold
+                )
+                return prediction, None, True
+
+        image_source, image_tensor = self._adapter.load_image(image_path)
+        if self._use_tiling(image_source):
+            prediction = self._adapter.predict_tiled(
+                image_source=image_source,
                 caption=caption,
                 box_threshold=box_threshold,
                 text_threshold=text_threshold,
+                tile_size=self._tiling.tile_size,
+                overlap=self._tiling.overlap,
+                batch_size=self._tiling.batch_size,
+                merge=self._tiling.merge,
+                iou_threshold=self._tiling.iou_threshold,
+                full_image_pass=self._tiling.full_image_pass,
             )
-            if only_with_detections and not result.items:
-                continue
-            collected.append(result)
-            if limit is not None and len(collected) >= limit:
-                return collected
+            return prediction, image_source, False
+        if cache_key is not None:
+            raw = self._adapter.predict_raw(
+                image=image_tensor,
+                caption=caption,
+                **self._raw_compaction(box_threshold, text_threshold),
+            )
+            if raw is not None:
+                self._result_cache.put(cache_key, raw)
+                if raw.covers(box_threshold, text_threshold):
+                    prediction = self._adapter.filter_raw(
+                        raw, box_threshold=box_threshold, text_threshold=text_threshold
+                    )
+                    return prediction, image_source, False
+        prediction = self._adapter.predict(
+            image=image_tensor,
+            caption=caption,
+            box_threshold=box_threshold,
+            text_threshold=text_threshold,
+        )
+        return prediction, image_source, False
 
-        return collected
+    def _cache_key(self, image_path: Path, caption: str) -> Optional[str]:
+        if self._result_cache is None:
+            return None
+        return make_cache_key(
+            file_digest(image_path),
+            caption,
+            self._model_name,
+            getattr(self._adapter, "model_version", ""),
+            self._cache_variant(),
+        )
+
+    def _cache_variant(self) -> str:
+        # the lookup runs before the image is decoded, i.e. before tiling is decided
+        parts = []
+        if self._tiling is not None and hasattr(self._adapter, "predict_tiled"):
+            parts.append("tiling=" + ",".join(str(value) for value in astuple(self._tiling)))
+        prompt_bank = getattr(self._adapter, "prompt_bank", None)
+        if prompt_bank is not None:
+            parts.append("prompt_bank=" + "|".join(prompt_bank.captions))
+        return ";".join(parts)
+
+    def _use_tiling(self, image_source) -> bool:
+        if self._tiling is None or not hasattr(self._adapter, "predict_tiled"):
+            return False
+        height, width = image_source.shape[:2]
+        return max(height, width) > self._tiling.tile_size
 
     def _build_detections(
         self,
@@ -216,16 +757,30 @@ class DetectionService:
         image_source,
         prediction: ModelPredictionProtocol,
         original_path: Path,
-    ) -> Optional[Path]:
+        annotation_mode: str,
+    ) -> Tuple[Optional[Path], Optional[AnnotationHandle]]:
+        """Render per ``annotation_mode``: ``sync`` writes now, ``background`` hands the
+        work to the writer pool, ``lazy`` only renders when the handle is used."""
         if not self._annotate_results or len(prediction.phrases) == 0:
-            return None
-        annotated = self._adapter.annotate(
-            image_source=image_source,
-            boxes=prediction.boxes,
-            logits=prediction.logits,
-            phrases=prediction.phrases,
-        )
-        target_name = f"{original_path.stem}_annotated.jpg"
-        target_path = self._results_dir / target_name
-        write_image(annotated[:, :, ::-1], target_path=target_path)  # convert BGR->RGB
-        return target_path
+            return None, None
+
+        def render():
+            # a cache hit was never decoded: read it only once there is something to draw
+            source = image_source if image_source is not None else read_rgb_image(original_path)
+            return self._adapter.annotate(
+                image_source=source,
+                boxes=prediction.boxes,
+                logits=prediction.logits,
+                phrases=prediction.phrases,
+            )
+
+        annotation = AnnotationHandle(
+            render=render,
+            target_path=self._results_dir / f"{original_path.stem}_annotated.jpg",
+            writer=self._annotation_writer,
+        )
+        if annotation_mode == "sync":
+            return annotation.path(), annotation
+        if annotation_mode == "background":
+            return annotation.schedule().target_path, annotation
+        return None, annotation
@@ -1,21 +1,111 @@
 from __future__ import annotations
 
+from dataclasses import replace
 from functools import lru_cache
-from typing import Dict
+from typing import Callable, Dict
 
 from config.runtime import RuntimeSettings, get_settings
+from groundingdino.util.numerics import NUMERICS
+from groundingdino.util.time_counter import PROFILER
 from src.adapters.grounding_dino import GroundingDinoModelAdapter
 from src.adapters.omdet_turbo import OmDetTurboModelAdapter
-from src.services.detection_service import DetectionService
+from src.services.cpu_layout import configure_worker_threads
+from src.services.detection_service import DetectionService, TilingOptions
+from src.services.jobs import JobRunner, JobStore
 from src.services.manager import DetectionServiceManager
+from src.services.metrics import METRICS, register_queue_depth
+from src.services.prefilter import (
+    PREFILTER_MODES,
+    GalleryPrefilter,
+    build_adapter_prefilter,
+    build_grounding_dino_prefilter,
+)
+from src.services.rendering import AnnotationWriter
+from src.services.replicas import ReplicaPool, ReplicaSpec, plan_replicas
+from src.services.result_cache import ResultCache
 
 
-def _build_grounding_dino_service(settings: RuntimeSettings) -> DetectionService:
-    adapter = GroundingDinoModelAdapter(
+def _build_grounding_dino_prefilter(
+    settings: RuntimeSettings,
+    adapter: GroundingDinoModelAdapter,
+    omdet_adapter: OmDetTurboModelAdapter | None,
+) -> GalleryPrefilter | None:
+    mode = settings.prefilter_mode
+    if mode not in PREFILTER_MODES:
+        raise ValueError(
+            f"Unknown prefilter mode '{mode}'. Expected one of: {', '.join(PREFILTER_MODES)}"
+        )
+    if mode == "none":
+        return None
+    if mode == "omdet":
+        if omdet_adapter is None:
+            raise ValueError("Prefilter mode 'omdet' requires OmDet Turbo to be configured.")
+        return build_adapter_prefilter(
+            omdet_adapter,
+            threshold=settings.prefilter_threshold,
+            min_keep_fraction=settings.prefilter_min_keep_fraction,
+        )
+    return build_grounding_dino_prefilter(
+        adapter,
+        mode=mode,
+        threshold=settings.prefilter_threshold,
+        min_keep_fraction=settings.prefilter_min_keep_fraction,
+        short_side=settings.prefilter_short_side,
+    )
+
+
+def _build_tiling_options(settings: RuntimeSettings) -> TilingOptions | None:
+    if settings.tile_size <= 0:
+        return None
+    if settings.tile_merge not in ("nms", "wbf"):
+        raise ValueError(f"Unknown tile merge '{settings.tile_merge}'. Expected one of: nms, wbf")
+    return TilingOptions(
+        tile_size=settings.tile_size,
+        overlap=settings.tile_overlap,
+        batch_size=settings.tile_batch_size,
+        merge=settings.tile_merge,
+        iou_threshold=settings.tile_iou_threshold,
+        full_image_pass=settings.tile_full_image_pass,
+    )
+
+
+def _build_result_cache(settings: RuntimeSettings) -> ResultCache | None:
+    if settings.result_cache_size <= 0 and settings.result_cache_dir is None:
+        return None
+    return ResultCache(
+        max_entries=settings.result_cache_size,
+        disk_dir=settings.result_cache_dir,
+        max_disk_bytes=settings.result_cache_disk_mb * 1024 * 1024,
+        top_k=settings.raw_top_k,
+        token_floor=settings.raw_token_floor,
+    )
+
+
+def _count_prompt_bank_lookup(result: str) -> None:
+    METRICS.inc("gdino_cache_lookups_total", "prompt_bank", result)
+
+
+def create_grounding_dino_adapter(
+    settings: RuntimeSettings | None = None,
+) -> GroundingDinoModelAdapter:
+    settings = settings or get_settings()
+    return GroundingDinoModelAdapter(
         config_path=settings.model_config_path,
         weights_path=settings.weights_path,
         device=settings.device,
+        prompt_bank_path=settings.prompt_bank_path,
+        final_layer_heads=settings.final_layer_heads,
+        on_prompt_bank_lookup=_count_prompt_bank_lookup,
     )
+
+
+def _build_grounding_dino_service(
+    settings: RuntimeSettings,
+    omdet_adapter: OmDetTurboModelAdapter | None = None,
+    annotation_writer: AnnotationWriter | None = None,
+    result_cache: ResultCache | None = None,
+) -> DetectionService:
+    adapter = create_grounding_dino_adapter(settings)
     return DetectionService(
         model_adapter=adapter,
         model_name="grounding_dino",
@@ -25,21 +115,41 @@ def _build_grounding_dino_service(settings: RuntimeSettings) -> DetectionService
         default_box_threshold=settings.box_threshold,
         default_text_threshold=settings.text_threshold,
         annotate_results=settings.annotate_results,
+        annotation_mode=settings.annotation_mode,
+        annotation_writer=annotation_writer,
+        prefilter=_build_grounding_dino_prefilter(settings, adapter, omdet_adapter),
+        tiling=_build_tiling_options(settings),
+        result_cache=result_cache,
+        dedup_mode=settings.dedup_mode,
+        near_dup_distance=settings.near_dup_distance,
     )
 
 
-def _maybe_build_omdet_turbo_service(
+def _omdet_turbo_configured(settings: RuntimeSettings) -> bool:
+    if not settings.omdet_enabled:
+        return False
+    return settings.omdet_model_id is not None or settings.omdet_weights_path is not None
+
+
+def _maybe_build_omdet_turbo_adapter(
     settings: RuntimeSettings,
-) -> DetectionService | None:
-    if settings.omdet_model_id is None and settings.omdet_weights_path is None:
+) -> OmDetTurboModelAdapter | None:
+    if not _omdet_turbo_configured(settings):
         return None
-    adapter = OmDetTurboModelAdapter(
+    return OmDetTurboModelAdapter(
         model_id=settings.omdet_model_id,
         weights_path=settings.omdet_weights_path,
         device=settings.omdet_device,
         confidence_threshold=settings.omdet_confidence_threshold,
         class_names=settings.omdet_class_names,
     )
+
+
+def _build_omdet_turbo_service(
+    settings: RuntimeSettings,
+    adapter: OmDetTurboModelAdapter,
+    annotation_writer: AnnotationWriter | None = None,
+) -> DetectionService:
     return DetectionService(
         model_adapter=adapter,
         model_name="omdet_turbo",
@@ -49,18 +159,90 @@ def _maybe_build_omdet_turbo_service(
         default_box_threshold=settings.box_threshold,
         default_text_threshold=settings.text_threshold,
         annotate_results=settings.annotate_results,
+        annotation_mode=settings.annotation_mode,
+        annotation_writer=annotation_writer,
+        dedup_mode=settings.dedup_mode,
+        near_dup_distance=settings.near_dup_distance,
+    )
+
+
+def _replicated(
+    settings: RuntimeSettings,
+    model_name: str,
+    device: str,
+    build: Callable[[ReplicaSpec], DetectionService],
+) -> Callable[[], DetectionService]:
+    """Factory for one model: a single service, or a replica pool per GDINO_REPLICAS."""
+    specs = plan_replicas(
+        settings.replicas,
+        device=device,
+        devices=settings.replica_devices,
+        cpu_mode=settings.replica_cpus,
+    )
+    if len(specs) == 1 and specs[0] == ReplicaSpec(index=0, device=device):
+        return lambda: build(specs[0])
+    return lambda: ReplicaPool(
+        build,
+        specs,
+        model_name=model_name,
+        cooldown=settings.replica_cooldown,
+        size_thread_pools=settings.configure_threads and settings.intra_op_threads <= 0,
     )
 
 
 def create_detection_manager() -> DetectionServiceManager:
     settings = get_settings()
-    services: Dict[str, DetectionService] = {
-        "grounding_dino": _build_grounding_dino_service(settings),
-    }
+    if settings.configure_threads:
+        # before the models load so their thread pools start at the right size
+        configure_worker_threads(
+            num_workers=settings.worker_count,
+            intra_op_threads=settings.intra_op_threads,
+            inter_op_threads=settings.inter_op_threads,
+            pin_cores=settings.pin_cores,
+            lock_dir=settings.worker_lock_dir,
+        )
+    PROFILER.configure(
+        enabled=settings.profile_stages,
+        sync_cuda=settings.profile_sync_cuda,
+    )
+    NUMERICS.configure(enabled=settings.check_numerics)
+    annotation_writer = AnnotationWriter(max_workers=settings.annotation_workers)
+    register_queue_depth("annotation_writer", annotation_writer.pending)
+    # outlives model evictions: entries are keyed by model version, not by instance
+    result_cache = _build_result_cache(settings)
 
-    omdet_service = _maybe_build_omdet_turbo_service(settings)
-    if omdet_service is not None:
-        services["omdet_turbo"] = omdet_service
+    shared_omdet_adapter: OmDetTurboModelAdapter | None = None
+    if settings.prefilter_mode == "omdet":
+        # the GroundingDINO prefilter keeps this adapter, so it is built once up front
+        shared_omdet_adapter = _maybe_build_omdet_turbo_adapter(settings)
+
+    def build_omdet_adapter(spec: ReplicaSpec) -> OmDetTurboModelAdapter | None:
+        if shared_omdet_adapter is not None and spec.index == 0 and spec.device == settings.omdet_device:
+            return shared_omdet_adapter
+        return _maybe_build_omdet_turbo_adapter(replace(settings, omdet_device=spec.device))
+
+    factories: Dict[str, Callable[[], DetectionService]] = {
+        "grounding_dino": _replicated(
+            settings,
+            "grounding_dino",
+            settings.device,
+            lambda spec: _build_grounding_dino_service(
+                replace(settings, device=spec.device),
+                shared_omdet_adapter,
+                annotation_writer,
+                result_cache,
+            ),
+        ),
+    }
+    if _omdet_turbo_configured(settings):
+        factories["omdet_turbo"] = _replicated(
+            settings,
+            "omdet_turbo",
+            settings.omdet_device,
+            lambda spec: _build_omdet_turbo_service(
+                settings, build_omdet_adapter(spec), annotation_writer
+            ),
+        )
 
     aliases = {
         "grounding_dino": ("groundingdino", "gdino"),
@@ -68,14 +250,20 @@ def create_detection_manager() -> DetectionServiceManager:
     }
 
     default_model = settings.default_detection_model
-    if default_model not in services:
+    if default_model not in factories:
         default_model = "grounding_dino"
 
-    return DetectionServiceManager(
-        services=services,
+    manager = DetectionServiceManager(
+        factories=factories,
         default_model=default_model,
         aliases=aliases,
+        idle_timeout=settings.model_idle_timeout,
+        memory_budget_bytes=settings.model_memory_budget_mb * 1024 * 1024,
+        warmup_on_load=settings.warmup,
     )
+    if settings.preload_default_model:
+        manager.preload()
+    return manager
 
 
 @lru_cache(maxsize=1)
@@ -91,3 +279,18 @@ def create_detection_service() -> DetectionService:
 @lru_cache(maxsize=1)
 def get_detection_service() -> DetectionService:
     return create_detection_service()
+
+
+def create_job_runner(manager: DetectionServiceManager) -> JobRunner | None:
+    """Background job workers sharing ``manager``; None when GDINO_JOB_WORKERS is 0."""
+    settings = get_settings()
+    if settings.job_workers <= 0:
+        return None
+    store = JobStore(settings.jobs_db_path)
+    register_queue_depth("jobs", store.queued_count)
+    return JobRunner(
+        store=store,
+        manager=manager,
+        search_dir=settings.search_dir,
+        num_workers=settings.job_workers,
+    )
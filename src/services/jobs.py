@@ -0,0 +1,519 @@
+"""Background detection jobs: a SQLite-backed queue drained by worker threads.
+
+Jobs scan a gallery directory (or an explicit list of images inside it) with one
+caption. Workers share the process's ``DetectionServiceManager`` and record one row per
+image as they go, so clients can poll progress and partial results and cancel a job
+between images. Interactive requests hold ``INTERACTIVE_GATE`` while they run; job
+workers wait for it to clear before each image so ``/detect`` keeps its latency.
+
+Several processes (uvicorn workers) can drain one database. Each ``JobStore`` claims
+jobs under its own owner id and keeps a heartbeat row fresh; a ``running`` job is only
+re-queued once its owner has stopped or its heartbeat is older than ``stale_after``.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from src.services.manager import DetectionServiceManager
+
+JOB_STATUSES = ("queued", "running", "completed", "failed", "cancelled")
+FINAL_STATUSES = ("completed", "failed", "cancelled")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    status TEXT NOT NULL,
+    spec TEXT NOT NULL,
+    total INTEGER,
+    processed INTEGER NOT NULL DEFAULT 0,
+    matched INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    owner TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS job_owners (
+    owner TEXT PRIMARY KEY,
+    heartbeat REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS job_results (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    image TEXT NOT NULL,
+    detections TEXT NOT NULL,
+    annotated_path TEXT,
+    PRIMARY KEY (job_id, seq)
+);
+"""
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class _WorkerStopping(Exception):
+    """The runner is shutting down; the job stays ``running`` and is re-queued on restart."""
+
+
+@dataclass(frozen=True)
+class JobSpec:
+    caption: str
+    model: Optional[str] = None
+    directory: Optional[str] = None  # relative to the service's search directory
+    images: Optional[List[str]] = None  # relative to the service's search directory
+    patterns: Optional[List[str]] = None
+    box_threshold: Optional[float] = None
+    text_threshold: Optional[float] = None
+    limit: Optional[int] = None
+    only_with_detections: bool = True
+
+
+@dataclass
+class JobRecord:
+    id: str
+    status: str
+    spec: JobSpec
+    total: Optional[int]
+    processed: int
+    matched: int
+    error: Optional[str]
+    cancel_requested: bool
+    created_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+    results: List[dict] = field(default_factory=list)
+
+    @property
+    def done(self) -> bool:
+        return self.status in FINAL_STATUSES
+
+
+class PriorityGate:
+    """Lets background work yield to interactive requests.
+
+    ``interactive()`` marks a latency-sensitive request in flight; ``wait_idle()``
+    blocks background workers until none are (or ``timeout`` passes).
+    """
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._active = 0
+
+    @contextmanager
+    def interactive(self) -> Iterator[None]:
+        with self._condition:
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._active -= 1
+                if self._active == 0:
+                    self._condition.notify_all()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        with self._condition:
+            return self._condition.wait_for(lambda: self._active == 0, timeout=timeout)
+
+
+INTERACTIVE_GATE = PriorityGate()
+
+
+class JobStore:
+    """Persistent job table. Safe to share between threads of one process, and between
+    processes through the database (claims are conditional updates, see ``claim_next``)."""
+
+    def __init__(self, path: Path, *, stale_after: float = 60.0) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(str(path), check_same_thread=False, timeout=10.0)
+        self._connection.row_factory = sqlite3.Row
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(_SCHEMA)
+            columns = {row["name"] for row in self._connection.execute("PRAGMA table_info(jobs)")}
+            if "owner" not in columns:  # databases created before claims had owners
+                self._connection.execute("ALTER TABLE jobs ADD COLUMN owner TEXT")
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+    def heartbeat(self) -> None:
+        """Tell other processes this store's claims are still being worked on."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO job_owners (owner, heartbeat) VALUES (?, ?) "
+                "ON CONFLICT(owner) DO UPDATE SET heartbeat = excluded.heartbeat",
+                (self.owner, time.time()),
+            )
+
+    def release_owner(self) -> None:
+        """Drop the heartbeat so jobs this store leaves ``running`` are re-queued at once."""
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM job_owners WHERE owner = ?", (self.owner,))
+
+    def create(self, spec: JobSpec) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO jobs (id, status, spec, created_at) VALUES (?, 'queued', ?, ?)",
+                (job_id, json.dumps(asdict(spec)), time.time()),
+            )
+        return job_id
+
+    def claim_next(self) -> Optional[str]:
+        """Move the oldest queued job to ``running`` under this store's owner and return its id.
+
+        The update only succeeds while the job is still queued, so when another process
+        claims the same row first this one moves on to the next queued job.
+        """
+        with self._lock, self._connection:
+            while True:
+                row = self._connection.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    return None
+                claimed = self._connection.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, owner = ? "
+                    "WHERE id = ? AND status = 'queued'",
+                    (time.time(), self.owner, row["id"]),
+                ).rowcount
+                if claimed:
+                    return row["id"]
+
+    def requeue_interrupted(self) -> int:
+        """Jobs whose owner is gone start over from the beginning.
+
+        An owner is gone when it has no heartbeat row (it stopped, or the job predates
+        owners) or its heartbeat is older than ``stale_after`` (it crashed). Jobs of this
+        store and of live sibling processes are left alone.
+        """
+        cutoff = time.time() - self.stale_after
+        with self._lock, self._connection:
+            rows = self._connection.execute(
+                "SELECT id FROM jobs WHERE status = 'running' AND (owner IS NULL OR ("
+                "owner != ? AND owner NOT IN (SELECT owner FROM job_owners WHERE heartbeat >= ?)))",
+                (self.owner, cutoff),
+            ).fetchall()
+            requeued = 0
+            for row in rows:
+                if self._connection.execute(
+                    "UPDATE jobs SET status = 'queued', processed = 0, matched = 0, total = NULL, "
+                    "started_at = NULL, owner = NULL WHERE id = ? AND status = 'running'",
+                    (row["id"],),
+                ).rowcount:
+                    self._connection.execute("DELETE FROM job_results WHERE job_id = ?", (row["id"],))
+                    requeued += 1
+            self._connection.execute("DELETE FROM job_owners WHERE heartbeat < ?", (cutoff,))
+        return requeued
+
+    def set_total(self, job_id: str, total: int) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("UPDATE jobs SET total = ? WHERE id = ?", (total, job_id))
+
+    def add_progress(
+        self,
+        job_id: str,
+        *,
+        processed: int,
+        result: Optional[dict] = None,
+    ) -> None:
+        with self._lock, self._connection:
+            if result is not None:
+                seq = self._connection.execute(
+                    "SELECT COUNT(*) FROM job_results WHERE job_id = ?", (job_id,)
+                ).fetchone()[0]
+                self._connection.execute(
+                    "INSERT INTO job_results (job_id, seq, image, detections, annotated_path) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        job_id,
+                        seq,
+                        result["image"],
+                        json.dumps(result["detections"]),
+                        result.get("annotated_path"),
+                    ),
+                )
+            self._connection.execute(
+                "UPDATE jobs SET processed = processed + ?, matched = matched + ? WHERE id = ?",
+                (processed, 1 if result is not None else 0, job_id),
+            )
+
+    def finish(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                (status, error, time.time(), job_id),
+            )
+
+    def request_cancel(self, job_id: str) -> Optional[str]:
+        """Cancel a queued job at once, flag a running one. Returns the new status."""
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT status FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            if row["status"] == "queued":
+                self._connection.execute(
+                    "UPDATE jobs SET status = 'cancelled', cancel_requested = 1, finished_at = ? "
+                    "WHERE id = ?",
+                    (time.time(), job_id),
+                )
+                return "cancelled"
+            if row["status"] == "running":
+                self._connection.execute(
+                    "UPDATE jobs SET cancel_requested = 1 WHERE id = ?", (job_id,)
+                )
+            return row["status"]
+
+    def cancel_requested(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return bool(row and row["cancel_requested"])
+
+    def queued_count(self) -> int:
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued'"
+            ).fetchone()[0]
+
+    def get(self, job_id: str, *, results_offset: int = 0) -> Optional[JobRecord]:
+        with self._lock:
+            row = self._connection.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if row is None:
+                return None
+            result_rows = self._connection.execute(
+                "SELECT image, detections, annotated_path FROM job_results "
+                "WHERE job_id = ? AND seq >= ? ORDER BY seq",
+                (job_id, max(0, results_offset)),
+            ).fetchall()
+        return JobRecord(
+            id=row["id"],
+            status=row["status"],
+            spec=JobSpec(**json.loads(row["spec"])),
+            total=row["total"],
+            processed=row["processed"],
+            matched=row["matched"],
+            error=row["error"],
+            cancel_requested=bool(row["cancel_requested"]),
+            created_at=row["created_at"],
+            started_at=row["started_at"],
+            finished_at=row["finished_at"],
+            results=[
+                {
+                    "image": result["image"],
+                    "detections": json.loads(result["detections"]),
+                    "annotated_path": result["annotated_path"],
+                }
+                for result in result_rows
+            ],
+        )
+
+
+def resolve_in_directory(base: Path, relative: str) -> Path:
+    """``base / relative``, refusing paths that escape ``base``."""
+    base = base.resolve()
+    candidate = (base / relative).resolve()
+    if candidate != base and base not in candidate.parents:
+        raise ValueError(f"Path '{relative}' is outside the search directory.")
+    return candidate
+
+
+class JobRunner:
+    """Drains a ``JobStore`` with ``num_workers`` daemon threads.
+
+    A heartbeat thread keeps the store's owner row fresh every ``heartbeat_interval``
+    seconds and re-queues the jobs of owners that went away (crashed sibling workers).
+    """
+
+    def __init__(
+        self,
+        *,
+        store: JobStore,
+        manager: DetectionServiceManager,
+        search_dir: Path,
+        num_workers: int = 1,
+        gate: PriorityGate = INTERACTIVE_GATE,
+        poll_interval: float = 0.5,
+        heartbeat_interval: float = 5.0,
+    ) -> None:
+        self._store = store
+        self._manager = manager
+        self._search_dir = search_dir
+        self._num_workers = max(1, num_workers)
+        self._gate = gate
+        self._poll_interval = poll_interval
+        self._heartbeat_interval = heartbeat_interval
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._logger = logging.getLogger("uvicorn.error").getChild("jobs")
+
+    @property
+    def store(self) -> JobStore:
+        return self._store
+
+    def start(self) -> None:
+        self._store.heartbeat()
+        self._requeue_interrupted()
+        heartbeat = threading.Thread(target=self._heartbeat, name="detection-job-heartbeat", daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+        for index in range(self._num_workers):
+            thread = threading.Thread(target=self._work, name=f"detection-job-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads.clear()
+        try:
+            self._store.release_owner()
+        except sqlite3.Error:
+            self._logger.exception("Could not release the job owner row")
+
+    def _requeue_interrupted(self) -> None:
+        requeued = self._store.requeue_interrupted()
+        if requeued:
+            self._logger.info("Re-queued %d interrupted job(s)", requeued)
+            self._wakeup.set()
+
+    def _heartbeat(self) -> None:
+        while not self._stopping.wait(self._heartbeat_interval):
+            try:
+                self._store.heartbeat()
+                self._requeue_interrupted()
+            except sqlite3.Error:
+                self._logger.exception("Job heartbeat failed")
+
+    def submit(self, spec: JobSpec) -> str:
+        """Queue a job. Unknown model keys and paths outside ``search_dir`` fail here,
+        without loading the model."""
+        self._manager.canonical_key(spec.model)
+        if spec.directory is not None:
+            resolve_in_directory(self._search_dir, spec.directory)
+        for image in spec.images or []:
+            resolve_in_directory(self._search_dir, image)
+        job_id = self._store.create(spec)
+        self._wakeup.set()
+        return job_id
+
+    def cancel(self, job_id: str) -> Optional[str]:
+        return self._store.request_cancel(job_id)
+
+    def _work(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                job_id = self._store.claim_next()
+            except sqlite3.Error:  # e.g. "database is locked" by another process
+                self._logger.exception("Claiming the next job failed")
+                self._stopping.wait(self._poll_interval)
+                continue
+            if job_id is None:
+                self._wakeup.wait(self._poll_interval)
+                self._wakeup.clear()
+                continue
+            try:
+                self.run_job(job_id)
+            except _WorkerStopping:
+                return
+            except JobCancelled:
+                self._store.finish(job_id, "cancelled")
+            except Exception as exc:  # noqa: BLE001 - a bad job must not kill the worker
+                self._logger.exception("Job %s failed", job_id)
+                self._store.finish(job_id, "failed", error=str(exc))
+            else:
+                self._store.finish(job_id, "completed")
+
+    def _image_paths(self, spec: JobSpec, service) -> List[Path]:
+        if spec.images:
+            return [resolve_in_directory(service.search_dir, image) for image in spec.images]
+        directory = (
+            resolve_in_directory(service.search_dir, spec.directory)
+            if spec.directory is not None
+            else None
+        )
+        return service.list_images(directory=directory, patterns=spec.patterns)
+
+    def run_job(self, job_id: str) -> None:
+        record = self._store.get(job_id)
+        with self._manager.use(record.spec.model) as service:
+            self._run_job(job_id, record.spec, service)
+
+    def _admitted(self, job_id: str, image_paths: List[Path]) -> Iterator[Path]:
+        """``image_paths``, each released only once interactive traffic is idle and the
+        job is neither cancelled nor its worker stopping."""
+        for image_path in image_paths:
+            self._gate.wait_idle()
+            if self._stopping.is_set():
+                raise _WorkerStopping(job_id)
+            if self._store.cancel_requested(job_id):
+                raise JobCancelled(job_id)
+            yield image_path
+
+    def _run_job(self, job_id: str, spec: JobSpec, service) -> None:
+        image_paths = self._image_paths(spec, service)
+        self._store.set_total(job_id, len(image_paths))
+        if spec.only_with_detections:
+            kept = service.prefilter_images(image_paths, spec.caption)
+            pruned = len(image_paths) - len(kept)
+            if pruned:
+                self._store.add_progress(job_id, processed=pruned)
+            image_paths = kept
+
+        matched = 0
+        payloads = service.detect_many(
+            image_paths=self._admitted(job_id, image_paths),
+            caption=spec.caption,
+            box_threshold=spec.box_threshold,
+            text_threshold=spec.text_threshold,
+        )
+        for payload in payloads:
+            image_path = payload.source_path
+            if spec.only_with_detections and not payload.items:
+                self._store.add_progress(job_id, processed=1)
+                continue
+            annotated_path = payload.annotated_path
+            if annotated_path is None and payload.annotation is not None:
+                annotated_path = payload.annotation.schedule().target_path
+            self._store.add_progress(
+                job_id,
+                processed=1,
+                result={
+                    "image": str(image_path),
+                    "detections": [asdict(item) for item in payload.items],
+                    "annotated_path": str(annotated_path) if annotated_path else None,
+                },
+            )
+            matched += 1
+            if spec.limit is not None and matched >= spec.limit:
+                return
@@ -1,38 +1,100 @@
 from __future__ import annotations
 
-from typing import Dict, Iterable, Optional
+import gc
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
 
 from src.services.detection_service import DetectionService
+from src.services.metrics import METRICS
+
+ServiceFactory = Callable[[], DetectionService]
+
+METRICS.gauge("gdino_model_loaded", "1 while a model is loaded in this worker.", ("model",))
+METRICS.counter("gdino_model_loads_total", "Model loads by model key.", ("model",))
+METRICS.counter(
+    "gdino_model_evictions_total",
+    "Model evictions by model key and reason (idle or memory).",
+    ("model", "reason"),
+)
+
+
+@dataclass
+class _ServiceSlot:
+    factory: Optional[ServiceFactory]
+    service: Optional[DetectionService] = None
+    last_used: float = 0.0
+    active: int = 0  # requests currently holding the service via ``use``
+    size_bytes: int = 0
+    lock: threading.Lock = field(default_factory=threading.Lock)
+
+    @property
+    def evictable(self) -> bool:
+        return self.factory is not None and self.service is not None and self.active == 0
+
+
+def _service_bytes(service: DetectionService) -> int:
+    memory_bytes = getattr(service, "memory_bytes", None)
+    return int(memory_bytes()) if callable(memory_bytes) else 0
 
 
 class DetectionServiceManager:
-    """Registry that maps model keys to detection service instances."""
+    """Registry that maps model keys to detection services.
+
+    Services are registered either built (``services``; kept for the process lifetime)
+    or as ``factories`` that build them on the first ``resolve``. Lazily built services
+    are evicted once unused for ``idle_timeout`` seconds, and least recently used first
+    while the loaded models exceed ``memory_budget_bytes``; the next ``resolve`` loads
+    them again. 0 disables either limit.
+    """
 
     def __init__(
         self,
         *,
-        services: Dict[str, DetectionService],
+        services: Optional[Dict[str, DetectionService]] = None,
+        factories: Optional[Dict[str, ServiceFactory]] = None,
         default_model: str,
         aliases: Optional[Dict[str, Iterable[str]]] = None,
+        idle_timeout: float = 0.0,
+        memory_budget_bytes: int = 0,
+        warmup_on_load: bool = False,
+        clock: Callable[[], float] = time.monotonic,
     ) -> None:
-        if not services:
+        if not services and not factories:
             raise ValueError("At least one detection service must be provided.")
 
-        normalized = {self._normalize_key(key): value for key, value in services.items()}
-        self._services = normalized
+        slots: Dict[str, _ServiceSlot] = {}
+        for key, factory in (factories or {}).items():
+            slots[self._normalize_key(key)] = _ServiceSlot(factory=factory)
+        for key, service in (services or {}).items():
+            slots[self._normalize_key(key)] = _ServiceSlot(factory=None, service=service)
+        self._slots = slots
+        self._lock = threading.Lock()
+        self._clock = clock
+        self._idle_timeout = idle_timeout
+        self._memory_budget_bytes = memory_budget_bytes
+        self._warmup_on_load = warmup_on_load
+        self._reaper: Optional[threading.Thread] = None
+        self._reaper_stop = threading.Event()
+        self._logger = logging.getLogger("uvicorn.error").getChild("models")
+        for key, slot in slots.items():
+            METRICS.set("gdino_model_loaded", 1 if slot.service is not None else 0, key)
 
         alias_mapping: Dict[str, str] = {}
         if aliases:
             for canonical, alias_list in aliases.items():
                 canonical_key = self._normalize_key(canonical)
-                if canonical_key not in normalized:
+                if canonical_key not in slots:
                     continue
                 for alias in alias_list:
                     alias_mapping[self._normalize_key(alias)] = canonical_key
         self._aliases = alias_mapping
 
         default_key = self._normalize_key(default_model)
-        if default_key not in normalized:
+        if default_key not in slots:
             raise ValueError(f"Default model '{default_model}' is not registered.")
         self._default_key = default_key
 
@@ -40,26 +102,196 @@ class DetectionServiceManager:
     def _normalize_key(key: str) -> str:
         return key.strip().lower()
 
-    def resolve(self, model_name: Optional[str] = None) -> DetectionService:
-        """Return the detection service for the requested model key."""
+    def canonical_key(self, model_name: Optional[str] = None) -> str:
+        """Registered key for ``model_name`` (or an alias of it); KeyError if unknown."""
         if model_name is None:
-            return self._services[self._default_key]
-
+            return self._default_key
         key = self._normalize_key(model_name)
-        if key in self._services:
-            return self._services[key]
+        if key in self._slots:
+            return key
         if key in self._aliases:
-            resolved = self._aliases[key]
-            return self._services[resolved]
+            return self._aliases[key]
 
-        available = ", ".join(sorted(self._services.keys()))
+        available = ", ".join(sorted(self._slots.keys()))
         raise KeyError(
             f"Unknown detection model '{model_name}'. Available models: {available}"
         )
 
+    def resolve(self, model_name: Optional[str] = None) -> DetectionService:
+        """Return the detection service for the requested model key, loading it if needed.
+
+        Prefer ``use`` for work that must not race an eviction of the model.
+        """
+        key = self.canonical_key(model_name)
+        service = self._load(key, self._slots[key])
+        self.evict_idle()
+        return service
+
+    @contextmanager
+    def use(self, model_name: Optional[str] = None) -> Iterator[DetectionService]:
+        """Resolve a service and keep it from being evicted until the block exits."""
+        key = self.canonical_key(model_name)
+        slot = self._slots[key]
+        with self._lock:
+            slot.active += 1
+        try:
+            yield self._load(key, slot)
+        finally:
+            with self._lock:
+                slot.active -= 1
+                slot.last_used = self._clock()
+
+    def _load(self, key: str, slot: _ServiceSlot, warmup: bool = True) -> DetectionService:
+        service = slot.service
+        if service is None:
+            with slot.lock:  # one load per model; other models resolve meanwhile
+                service = slot.service
+                if service is None:
+                    service = self._build(key, slot, warmup)
+        slot.last_used = self._clock()
+        return service
+
+    def _build(self, key: str, slot: _ServiceSlot, warmup: bool = True) -> DetectionService:
+        started = time.perf_counter()
+        service = slot.factory()
+        if not self._warmup_on_load:
+            service.mark_ready()
+        elif warmup:
+            service.warmup()
+        # else: preloaded and not ready yet; ``warmup()`` (the server's warm-up thread) follows
+        size_bytes = _service_bytes(service)
+        with self._lock:
+            slot.service = service
+            slot.size_bytes = size_bytes
+            slot.last_used = self._clock()
+        METRICS.inc("gdino_model_loads_total", key)
+        METRICS.set("gdino_model_loaded", 1, key)
+        self._logger.info(
+            "Loaded model '%s' in %.1fs (%.0f MB)",
+            key,
+            time.perf_counter() - started,
+            size_bytes / 2**20,
+        )
+        self._enforce_memory_budget(keep=key)
+        return service
+
+    def _evict(self, key: str, reason: str) -> bool:
+        with self._lock:
+            slot = self._slots[key]
+            if not slot.evictable:
+                return False
+            service = slot.service
+            slot.service = None
+            slot.size_bytes = 0
+        close = getattr(service, "close", None)  # replica pools stop their threads
+        if callable(close):
+            close()
+        METRICS.inc("gdino_model_evictions_total", key, reason)
+        METRICS.set("gdino_model_loaded", 0, key)
+        self._logger.info("Evicted model '%s' (%s)", key, reason)
+        gc.collect()
+        try:
+            import torch
+
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:  # pragma: no cover - torch is a core dependency
+            pass
+        return True
+
+    def evict(self, model_name: str) -> bool:
+        """Unload a lazily built model now; False if it is pinned, in use or not loaded."""
+        return self._evict(self.canonical_key(model_name), "manual")
+
+    def evict_idle(self) -> List[str]:
+        """Evict lazily built models unused for longer than ``idle_timeout``."""
+        if self._idle_timeout <= 0:
+            return []
+        deadline = self._clock() - self._idle_timeout
+        with self._lock:
+            idle = [
+                key
+                for key, slot in self._slots.items()
+                if slot.evictable and slot.last_used <= deadline
+            ]
+        return [key for key in idle if self._evict(key, "idle")]
+
+    def _enforce_memory_budget(self, keep: str) -> None:
+        if self._memory_budget_bytes <= 0:
+            return
+        while True:
+            with self._lock:
+                loaded = sum(slot.size_bytes for slot in self._slots.values())
+                candidates = sorted(
+                    (slot.last_used, key)
+                    for key, slot in self._slots.items()
+                    if key != keep and slot.evictable
+                )
+            if loaded <= self._memory_budget_bytes or not candidates:
+                return
+            self._evict(candidates[0][1], "memory")
+
+    def start_reaper(self, interval: Optional[float] = None) -> None:
+        """Evict idle models from a background thread (no-op without ``idle_timeout``)."""
+        if self._idle_timeout <= 0 or self._reaper is not None:
+            return
+        interval = interval or max(1.0, self._idle_timeout / 4)
+        self._reaper_stop.clear()
+
+        def run() -> None:
+            while not self._reaper_stop.wait(interval):
+                try:
+                    self.evict_idle()
+                except Exception:  # noqa: BLE001 - keep reaping
+                    self._logger.exception("Idle model eviction failed")
+
+        self._reaper = threading.Thread(target=run, name="model-reaper", daemon=True)
+        self._reaper.start()
+
+    def stop_reaper(self) -> None:
+        if self._reaper is None:
+            return
+        self._reaper_stop.set()
+        self._reaper.join()
+        self._reaper = None
+
+    def preload(self, model_name: Optional[str] = None) -> DetectionService:
+        """Load a model (the default one without ``model_name``) ahead of its first request.
+
+        The model is not warmed up here, so startup is not blocked on it; with
+        ``warmup_on_load`` it stays unready until ``warmup()`` runs.
+        """
+        key = self.canonical_key(model_name)
+        return self._load(key, self._slots[key], warmup=False)
+
+    def warmup(self) -> None:
+        """Warm up every loaded service (see ``DetectionService.warmup``)."""
+        for service in self.available_models().values():
+            service.warmup()
+
+    def mark_ready(self) -> None:
+        for service in self.available_models().values():
+            service.mark_ready()
+
+    @property
+    def ready(self) -> bool:
+        return all(self.readiness().values())
+
+    def readiness(self) -> Dict[str, bool]:
+        """Per model: warmed up if loaded; models that load on demand count as ready."""
+        return {
+            key: slot.service.ready if slot.service is not None else slot.factory is not None
+            for key, slot in self._slots.items()
+        }
+
+    def loaded_models(self) -> List[str]:
+        return [key for key, slot in self._slots.items() if slot.service is not None]
+
     def available_models(self) -> Dict[str, DetectionService]:
-        """Expose the registered services (read-only)."""
-        return dict(self._services)
+        """Expose the currently loaded services (read-only)."""
+        return {
+            key: slot.service for key, slot in self._slots.items() if slot.service is not None
+        }
 
     @property
     def default_model(self) -> str:
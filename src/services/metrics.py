@@ -0,0 +1,288 @@
+"""Text exposition of service metrics (Prometheus format) and per-request timing headers."""
+
+from __future__ import annotations
+
+import os
+import sys
+import threading
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from groundingdino.util.numerics import NUMERICS
+from groundingdino.util.time_counter import DEFAULT_LATENCY_BUCKETS, PROFILER, LatencyHistogram
+
+
+DETECTIONS_PER_IMAGE_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 300, 900)
+
+LabelValues = Tuple[str, ...]
+
+
+def format_server_timing(timings: Mapping[str, float]) -> str:
+    """``Server-Timing`` header value (durations in milliseconds) for one request."""
+    return ", ".join(f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items())
+
+
+def _escape_label_value(value: object) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Mapping[str, object]) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{_escape_label_value(value)}"' for key, value in labels.items())
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_histogram(
+    name: str,
+    help_text: str,
+    series: Mapping[LabelValues, LatencyHistogram],
+    label_names: Sequence[str],
+) -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for label_values, histogram in sorted(series.items()):
+        labels: Dict[str, str] = dict(zip(label_names, label_values))
+        bounds = [str(bound) for bound in histogram.buckets] + ["+Inf"]
+        for bound, count in zip(bounds, histogram.cumulative_counts()):
+            lines.append(f"{name}_bucket{_format_labels({**labels, 'le': bound})} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+    return lines
+
+
+def _render_samples(
+    name: str,
+    kind: str,
+    help_text: str,
+    series: Mapping[LabelValues, float],
+    label_names: Sequence[str],
+) -> List[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for label_values, value in sorted(series.items()):
+        labels = dict(zip(label_names, label_values))
+        lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+    return lines
+
+
+class _Metric:
+    def __init__(
+        self,
+        kind: str,
+        help_text: str,
+        label_names: Sequence[str],
+        buckets: Sequence[float],
+    ) -> None:
+        self.kind = kind
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self.series: Dict[LabelValues, object] = {}
+        self.callback: Optional[Callable[[], Mapping[LabelValues, float]]] = None
+
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges and histograms rendered in Prometheus text format.
+
+    Metrics are declared once with ``counter``/``gauge``/``histogram`` and updated by
+    name with label values in declaration order. Gauges can instead be sampled at
+    scrape time through ``gauge_callback`` (queue depths, memory).
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _declare(
+        self,
+        name: str,
+        kind: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = _Metric(kind, help_text, label_names, buckets)
+            elif metric.kind != kind:
+                raise ValueError(f"Metric '{name}' is already declared as a {metric.kind}.")
+            return metric
+
+    def counter(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> None:
+        self._declare(name, "counter", help_text, label_names)
+
+    def gauge(self, name: str, help_text: str, label_names: Sequence[str] = ()) -> None:
+        self._declare(name, "gauge", help_text, label_names)
+
+    def histogram(
+        self,
+        name: str,
+        help_text: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> None:
+        self._declare(name, "histogram", help_text, label_names, buckets)
+
+    def gauge_callback(
+        self,
+        name: str,
+        help_text: str,
+        callback: Callable[[], Mapping[LabelValues, float]],
+        label_names: Sequence[str] = (),
+    ) -> None:
+        """Sample ``callback`` (label values -> value) whenever metrics are rendered."""
+        self._declare(name, "gauge", help_text, label_names).callback = callback
+
+    def _metric(self, name: str) -> _Metric:
+        metric = self._metrics.get(name)
+        if metric is None:
+            raise KeyError(f"Metric '{name}' is not declared.")
+        return metric
+
+    def inc(self, name: str, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            series = self._metric(name).series
+            series[label_values] = series.get(label_values, 0.0) + amount
+
+    def dec(self, name: str, *label_values: str, amount: float = 1.0) -> None:
+        self.inc(name, *label_values, amount=-amount)
+
+    def set(self, name: str, value: float, *label_values: str) -> None:
+        with self._lock:
+            self._metric(name).series[label_values] = value
+
+    def observe(self, name: str, value: float, *label_values: str) -> None:
+        with self._lock:
+            metric = self._metric(name)
+            histogram = metric.series.get(label_values)
+            if histogram is None:
+                histogram = metric.series[label_values] = LatencyHistogram(metric.buckets)
+            histogram.observe(value)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            snapshot = []
+            for name, metric in sorted(self._metrics.items()):
+                if metric.kind == "histogram":
+                    series = {key: value.copy() for key, value in metric.series.items()}
+                else:
+                    series = dict(metric.series)
+                snapshot.append((name, metric, series))
+
+        lines: List[str] = []
+        for name, metric, series in snapshot:
+            if metric.callback is not None:
+                try:
+                    series = dict(metric.callback())
+                except Exception:  # noqa: BLE001 - a broken sampler must not break /metrics
+                    series = {}
+            if metric.kind == "histogram":
+                lines.extend(render_histogram(name, metric.help_text, series, metric.label_names))
+            else:
+                lines.extend(
+                    _render_samples(name, metric.kind, metric.help_text, series, metric.label_names)
+                )
+        return lines
+
+
+def process_resident_memory_bytes() -> float:
+    """Current RSS from /proc on Linux, peak RSS from getrusage elsewhere."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as fh:
+            return float(int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE"))
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return float(peak if sys.platform == "darwin" else peak * 1024)
+
+
+METRICS = MetricsRegistry()
+METRICS.counter(
+    "gdino_http_requests_total",
+    "HTTP requests by route, method and status code.",
+    ("route", "method", "status"),
+)
+METRICS.histogram(
+    "gdino_http_request_duration_seconds",
+    "HTTP request latency by route and method.",
+    ("route", "method"),
+)
+METRICS.gauge("gdino_http_requests_in_flight", "HTTP requests currently being served.")
+METRICS.histogram(
+    "gdino_model_inference_seconds",
+    "Per-image detection latency (load, predict, annotate) by model key.",
+    ("model",),
+)
+METRICS.histogram(
+    "gdino_detections_per_image",
+    "Number of detections returned per image by model key.",
+    ("model",),
+    buckets=DETECTIONS_PER_IMAGE_BUCKETS,
+)
+METRICS.counter(
+    "gdino_cache_lookups_total",
+    "Cache lookups by cache name and result (hit or miss).",
+    ("cache", "result"),
+)
+METRICS.gauge("gdino_model_ready", "1 once a model is loaded and warmed up.", ("model",))
+METRICS.gauge_callback(
+    "process_resident_memory_bytes",
+    "Resident memory size in bytes.",
+    lambda: {(): process_resident_memory_bytes()},
+)
+
+_queue_depth_samplers: Dict[str, Callable[[], int]] = {}
+
+
+def register_queue_depth(queue: str, sampler: Callable[[], int]) -> None:
+    """Expose the current depth of a work queue as ``gdino_queue_depth{queue=...}``."""
+    _queue_depth_samplers[queue] = sampler
+
+
+METRICS.gauge_callback(
+    "gdino_queue_depth",
+    "Items waiting in background work queues.",
+    lambda: {(queue,): float(sampler()) for queue, sampler in list(_queue_depth_samplers.items())},
+    ("queue",),
+)
+
+
+def render_stage_metrics() -> List[str]:
+    series = {(stage,): histogram for stage, histogram in PROFILER.histograms().items()}
+    return render_histogram(
+        "gdino_stage_duration_seconds",
+        "Wall time of inference stages (only recorded while GDINO_PROFILE is enabled).",
+        series,
+        ("stage",),
+    )
+
+
+def render_numerics_metrics() -> List[str]:
+    counts = NUMERICS.counts()
+    if not counts:
+        return []
+    checks = {(stage,): float(found["checks"]) for stage, found in counts.items()}
+    values = {
+        (stage, kind): float(found[kind]) for stage, found in counts.items() for kind in ("nan", "inf")
+    }
+    return _render_samples(
+        "gdino_numerics_checks_total",
+        "counter",
+        "Activations checked for NaN/Inf (only while GDINO_CHECK_NUMERICS is enabled).",
+        checks,
+        ("stage",),
+    ) + _render_samples(
+        "gdino_nonfinite_values_total",
+        "counter",
+        "NaN and Inf values found in checked activations by stage and kind.",
+        values,
+        ("stage", "kind"),
+    )
+
+
+def render_metrics() -> str:
+    return "\n".join(METRICS.render() + render_stage_metrics() + render_numerics_metrics()) + "\n"
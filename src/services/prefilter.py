@@ -0,0 +1,142 @@
+"""Cheap first-stage filters that prune gallery images before full detection."""
+
+from __future__ import annotations
+
+import logging
+import math
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Sequence
+
+import torch
+
+
+PREFILTER_MODES = ("none", "encoder", "downscale", "omdet")
+
+Scorer = Callable[[Path, str], float]
+
+
+@dataclass
+class PrefilterResult:
+    kept: List[Path]
+    scores: Dict[Path, float]
+    total: int
+
+    @property
+    def pruned(self) -> int:
+        return self.total - len(self.kept)
+
+    @property
+    def pruned_fraction(self) -> float:
+        return self.pruned / self.total if self.total else 0.0
+
+
+class GalleryPrefilter:
+    """Scores every image with a cheap model pass and keeps the likely matches.
+
+    Recall guards:
+    - ``threshold`` should sit well below the final box threshold, since cheap scores
+      are noisier than full-resolution ones.
+    - ``min_keep_fraction`` always keeps at least that share of the gallery (the
+      highest-scoring images), even when nothing clears the threshold.
+    - Images whose cheap pass fails are kept rather than dropped.
+    """
+
+    def __init__(
+        self,
+        *,
+        scorer: Scorer,
+        threshold: float,
+        min_keep_fraction: float = 0.0,
+        name: str = "prefilter",
+    ) -> None:
+        if not 0.0 <= min_keep_fraction <= 1.0:
+            raise ValueError("min_keep_fraction must be within [0, 1].")
+        self._scorer = scorer
+        self._threshold = threshold
+        self._min_keep_fraction = min_keep_fraction
+        self.name = name
+        self._logger = logging.getLogger("uvicorn.error").getChild(f"prefilter.{name}")
+
+    def select(self, image_paths: Sequence[Path], caption: str) -> PrefilterResult:
+        """Return the images worth running the full model on, in their original order."""
+        scores: Dict[Path, float] = {}
+        for image_path in image_paths:
+            try:
+                scores[image_path] = self._scorer(image_path, caption)
+            except Exception:  # noqa: BLE001 - a failing cheap pass must not hide images
+                self._logger.warning("Prefilter failed on image='%s'; keeping it", image_path)
+                scores[image_path] = math.inf
+
+        kept = {path for path, score in scores.items() if score >= self._threshold}
+        min_keep = math.ceil(self._min_keep_fraction * len(image_paths))
+        if len(kept) < min_keep:
+            ranked = sorted(image_paths, key=lambda path: scores[path], reverse=True)
+            kept.update(ranked[:min_keep])
+
+        return PrefilterResult(
+            kept=[path for path in image_paths if path in kept],
+            scores=scores,
+            total=len(image_paths),
+        )
+
+
+def build_grounding_dino_prefilter(
+    adapter,
+    *,
+    mode: str,
+    threshold: float,
+    min_keep_fraction: float = 0.0,
+    short_side: int = 400,
+) -> GalleryPrefilter:
+    """Prefilter backed by a reduced-resolution GroundingDINO pass.
+
+    ``encoder`` stops after the encoder and scores its two-stage proposals;
+    ``downscale`` runs the whole model on the downscaled image.
+    """
+    if mode not in ("encoder", "downscale"):
+        raise ValueError(f"Unsupported GroundingDINO prefilter mode '{mode}'.")
+    encoder_only = mode == "encoder"
+
+    def scorer(image_path: Path, caption: str) -> float:
+        return adapter.prefilter_score(
+            image_path,
+            caption,
+            short_side=short_side,
+            encoder_only=encoder_only,
+        )
+
+    return GalleryPrefilter(
+        scorer=scorer,
+        threshold=threshold,
+        min_keep_fraction=min_keep_fraction,
+        name=mode,
+    )
+
+
+def build_adapter_prefilter(
+    adapter,
+    *,
+    threshold: float,
+    min_keep_fraction: float = 0.0,
+    name: str = "omdet",
+) -> GalleryPrefilter:
+    """Prefilter backed by another (faster) detection adapter, e.g. OmDet Turbo."""
+
+    def scorer(image_path: Path, caption: str) -> float:
+        _, image_tensor = adapter.load_image(image_path)
+        prediction = adapter.predict(
+            image=image_tensor,
+            caption=caption,
+            box_threshold=threshold,
+            text_threshold=threshold,
+        )
+        logits = torch.as_tensor(prediction.logits)
+        return float(logits.max()) if logits.numel() else 0.0
+
+    return GalleryPrefilter(
+        scorer=scorer,
+        threshold=threshold,
+        min_keep_fraction=min_keep_fraction,
+        name=name,
+    )
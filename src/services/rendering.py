@@ -0,0 +1,115 @@
+"""Annotated-image rendering and encoding kept off the detection request path."""
+
+from __future__ import annotations
+
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Optional
+
+import numpy as np
+
+from groundingdino.util.time_counter import profile_stage
+from src.utils.file_io import write_bgr_image
+
+
+ANNOTATION_MODES = ("sync", "background", "lazy")
+
+Renderer = Callable[[], np.ndarray]
+
+
+class AnnotationWriter:
+    """Thread pool that renders and JPEG-encodes annotated images in the background.
+
+    cv2 releases the GIL while drawing and encoding, so a couple of workers keep up with
+    the detection loop without holding up responses.
+    """
+
+    def __init__(self, *, max_workers: int = 2, jpeg_quality: int = 90) -> None:
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, max_workers),
+            thread_name_prefix="annotation-writer",
+        )
+        self._jpeg_quality = jpeg_quality
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._logger = logging.getLogger("uvicorn.error").getChild("annotation_writer")
+
+    def write(self, image_bgr: np.ndarray, target_path: Path) -> Path:
+        with profile_stage("write"):
+            return write_bgr_image(image_bgr, target_path=target_path, quality=self._jpeg_quality)
+
+    def submit(self, render: Renderer, target_path: Path) -> Future:
+        """Render and write ``target_path`` on a worker; the future resolves to the path."""
+
+        def job() -> Path:
+            try:
+                return self.write(render(), target_path)
+            except Exception:
+                self._logger.exception("Failed to write annotation '%s'", target_path)
+                raise
+            finally:
+                with self._pending_lock:
+                    self._pending -= 1
+
+        with self._pending_lock:
+            self._pending += 1
+        return self._executor.submit(job)
+
+    def pending(self) -> int:
+        """Annotations submitted but not yet written."""
+        return self._pending
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._executor.shutdown(wait=wait)
+
+
+class AnnotationHandle:
+    """Annotated image of one detection result, rendered at most once.
+
+    ``image()`` renders on demand; ``path()`` returns the written file, waiting for a
+    background write scheduled with ``schedule()`` or writing synchronously otherwise.
+    Results that are never looked at are never rendered (``lazy`` mode).
+    """
+
+    def __init__(
+        self,
+        *,
+        render: Renderer,
+        target_path: Path,
+        writer: AnnotationWriter,
+    ) -> None:
+        self.target_path = target_path
+        self._render = render
+        self._writer = writer
+        self._image: Optional[np.ndarray] = None
+        self._future: Optional[Future] = None
+        self._lock = threading.Lock()
+
+    def image(self) -> np.ndarray:
+        """The annotated BGR image."""
+        with self._lock:
+            if self._image is None:
+                with profile_stage("annotate"):
+                    self._image = self._render()
+            return self._image
+
+    def schedule(self) -> "AnnotationHandle":
+        """Render and write the image on the writer pool."""
+        with self._lock:
+            if self._future is None:
+                self._future = self._writer.submit(self.image, self.target_path)
+        return self
+
+    def path(self, timeout: Optional[float] = None) -> Path:
+        """Path of the written image, rendering and writing it now if nothing is scheduled."""
+        with self._lock:
+            future = self._future
+        if future is not None:
+            return future.result(timeout=timeout)
+        return self._writer.write(self.image(), self.target_path)
+
+    @property
+    def done(self) -> bool:
+        return self._future is not None and self._future.done()
@@ -0,0 +1,341 @@
+"""Replica pools: several copies of one model behind a single detection service.
+
+One ``DetectionService`` wraps one adapter, so concurrent requests for a model queue
+on it. A ``ReplicaPool`` builds ``N`` services, each pinned to its own device (one per
+GPU) or CPU core set (one per NUMA node), runs every replica on a dedicated worker
+thread and sends each request to the healthy replica with the fewest outstanding
+requests. The pool has the ``DetectionService`` surface the manager and the API use.
+"""
+
+from __future__ import annotations
+
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import torch
+
+from src.services.cpu_layout import available_cpus, format_cpu_list, numa_node_cpus, plan_thread_layout
+from src.services.detection_service import DetectionService
+from src.services.metrics import METRICS
+
+REPLICA_CPU_MODES = ("none", "split", "numa")
+
+METRICS.counter(
+    "gdino_replica_requests_total",
+    "Requests per model replica by outcome (ok, error = rejected request, failure = replica fault).",
+    ("model", "replica", "outcome"),
+)
+METRICS.gauge("gdino_replica_outstanding", "Requests queued on or running in a replica.", ("model", "replica"))
+METRICS.gauge("gdino_replica_healthy", "1 while a replica receives traffic.", ("model", "replica"))
+
+# errors that say something about the replica (CUDA OOM, device lost, ...) rather than
+# about the request (bad image, unknown result id, missing file)
+_REPLICA_FAULTS = (RuntimeError, MemoryError)
+
+
+@dataclass(frozen=True)
+class ReplicaSpec:
+    index: int
+    device: str
+    cpus: Optional[Tuple[int, ...]] = None  # cores for the replica's worker thread
+
+    def describe(self) -> str:
+        pinned = format_cpu_list(self.cpus) if self.cpus is not None else "not pinned"
+        return f"replica {self.index}: device={self.device}, cores={pinned}"
+
+
+def _cuda_device_count() -> int:
+    try:
+        import torch
+    except ImportError:  # pragma: no cover - torch is a core dependency
+        return 0
+    return torch.cuda.device_count() if torch.cuda.is_available() else 0
+
+
+def plan_replicas(
+    count: int,
+    *,
+    device: str,
+    devices: Optional[Sequence[str]] = None,
+    cpu_mode: str = "none",
+    cpus: Optional[Sequence[int]] = None,
+    numa_nodes: Optional[Sequence[Tuple[int, ...]]] = None,
+    gpu_count: Optional[int] = None,
+) -> List[ReplicaSpec]:
+    """Devices and core sets for ``count`` replicas of a model that runs on ``device``.
+
+    ``count`` 0 means one replica per GPU for CUDA models, one per NUMA node with
+    ``cpu_mode="numa"`` and a single replica otherwise. ``devices`` are handed out
+    round robin; without them a plain ``"cuda"`` model spreads over all GPUs. Core
+    sets come from ``cpu_mode``: ``"split"`` cuts ``cpus`` into even slices, ``"numa"``
+    gives each replica the cores of one node (round robin) and ``"none"`` pins nothing.
+    """
+    if cpu_mode not in REPLICA_CPU_MODES:
+        raise ValueError(f"Unknown replica CPU mode '{cpu_mode}'. Expected one of: {', '.join(REPLICA_CPU_MODES)}")
+    gpu_count = _cuda_device_count() if gpu_count is None else gpu_count
+    if cpu_mode == "numa" and numa_nodes is None:
+        numa_nodes = numa_node_cpus()
+    cpus = sorted(cpus) if cpus is not None else available_cpus()
+
+    if count <= 0:
+        if devices:
+            count = len(devices)
+        elif device.startswith("cuda"):
+            count = max(1, gpu_count)
+        elif cpu_mode == "numa":
+            count = len(numa_nodes)
+        else:
+            count = 1
+    if not devices and device == "cuda" and gpu_count > 1 and count > 1:
+        devices = [f"cuda:{index}" for index in range(gpu_count)]
+
+    specs: List[ReplicaSpec] = []
+    for index in range(count):
+        pinned: Optional[Tuple[int, ...]] = None
+        if cpu_mode == "split":
+            pinned = plan_thread_layout(cpus, num_workers=count, worker_index=index, pin_cores=True).cpus
+        elif cpu_mode == "numa":
+            pinned = tuple(numa_nodes[index % len(numa_nodes)])
+        specs.append(
+            ReplicaSpec(index=index, device=devices[index % len(devices)] if devices else device, cpus=pinned)
+        )
+    return specs
+
+
+def _init_replica_thread(cpus: Optional[Tuple[int, ...]], size_threads: bool) -> None:
+    # Linux applies the mask to the calling thread only; torch's OpenMP team for this
+    # thread is created later and inherits it, and pages the model touches first while
+    # loading here come from the local NUMA node.
+    if cpus is None:
+        return
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    if size_threads:
+        # the OpenMP team of this thread, sized to the replica's cores, not the worker's
+        torch.set_num_threads(len(cpus))
+
+
+class _Replica:
+    def __init__(self, spec: ReplicaSpec, executor: ThreadPoolExecutor) -> None:
+        self.spec = spec
+        self.executor = executor
+        self.service: Optional[DetectionService] = None
+        self.outstanding = 0
+        self.served = 0
+        self.last_dispatch = 0  # dispatch sequence number, breaks ties round robin
+        self.failures = 0  # consecutive replica faults
+        self.unhealthy_until = 0.0
+        self.last_error: Optional[str] = None
+
+    @property
+    def label(self) -> str:
+        return str(self.spec.index)
+
+
+class ReplicaPool:
+    """Least-outstanding-requests dispatch over replicas of one detection service.
+
+    ``factory`` builds a replica's service for a ``ReplicaSpec``; it runs on the
+    replica's own (pinned) worker thread, which then executes all of that replica's
+    requests one at a time. A replica that raises ``max_failures`` faults in a row
+    (``RuntimeError``/``MemoryError``, e.g. CUDA out of memory) gets no traffic for
+    ``cooldown`` seconds; when every replica is cooling down the least recently failed
+    one is used anyway rather than rejecting the request. With ``size_thread_pools``
+    each pinned replica thread sizes its torch thread pool to its own core set.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[ReplicaSpec], DetectionService],
+        specs: Sequence[ReplicaSpec],
+        *,
+        model_name: str,
+        max_failures: int = 3,
+        cooldown: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+        size_thread_pools: bool = False,
+    ) -> None:
+        if not specs:
+            raise ValueError("A replica pool needs at least one replica.")
+        self._model_name = model_name
+        self._max_failures = max(1, max_failures)
+        self._cooldown = cooldown
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._dispatches = 0
+        self._logger = logging.getLogger("uvicorn.error").getChild(f"replicas.{model_name}")
+        self._replicas = [
+            _Replica(
+                spec,
+                ThreadPoolExecutor(
+                    max_workers=1,
+                    thread_name_prefix=f"{model_name}-replica-{spec.index}",
+                    initializer=_init_replica_thread,
+                    initargs=(spec.cpus, size_thread_pools),
+                ),
+            )
+            for spec in specs
+        ]
+        builds = [replica.executor.submit(factory, replica.spec) for replica in self._replicas]
+        try:
+            for replica, build in zip(self._replicas, builds):
+                replica.service = build.result()
+                METRICS.set("gdino_replica_healthy", 1, model_name, replica.label)
+                METRICS.set("gdino_replica_outstanding", 0, model_name, replica.label)
+                self._logger.info("Built %s", replica.spec.describe())
+        except BaseException:
+            self.close()
+            raise
+
+    # -- dispatch ---------------------------------------------------------------
+
+    def _acquire(self) -> _Replica:
+        now = self._clock()
+        with self._lock:
+            healthy = [replica for replica in self._replicas if replica.unhealthy_until <= now]
+            if healthy:
+                replica = min(healthy, key=lambda r: (r.outstanding, r.last_dispatch))
+            else:
+                replica = min(self._replicas, key=lambda r: r.unhealthy_until)
+            replica.outstanding += 1
+            replica.served += 1
+            self._dispatches += 1
+            replica.last_dispatch = self._dispatches
+        METRICS.inc("gdino_replica_outstanding", self._model_name, replica.label)
+        return replica
+
+    def _release(self, replica: _Replica, outcome: str, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            replica.outstanding -= 1
+            if outcome == "failure":
+                replica.failures += 1
+                replica.last_error = repr(error)
+                tripped = replica.failures >= self._max_failures
+                if tripped:
+                    replica.unhealthy_until = self._clock() + self._cooldown
+                    replica.failures = 0
+            else:
+                replica.failures = 0
+                tripped = False
+        METRICS.dec("gdino_replica_outstanding", self._model_name, replica.label)
+        METRICS.inc("gdino_replica_requests_total", self._model_name, replica.label, outcome)
+        METRICS.set("gdino_replica_healthy", 0 if tripped else 1, self._model_name, replica.label)
+        if tripped:
+            self._logger.warning(
+                "Taking %s out of rotation for %.0fs after %d faults (last: %s)",
+                replica.spec.describe(),
+                self._cooldown,
+                self._max_failures,
+                replica.last_error,
+            )
+
+    @staticmethod
+    def _submit(replica: _Replica, method: str, *args: Any, **kwargs: Any) -> Future:
+        # run in a copy of the caller's context, so e.g. ``PROFILER.collect()`` sees the
+        # stage timings recorded on the replica thread
+        context = contextvars.copy_context()
+        return replica.executor.submit(context.run, getattr(replica.service, method), *args, **kwargs)
+
+    def _dispatch(self, method: str, *args: Any, **kwargs: Any) -> Any:
+        replica = self._acquire()
+        try:
+            result = self._submit(replica, method, *args, **kwargs).result()
+        except _REPLICA_FAULTS as exc:
+            self._release(replica, "failure", exc)
+            raise
+        except BaseException:
+            self._release(replica, "error")
+            raise
+        self._release(replica, "ok")
+        return result
+
+    def _on_every_replica(self, method: str, *args: Any, **kwargs: Any) -> None:
+        calls: List[Future] = [
+            self._submit(replica, method, *args, **kwargs)
+            for replica in self._replicas
+        ]
+        for call in calls:
+            call.result()
+
+    # -- DetectionService surface ----------------------------------------------
+
+    def detect_from_bytes(self, **kwargs: Any):
+        return self._dispatch("detect_from_bytes", **kwargs)
+
+    def detect_from_path(self, *args: Any, **kwargs: Any):
+        return self._dispatch("detect_from_path", *args, **kwargs)
+
+    def detect_many(self, *, image_paths: Iterable[Path], **kwargs: Any) -> Iterator[Any]:
+        # a stream cannot cross the replica threads, so each image is dispatched on its own
+        for image_path in image_paths:
+            yield self.detect_from_path(image_path=image_path, **kwargs)
+
+    def refilter(self, *args: Any, **kwargs: Any):
+        # results are shared through the result cache, so any replica can refilter them
+        return self._dispatch("refilter", *args, **kwargs)
+
+    def detect_in_directory(self, *args: Any, **kwargs: Any):
+        return self._dispatch("detect_in_directory", *args, **kwargs)
+
+    def scan_directory(self, *args: Any, **kwargs: Any):
+        return self._dispatch("scan_directory", *args, **kwargs)
+
+    def prefilter_images(self, *args: Any, **kwargs: Any):
+        return self._dispatch("prefilter_images", *args, **kwargs)
+
+    def list_images(self, *args: Any, **kwargs: Any):
+        return self._replicas[0].service.list_images(*args, **kwargs)
+
+    @property
+    def model_name(self) -> str:
+        return self._replicas[0].service.model_name
+
+    @property
+    def search_dir(self):
+        return self._replicas[0].service.search_dir
+
+    @property
+    def ready(self) -> bool:
+        return all(replica.service.ready for replica in self._replicas)
+
+    def warmup(self, caption: str = "object") -> None:
+        """Warm up all replicas in parallel, each on its own thread and device."""
+        self._on_every_replica("warmup", caption)
+
+    def mark_ready(self) -> None:
+        for replica in self._replicas:
+            replica.service.mark_ready()
+
+    def memory_bytes(self) -> int:
+        return sum(replica.service.memory_bytes() for replica in self._replicas)
+
+    # -- pool management --------------------------------------------------------
+
+    def replica_status(self) -> List[Dict[str, Any]]:
+        now = self._clock()
+        with self._lock:
+            return [
+                {
+                    "replica": replica.spec.index,
+                    "device": replica.spec.device,
+                    "cpus": format_cpu_list(replica.spec.cpus) if replica.spec.cpus is not None else None,
+                    "healthy": replica.unhealthy_until <= now,
+                    "outstanding": replica.outstanding,
+                    "served": replica.served,
+                    "last_error": replica.last_error,
+                }
+                for replica in self._replicas
+            ]
+
+    def close(self) -> None:
+        """Stop the replica threads once their queued requests finish."""
+        for replica in self._replicas:
+            replica.executor.shutdown(wait=False)
+            METRICS.set("gdino_replica_healthy", 0, self._model_name, replica.label)
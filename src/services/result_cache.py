@@ -0,0 +1,233 @@
+"""Cache of raw (pre-threshold) predictions keyed by image content, caption and model.
+
+Entries hold a ``RawPrediction``, so a repeated request with different thresholds is
+served by re-filtering instead of re-running the model. The in-memory tier is an LRU
+bounded by entry count; the optional disk tier stores one ``.npz`` file per entry and
+evicts least recently used files once it grows past ``max_disk_bytes``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import torch
+
+from groundingdino.util.inference import RawPrediction, preprocess_caption
+from src.services.metrics import METRICS
+
+
+def content_digest(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def file_digest(path: Path, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def normalize_caption(caption: str) -> str:
+    """Captions the tokenizer cannot tell apart map to the same key: case, whitespace and
+    spacing around punctuation (split off as separate tokens) do not matter."""
+    return " ".join(re.findall(r"\w+|[^\w\s]", preprocess_caption(caption)))
+
+
+def make_cache_key(
+    image_digest: str, caption: str, model_name: str, model_version: str, variant: str = ""
+) -> str:
+    """``variant`` names serving options that change the prediction (tiling, prompt bank)."""
+    parts = (image_digest, normalize_caption(caption), model_name, model_version)
+    if variant:
+        parts += (variant,)
+    return hashlib.blake2b("\0".join(parts).encode("utf-8"), digest_size=20).hexdigest()
+
+
+def raw_prediction_to_arrays(raw: RawPrediction) -> Dict[str, np.ndarray]:
+    """Sparse layout: only non-zero token scores are stored, with their coordinates.
+
+    After ``RawPrediction.compact`` most token scores are zero, so this is a few KB per
+    image instead of the dense ``(num_queries, num_tokens)`` matrix.
+    """
+    logits = raw.logits.numpy()
+    query_idx, token_idx = np.nonzero(logits)
+    return {
+        "shape": np.asarray(logits.shape, dtype=np.int64),
+        "query_idx": query_idx.astype(np.int16 if logits.shape[0] < 2**15 else np.int32),
+        "token_idx": token_idx.astype(np.int16),
+        "values": logits[query_idx, token_idx].astype(np.float32),
+        "boxes": raw.boxes.numpy().astype(np.float32),
+        "input_ids": np.asarray(raw.input_ids, dtype=np.int32),
+        "bounds": np.asarray([raw.min_box_threshold, raw.min_text_threshold], dtype=np.float64),
+    }
+
+
+def raw_prediction_from_arrays(data) -> RawPrediction:
+    logits = np.zeros(tuple(data["shape"]), dtype=np.float32)
+    logits[data["query_idx"].astype(np.int64), data["token_idx"].astype(np.int64)] = data["values"]
+    min_box, min_text = data["bounds"].tolist()
+    return RawPrediction(
+        logits=torch.from_numpy(logits),
+        boxes=torch.from_numpy(data["boxes"]),
+        input_ids=data["input_ids"].tolist(),
+        min_box_threshold=min_box,
+        min_text_threshold=min_text,
+    )
+
+
+class ResultCache:
+    """Thread-safe two-tier cache of ``RawPrediction`` objects."""
+
+    def __init__(
+        self,
+        *,
+        max_entries: int = 256,
+        disk_dir: Optional[Path] = None,
+        max_disk_bytes: int = 1 << 30,
+        top_k: int = 100,
+        token_floor: float = 0.05,
+        name: str = "results",
+    ) -> None:
+        """Entries are stored as ``RawPrediction.compact(top_k, token_floor)``; ``top_k``
+        of 0 keeps every query."""
+        self._max_entries = max(0, max_entries)
+        self._top_k = top_k
+        self._token_floor = token_floor
+        self._memory: "OrderedDict[str, RawPrediction]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._name = name
+        self._disk_dir = disk_dir
+        self._max_disk_bytes = max_disk_bytes
+        self._disk_bytes = 0
+        self._logger = logging.getLogger("uvicorn.error").getChild(f"cache.{name}")
+        if disk_dir is not None:
+            disk_dir.mkdir(parents=True, exist_ok=True)
+            self._disk_bytes = sum(path.stat().st_size for path in disk_dir.glob("*.npz"))
+
+    def __len__(self) -> int:
+        return len(self._memory)
+
+    @property
+    def top_k(self) -> int:
+        return self._top_k
+
+    @property
+    def token_floor(self) -> float:
+        return self._token_floor
+
+    @property
+    def disk_bytes(self) -> int:
+        return self._disk_bytes
+
+    def get(
+        self,
+        key: str,
+        *,
+        box_threshold: Optional[float] = None,
+        text_threshold: Optional[float] = None,
+    ) -> Optional[RawPrediction]:
+        """Cached prediction for ``key``; with thresholds, only if it is exact for them."""
+        with self._lock:
+            raw = self._memory.get(key)
+            if raw is not None:
+                self._memory.move_to_end(key)
+        if raw is None and self._disk_dir is not None:
+            raw = self._read_disk(key)
+            if raw is not None:
+                self._remember(key, raw)
+        if raw is not None and box_threshold is not None and text_threshold is not None:
+            if not raw.covers(box_threshold, text_threshold):
+                raw = None
+        METRICS.inc("gdino_cache_lookups_total", self._name, "hit" if raw is not None else "miss")
+        return raw
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            if key in self._memory:
+                return True
+        return self._disk_dir is not None and self._disk_path(key).exists()
+
+    def put(self, key: str, raw: RawPrediction) -> None:
+        raw = raw.compact(top_k=self._top_k, token_floor=self._token_floor)
+        self._remember(key, raw)
+        if self._disk_dir is not None:
+            self._write_disk(key, raw)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+    def _remember(self, key: str, raw: RawPrediction) -> None:
+        if self._max_entries == 0:
+            return
+        with self._lock:
+            self._memory[key] = raw
+            self._memory.move_to_end(key)
+            while len(self._memory) > self._max_entries:
+                self._memory.popitem(last=False)
+
+    def _disk_path(self, key: str) -> Path:
+        return self._disk_dir / f"{key}.npz"
+
+    def _read_disk(self, key: str) -> Optional[RawPrediction]:
+        path = self._disk_path(key)
+        try:
+            with np.load(path) as data:
+                raw = raw_prediction_from_arrays(data)
+            os.utime(path)  # mtime doubles as the LRU clock for eviction
+            return raw
+        except FileNotFoundError:
+            return None
+        except (OSError, KeyError, ValueError):
+            self._logger.warning("Dropping unreadable cache entry %s", path)
+            path.unlink(missing_ok=True)
+            return None
+
+    def _write_disk(self, key: str, raw: RawPrediction) -> None:
+        path = self._disk_path(key)
+        tmp_path = path.with_name(f"{path.stem}.{threading.get_ident()}.tmp.npz")
+        try:
+            np.savez(tmp_path, **raw_prediction_to_arrays(raw))
+            size = tmp_path.stat().st_size
+            previous = path.stat().st_size if path.exists() else 0
+            os.replace(tmp_path, path)
+        except OSError:
+            self._logger.exception("Failed to write cache entry %s", path)
+            tmp_path.unlink(missing_ok=True)
+            return
+        with self._lock:
+            self._disk_bytes += size - previous
+            over_budget = self._disk_bytes > self._max_disk_bytes
+        if over_budget:
+            self._evict_disk()
+
+    def _evict_disk(self) -> None:
+        """Delete least recently used files until the tier is back under 90% of its budget."""
+        entries = []
+        for path in self._disk_dir.glob("*.npz"):
+            if path.name.endswith(".tmp.npz"):
+                continue
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = int(self._max_disk_bytes * 0.9)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+        with self._lock:
+            self._disk_bytes = total
@@ -36,6 +36,15 @@ def write_bytes_to_temp(
         return Path(tmp.name)
 
 
+def read_rgb_image(path: Path):
+    """Decode an image file to an RGB numpy array (no resize or normalization)."""
+    import numpy as np
+    from PIL import Image
+
+    with Image.open(path) as image:
+        return np.asarray(image.convert("RGB"))
+
+
 def write_image(
     image,
     *,
@@ -52,6 +61,24 @@ def write_image(
     return target_path
 
 
+def write_bgr_image(
+    image,
+    *,
+    target_path: Path,
+    quality: int = 90,
+) -> Path:
+    """Encode a BGR numpy array (OpenCV layout) directly, without a channel-flip copy."""
+    ensure_directory(target_path.parent)
+    import cv2
+
+    params = []
+    if target_path.suffix.lower() in {".jpg", ".jpeg"}:
+        params = [cv2.IMWRITE_JPEG_QUALITY, int(quality)]
+    if not cv2.imwrite(str(target_path), image, params):
+        raise OSError(f"Failed to write image: {target_path}")
+    return target_path
+
+
 def encode_file_to_base64(path: Path) -> Tuple[str, str]:
     if not path.exists():
         raise FileNotFoundError(f"File not found: {path}")
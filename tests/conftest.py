@@ -0,0 +1,46 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+TINY_CONFIG = Path(__file__).resolve().parents[1] / "groundingdino/config/GroundingDINO_Tiny_Test.py"
+
+
+@pytest.fixture
+def tiny_settings_env(monkeypatch, tmp_path):
+    """Point the runtime settings at the offline tiny model and a scratch data directory."""
+    monkeypatch.setenv("GDINO_MODEL_CONFIG", str(TINY_CONFIG))
+    monkeypatch.setenv("GDINO_WEIGHTS_PATH", str(tmp_path / "unused.pth"))
+    monkeypatch.setenv("GDINO_DEVICE", "cpu")
+    monkeypatch.setenv("GDINO_IMAGES_DIR", str(tmp_path / "images"))
+    monkeypatch.setenv("GDINO_RESULTS_DIR", str(tmp_path / "results"))
+    monkeypatch.setenv("GDINO_SEARCH_DIR", str(tmp_path / "gallery"))
+    monkeypatch.setenv("GDINO_ANNOTATION_MODE", "sync")
+    monkeypatch.setenv("GDINO_WARMUP", "0")
+    monkeypatch.setenv("OMDET_ENABLED", "0")
+    monkeypatch.setenv("GDINO_CONFIGURE_THREADS", "0")
+    for name in ("GDINO_PROMPT_BANK", "GDINO_PREFILTER", "GDINO_TILE_SIZE"):
+        monkeypatch.delenv(name, raising=False)
+    return tmp_path
+
+
+@pytest.fixture
+def sample_image(tmp_path):
+    np = pytest.importorskip("numpy")
+    from PIL import Image
+
+    path = tmp_path / "sample.jpg"
+    pixels = np.random.default_rng(0).integers(0, 256, size=(96, 128, 3), dtype=np.uint8)
+    Image.fromarray(pixels).save(path)
+    return path
+
+
+@pytest.fixture(scope="session")
+def tiny_adapter():
+    """GroundingDINO adapter around the offline tiny model, shared across tests."""
+    pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    from src.adapters.grounding_dino import GroundingDinoModelAdapter
+
+    return GroundingDinoModelAdapter(config_path=TINY_CONFIG, weights_path=Path(), device="cpu")
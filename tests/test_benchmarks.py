@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import json
+
+import pytest
+
+pytest.importorskip("torch")
+
+from benchmarks.compare import compare_results, load_results
+from benchmarks.harness import BenchmarkResult, percentile
+
+
+def test_percentile_interpolates_between_samples():
+    samples = [4.0, 1.0, 3.0, 2.0]
+    assert percentile(samples, 50) == pytest.approx(2.5)
+    assert percentile(samples, 100) == 4.0
+    assert percentile(samples, 0) == 1.0
+
+
+def test_compare_flags_regressions_above_threshold():
+    baseline = {"a": {"latency_ms": {"p50": 100.0}}, "b": {"latency_ms": {"p50": 100.0}}}
+    current = {"a": {"latency_ms": {"p50": 105.0}}, "b": {"latency_ms": {"p50": 130.0}}}
+
+    comparisons = {item.key: item for item in compare_results(current, baseline)}
+
+    assert not comparisons["a"].regressed(0.1)
+    assert comparisons["b"].regressed(0.1)
+
+
+def _result(image):
+    return BenchmarkResult(
+        suite="predict",
+        image_size=[480, 640],
+        batch_size=1,
+        caption_phrases=3,
+        threads=1,
+        device="cpu",
+        iterations=1,
+        latency_ms={"p50": 10.0},
+        images_per_sec=100.0,
+        peak_rss_mb=1.0,
+        image=image,
+    )
+
+
+def test_same_size_images_keep_separate_results(tmp_path):
+    path = tmp_path / "results.json"
+    records = [_result("cat").to_dict(), _result("dog").to_dict()]
+    path.write_text(json.dumps({"results": records}), encoding="utf-8")
+
+    results = load_results(path)
+
+    assert sorted(results) == [
+        "predict|480x640|bs1|phrases3|threads1|cpu|cat",
+        "predict|480x640|bs1|phrases3|threads1|cpu|dog",
+    ]
+
+    path.write_text(json.dumps({"results": records + records[:1]}), encoding="utf-8")
+    with pytest.raises(ValueError, match="Duplicate"):
+        load_results(path)
@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import contextlib
+import io
+
+import pytest
+
+np = pytest.importorskip("numpy")
+torch = pytest.importorskip("torch")
+pytest.importorskip("pycocotools")
+
+from pycocotools.coco import COCO
+from pycocotools.cocoeval import COCOeval
+
+from groundingdino.datasets.cocogrounding_eval import CocoGroundingEvaluator, evaluate
+
+
+def _synthetic_coco(num_images=12, seed=0):
+    rng = np.random.default_rng(seed)
+    images, annotations, predictions = [], [], {}
+    for image_id in range(1, num_images + 1):
+        images.append({"id": image_id, "width": 640, "height": 480})
+        boxes, scores, labels = [], [], []
+        for _ in range(rng.integers(0, 6)):
+            size = rng.choice([16, 64, 200])  # small, medium and large objects
+            x, y = rng.uniform(0, 400), rng.uniform(0, 250)
+            w, h = size * rng.uniform(0.5, 1.5), size * rng.uniform(0.5, 1.5)
+            category = int(rng.integers(1, 4))
+            annotations.append(
+                {
+                    "id": len(annotations) + 1,
+                    "image_id": image_id,
+                    "category_id": category,
+                    "bbox": [x, y, w, h],
+                    "area": w * h,
+                    "iscrowd": int(rng.random() < 0.15),
+                }
+            )
+            for _ in range(rng.integers(1, 3)):  # duplicates and near misses
+                jitter = rng.normal(0, 0.1 * size, 2)
+                boxes.append([x + jitter[0], y + jitter[1], x + jitter[0] + w, y + jitter[1] + h])
+                scores.append(round(float(rng.random()), 1))  # rounding creates score ties
+                labels.append(category if rng.random() < 0.8 else int(rng.integers(1, 4)))
+        for _ in range(rng.integers(0, 4)):  # background false positives
+            x, y = rng.uniform(0, 500), rng.uniform(0, 350)
+            boxes.append([x, y, x + 60, y + 60])
+            scores.append(float(rng.random()))
+            labels.append(int(rng.integers(1, 4)))
+        predictions[image_id] = {
+            "boxes": torch.tensor(boxes, dtype=torch.float32).reshape(-1, 4),
+            "scores": torch.tensor(scores, dtype=torch.float32),
+            "labels": torch.tensor(labels, dtype=torch.int64),
+        }
+    coco = COCO()
+    coco.dataset = {
+        "images": images,
+        "annotations": annotations,
+        "categories": [{"id": i, "name": f"class{i}"} for i in (1, 2, 3)],
+    }
+    with contextlib.redirect_stdout(io.StringIO()):
+        coco.createIndex()
+    return coco, predictions
+
+
+def test_fast_matching_reproduces_pycocotools_per_image_results():
+    coco, predictions = _synthetic_coco()
+    evaluator = CocoGroundingEvaluator(coco, iou_types=("bbox",))
+    results = evaluator.prepare_for_coco_detection_array(predictions)
+    assert results.shape[1] == 7
+    with contextlib.redirect_stdout(io.StringIO()):
+        coco_dt = coco.loadRes(results)
+
+    records = []
+    for fast_matching in (False, True):
+        coco_eval = COCOeval(coco, coco_dt, iouType="bbox")
+        coco_eval.params.imgIds = sorted(predictions)
+        _, eval_imgs = evaluate(coco_eval, fast_matching=fast_matching)
+        records.append(eval_imgs.flatten().tolist())
+
+    reference, fast = records
+    assert sum(record is not None for record in reference) > 20
+    for expected, actual in zip(reference, fast):
+        assert (expected is None) == (actual is None)
+        if expected is None:
+            continue
+        for key in ("dtIds", "gtIds", "dtScores"):
+            assert expected[key] == actual[key]
+        for key in ("dtMatches", "gtMatches", "dtIgnore", "gtIgnore"):
+            np.testing.assert_array_equal(np.asarray(expected[key]), np.asarray(actual[key]))
+
+
+def test_deferred_evaluation_matches_stock_cocoeval():
+    coco, predictions = _synthetic_coco(seed=1)
+    evaluator = CocoGroundingEvaluator(coco, iou_types=("bbox",))
+    items = list(predictions.items())
+    for start in range(0, len(items), 5):  # batches
+        evaluator.update(dict(items[start : start + 5]))
+    assert evaluator.eval_imgs["bbox"] == []  # nothing evaluated per batch
+    evaluator.synchronize_between_processes()
+    assert evaluator.img_ids == sorted(predictions)
+    assert evaluator.eval_imgs["bbox"].shape[2] == len(predictions)  # one column per image
+    evaluator.accumulate()
+    with contextlib.redirect_stdout(io.StringIO()):
+        evaluator.summarize()
+        reference = COCOeval(
+            coco, coco.loadRes(evaluator.prepare_for_coco_detection(predictions)), iouType="bbox"
+        )
+        reference.params.imgIds = sorted(predictions)
+        reference.evaluate()
+        reference.accumulate()
+        reference.summarize()
+    np.testing.assert_allclose(evaluator.coco_eval["bbox"].stats, reference.stats)
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("torch")
+
+from src.services.cpu_layout import (
+    ThreadLayout,
+    claim_worker_slot,
+    format_cpu_list,
+    parse_cpu_list,
+    plan_thread_layout,
+)
+
+
+def test_auto_layout_splits_cores_between_workers():
+    cpus = list(range(32))
+    layouts = [
+        plan_thread_layout(cpus, num_workers=4, worker_index=index, pin_cores=True)
+        for index in range(4)
+    ]
+
+    assert [layout.intra_op_threads for layout in layouts] == [8, 8, 8, 8]
+    assert all(layout.inter_op_threads == 1 for layout in layouts)
+    assert layouts[1].cpus == tuple(range(8, 16))
+    assert sorted(cpu for layout in layouts for cpu in layout.cpus) == cpus
+    assert layouts[1].describe().endswith("cores=8-15")
+
+
+def test_explicit_threads_and_more_workers_than_cores():
+    layout = plan_thread_layout([0, 1], num_workers=3, worker_index=2, intra_op_threads=4)
+    assert layout == ThreadLayout(
+        worker_index=2, num_workers=3, intra_op_threads=4, inter_op_threads=1, cpus=None
+    )
+    pinned = plan_thread_layout([0, 1], num_workers=3, worker_index=2, pin_cores=True)
+    assert pinned.intra_op_threads == 1 and pinned.cpus == (0,)
+
+
+def test_worker_index_env_overrides_slot_locks(monkeypatch, tmp_path):
+    monkeypatch.setenv("GDINO_WORKER_INDEX", "5")
+    assert claim_worker_slot(4, lock_dir=tmp_path) == 1
+
+
+def test_slot_locks_are_scoped_to_the_lock_dir(monkeypatch, tmp_path):
+    fcntl = pytest.importorskip("fcntl")
+    from src.services import cpu_layout
+
+    monkeypatch.delenv("GDINO_WORKER_INDEX", raising=False)
+    (tmp_path / "a").mkdir()
+    with open(tmp_path / "a" / "gdino-worker-0.lock", "a+") as other_worker:
+        fcntl.flock(other_worker.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        for lock_dir, slot in ((tmp_path / "a", 1), (tmp_path / "b", 0)):
+            monkeypatch.setattr(cpu_layout, "_slot_handle", None)
+            assert claim_worker_slot(2, lock_dir=lock_dir) == slot
+            cpu_layout._slot_handle[1].close()
+
+
+def test_cpu_lists_round_trip():
+    assert format_cpu_list([8, 0, 1, 2, 3, 10, 11]) == "0-3,8,10-11"
+    assert parse_cpu_list(format_cpu_list([8, 0, 1, 2, 3, 10, 11])) == [0, 1, 2, 3, 8, 10, 11]
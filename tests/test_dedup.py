@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import shutil
+
+import pytest
+
+np = pytest.importorskip("numpy")
+from PIL import Image
+
+from src.services.dedup import group_images
+
+
+@pytest.fixture
+def gallery(tmp_path):
+    rng = np.random.default_rng(0)
+    base = np.kron(rng.integers(0, 256, size=(12, 16, 3)), np.ones((16, 16, 1))).astype(np.uint8)
+    Image.fromarray(base).save(tmp_path / "a.jpg", quality=95)
+    shutil.copy(tmp_path / "a.jpg", tmp_path / "a_copy.jpg")
+    Image.fromarray(base).resize((96, 72)).save(tmp_path / "a_thumb.jpg", quality=80)
+    other = rng.integers(0, 256, size=(192, 256, 3), dtype=np.uint8)
+    Image.fromarray(other).save(tmp_path / "b.jpg")
+    return sorted(tmp_path.glob("*.jpg"))
+
+
+def test_exact_and_near_duplicate_grouping(gallery):
+    groups, report = group_images(gallery, mode="exact")
+    assert (report.total, report.unique, report.exact_duplicates) == (4, 3, 1)
+    assert [path.name for path in groups[0].members] == ["a.jpg", "a_copy.jpg"]
+
+    groups, report = group_images(gallery, mode="near")
+    assert (report.unique, report.exact_duplicates, report.near_duplicates) == (2, 1, 1)
+    near = next(group for group in groups if group.kind == "near")
+    assert near.representative.name == "a.jpg"  # the full-resolution copy
+    assert sorted(path.name for path in near.duplicates) == ["a_copy.jpg", "a_thumb.jpg"]
+
+    _, report = group_images(gallery, mode="off")
+    assert report.unique == 4
+
+
+def test_scan_detects_each_group_once(tiny_adapter, gallery, tmp_path):
+    from src.services.detection_service import DetectionService
+
+    calls = []
+    original = tiny_adapter.load_image
+
+    class _CountingAdapter:
+        def __getattr__(self, name):
+            return getattr(tiny_adapter, name)
+
+        def load_image(self, image_path):
+            calls.append(image_path.name)
+            return original(image_path)
+
+    service = DetectionService(
+        model_adapter=_CountingAdapter(),
+        model_name="grounding_dino",
+        images_dir=tmp_path / "images",
+        results_dir=tmp_path / "results",
+        search_dir=tmp_path,
+        default_box_threshold=0.01,
+        default_text_threshold=0.01,
+        annotate_results=False,
+        dedup_mode="exact",
+    )
+    scan = service.scan_directory(caption="person .", only_with_detections=False)
+
+    assert sorted(calls) == ["a.jpg", "a_thumb.jpg", "b.jpg"]
+    assert len(scan.results) == 4
+    copy = next(result for result in scan.results if result.source_path.name == "a_copy.jpg")
+    assert copy.duplicate_of.name == "a.jpg"
+    assert scan.dedup.exact_duplicates == 1
+
+
+def test_scan_with_a_limit_only_groups_the_chunks_it_needs(tiny_adapter, gallery, tmp_path, monkeypatch):
+    from src.services import dedup, detection_service
+    from src.services.detection_service import DetectionService
+
+    for index in range(4):
+        shutil.copy(tmp_path / "b.jpg", tmp_path / f"c{index}.jpg")
+    digested = []
+    file_digest = dedup.file_digest
+
+    def counting_digest(path):
+        digested.append(path.name)
+        return file_digest(path)
+
+    monkeypatch.setattr(dedup, "file_digest", counting_digest)
+    monkeypatch.setattr(detection_service, "SCAN_CHUNK_SIZE", 3)
+
+    service = DetectionService(
+        model_adapter=tiny_adapter,
+        model_name="grounding_dino",
+        images_dir=tmp_path / "images",
+        results_dir=tmp_path / "results",
+        search_dir=tmp_path,
+        default_box_threshold=0.01,
+        default_text_threshold=0.01,
+        annotate_results=False,
+        dedup_mode="exact",
+    )
+    scan = service.scan_directory(caption="person .", limit=2, only_with_detections=False)
+    assert [result.source_path.name for result in scan.results] == ["a.jpg", "a_copy.jpg"]
+    assert digested == ["a.jpg", "a_copy.jpg", "a_thumb.jpg"]  # the first chunk of 8 images
+    assert (scan.dedup.total, scan.dedup.unique, scan.dedup.exact_duplicates) == (3, 2, 1)
+
+    digested.clear()
+    full = service.scan_directory(caption="person .", only_with_detections=False)
+    assert len(digested) == len(full.results) == 8
+    assert (full.dedup.unique, full.dedup.exact_duplicates) == (3, 5)
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from groundingdino.util.engine import ExecutionEngine
+from groundingdino.util.inference import predict, predict_raw
+
+CAPTION = "person . traffic light . car ."
+
+
+def _images(count: int):
+    generator = torch.Generator().manual_seed(0)
+    return [torch.rand(3, 64, 64 + 16 * index, generator=generator) for index in range(count)]
+
+
+def test_cpu_engine_matches_predict_and_predict_raw(tiny_adapter):
+    engine = ExecutionEngine(tiny_adapter.model, device="cuda" if torch.cuda.is_available() else "cpu")
+    if not torch.cuda.is_available():
+        assert engine.device.type == "cpu" and not engine.pinned  # CUDA requested, CPU fallback
+
+    image = _images(1)[0]
+    boxes, logits, phrases = engine.predict(image, CAPTION, box_threshold=0.3, text_threshold=0.2)
+    expected = predict(tiny_adapter.model, image, CAPTION, 0.3, 0.2, device=str(engine.device))
+    assert len(phrases) > 0 and phrases == expected[2]
+    assert torch.allclose(boxes, expected[0]) and torch.allclose(logits, expected[1])
+    assert boxes.device.type == "cpu"
+
+    raw = engine.predict_raw(image, CAPTION)
+    reference = predict_raw(tiny_adapter.model, image, CAPTION, device=str(engine.device))
+    assert raw.input_ids == reference.input_ids
+    assert torch.allclose(raw.logits, reference.logits) and torch.allclose(raw.boxes, reference.boxes)
+
+
+def test_predict_many_matches_one_predict_per_image(tiny_adapter):
+    images = _images(3)
+    single = [
+        tiny_adapter.predict(image=image, caption=CAPTION, box_threshold=0.3, text_threshold=0.2)
+        for image in images
+    ]
+    many = list(
+        tiny_adapter.predict_many(images=iter(images), caption=CAPTION, box_threshold=0.3, text_threshold=0.2)
+    )
+    assert len(many) == 3
+    for expected, actual in zip(single, many):
+        assert actual.phrases == expected.phrases
+        assert torch.equal(actual.boxes, expected.boxes) and torch.equal(actual.logits, expected.logits)
+    assert list(tiny_adapter.predict_many(images=[], caption=CAPTION, box_threshold=0.3, text_threshold=0.2)) == []
+
+
+def test_detection_service_streams_directory_scans_through_predict_many(tiny_adapter, tmp_path, monkeypatch):
+    from PIL import Image
+
+    from src.services.detection_service import DetectionService
+
+    for index in range(3):
+        Image.new("RGB", (64 + 16 * index, 64), (40 * index, 80, 120)).save(tmp_path / f"{index}.jpg")
+    streamed = []
+    predict_many = tiny_adapter.predict_many
+
+    def counting_predict_many(*, images, **kwargs):
+        streamed.append(0)
+        for prediction in predict_many(images=images, **kwargs):
+            streamed[-1] += 1
+            yield prediction
+
+    monkeypatch.setattr(tiny_adapter, "predict_many", counting_predict_many)
+
+    service = DetectionService(
+        model_adapter=tiny_adapter,
+        model_name="grounding_dino",
+        images_dir=tmp_path / "images",
+        results_dir=tmp_path / "results",
+        search_dir=tmp_path,
+        default_box_threshold=0.0,
+        default_text_threshold=0.0,
+        annotate_results=False,
+    )
+    scan = service.scan_directory(caption=CAPTION, only_with_detections=False)
+    assert streamed == [3]
+    assert [result.source_path.name for result in scan.results] == ["0.jpg", "1.jpg", "2.jpg"]
+    for result in scan.results:
+        single = service.detect_from_path(image_path=result.source_path, caption=CAPTION)
+        assert result.items == single.items
+
+
+def test_raw_predictions_are_compacted_before_the_copy_back(tiny_adapter):
+    engine = ExecutionEngine(tiny_adapter.model, device="cpu")
+    image = _images(1)[0]
+    reference = predict_raw(tiny_adapter.model, image, CAPTION, device="cpu").compact(top_k=5, token_floor=0.1)
+    raw = engine.predict_raw(image, CAPTION, top_k=5, token_floor=0.1)
+    (streamed,) = engine.predict_raw_many([image], CAPTION, top_k=5, token_floor=0.1)
+    for actual in (raw, streamed):
+        assert actual.logits.shape == (5, len(reference.input_ids)) and actual.logits.device.type == "cpu"
+        assert torch.allclose(actual.logits, reference.logits) and torch.allclose(actual.boxes, reference.boxes)
+        assert (actual.min_box_threshold, actual.min_text_threshold) == pytest.approx(
+            (reference.min_box_threshold, reference.min_text_threshold)
+        )
+
+
+def test_default_settings_scan_streams_cache_misses_through_the_engine(tiny_settings_env, tiny_adapter, monkeypatch):
+    from PIL import Image
+
+    from src.services.detection_service import DetectionService
+    from src.services.factory import create_detection_service
+
+    gallery = tiny_settings_env / "gallery"
+    gallery.mkdir()
+    for index in range(3):
+        Image.new("RGB", (64 + 16 * index, 64), (40 * index, 80, 120)).save(gallery / f"{index}.jpg")
+    streamed = []
+    predict_raw_many = ExecutionEngine.predict_raw_many
+
+    def counting_predict_raw_many(self, images, *args, **kwargs):
+        streamed.append(0)
+        for raw in predict_raw_many(self, images, *args, **kwargs):
+            streamed[-1] += 1
+            yield raw
+
+    monkeypatch.setattr(ExecutionEngine, "predict_raw_many", counting_predict_raw_many)
+
+    service = create_detection_service()  # the result cache is on by default
+    kwargs = dict(caption=CAPTION, box_threshold=0.3, text_threshold=0.2, only_with_detections=False)
+    first = service.scan_directory(**kwargs)
+    assert streamed == [3] and not any(result.cache_hit for result in first.results)
+    again = service.scan_directory(**kwargs)
+    assert streamed == [3, 0] and all(result.cache_hit for result in again.results)
+    Image.new("RGB", (72, 64), (200, 10, 10)).save(gallery / "1b.jpg")  # a miss between hits
+    mixed = service.scan_directory(**kwargs)
+    assert streamed == [3, 0, 1]
+    assert [(result.source_path.name, result.cache_hit) for result in mixed.results] == [
+        ("0.jpg", True), ("1.jpg", True), ("1b.jpg", False), ("2.jpg", True)
+    ]
+    (gallery / "1b.jpg").unlink()
+
+    uncached = DetectionService(
+        model_adapter=tiny_adapter,
+        model_name="grounding_dino",
+        images_dir=tiny_settings_env / "images",
+        results_dir=tiny_settings_env / "results",
+        search_dir=gallery,
+        default_box_threshold=0.3,
+        default_text_threshold=0.2,
+        annotate_results=False,
+    ).scan_directory(**kwargs)
+    assert [result.source_path for result in first.results] == [result.source_path for result in uncached.results]
+    for results in zip(first.results, again.results, uncached.results):
+        assert len({tuple(item.label for item in result.items) for result in results}) == 1
+        expected = torch.tensor([item.box + [item.score] for item in results[2].items])
+        for result in results[:2]:
+            assert torch.allclose(torch.tensor([item.box + [item.score] for item in result.items]), expected)
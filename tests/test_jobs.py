@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+import pytest
+
+from src.services.jobs import JobRunner, JobSpec, JobStore, PriorityGate
+
+
+@dataclass
+class _Item:
+    box: List[float]
+    label: str
+    score: float
+
+
+@dataclass
+class _Payload:
+    items: list
+    source_path: Path
+    annotated_path: Path = None
+    annotation: object = None
+
+
+class _FakeService:
+    def __init__(self, search_dir: Path, delay: float = 0.0) -> None:
+        self.search_dir = search_dir
+        self.delay = delay
+        self.seen: List[str] = []
+
+    def list_images(self, *, directory=None, patterns=None):
+        return sorted((directory or self.search_dir).glob("*.jpg"))
+
+    def prefilter_images(self, image_paths, caption):
+        return list(image_paths)
+
+    def detect_from_path(self, *, image_path, caption, box_threshold=None, text_threshold=None):
+        time.sleep(self.delay)
+        self.seen.append(image_path.name)
+        items = [_Item([0.0, 0.0, 1.0, 1.0], caption, 0.9)] if "hit" in image_path.name else []
+        return _Payload(items=items, source_path=image_path)
+
+    def detect_many(self, *, image_paths, **kwargs):
+        for image_path in image_paths:
+            yield self.detect_from_path(image_path=image_path, **kwargs)
+
+
+class _FakeManager:
+    def __init__(self, service) -> None:
+        self.service = service
+        self.resolved = 0
+
+    def canonical_key(self, model=None):
+        if model not in (None, "grounding_dino"):
+            raise KeyError(model)
+        return "grounding_dino"
+
+    def resolve(self, model=None):
+        self.canonical_key(model)
+        self.resolved += 1
+        return self.service
+
+    @contextmanager
+    def use(self, model=None):
+        self.canonical_key(model)
+        yield self.service
+
+
+def _wait_done(store: JobStore, job_id: str, timeout: float = 10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        record = store.get(job_id)
+        if record.done:
+            return record
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+@pytest.fixture
+def gallery(tmp_path):
+    directory = tmp_path / "gallery"
+    directory.mkdir()
+    for name in ("a_hit.jpg", "b_miss.jpg", "c_hit.jpg", "d_miss.jpg"):
+        (directory / name).write_bytes(b"")
+    return directory
+
+
+def test_job_runs_to_completion_and_persists_results(tmp_path, gallery):
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    manager = _FakeManager(_FakeService(gallery))
+    runner = JobRunner(store=store, manager=manager, search_dir=gallery, poll_interval=0.01)
+    runner.start()
+    job_id = runner.submit(JobSpec(caption="cat"))
+    record = _wait_done(store, job_id)
+    runner.stop()
+
+    assert record.status == "completed"
+    assert (record.total, record.processed, record.matched) == (4, 4, 2)
+    assert [Path(result["image"]).name for result in record.results] == ["a_hit.jpg", "c_hit.jpg"]
+    assert record.results[0]["detections"][0]["label"] == "cat"
+
+    reopened = JobStore(tmp_path / "jobs.sqlite3")
+    assert len(reopened.get(job_id, results_offset=1).results) == 1
+    with pytest.raises(ValueError):
+        runner.submit(JobSpec(caption="cat", directory="../elsewhere"))
+    with pytest.raises(KeyError):
+        runner.submit(JobSpec(caption="cat", model="unknown"))
+    assert manager.resolved == 0  # submitting never loads a model
+
+
+def test_cancel_and_interactive_priority(tmp_path, gallery):
+    gate = PriorityGate()
+    service = _FakeService(gallery, delay=0.05)
+    store = JobStore(tmp_path / "jobs.sqlite3")
+    runner = JobRunner(
+        store=store, manager=_FakeManager(service), search_dir=gallery, gate=gate, poll_interval=0.01
+    )
+    queued = store.create(JobSpec(caption="cat"))
+    assert runner.cancel(queued) == "cancelled"
+
+    runner.start()
+    with gate.interactive():
+        job_id = runner.submit(JobSpec(caption="cat"))
+        time.sleep(0.1)
+        assert service.seen == []  # bulk work waits while interactive requests run
+    while not service.seen:
+        time.sleep(0.005)
+    runner.cancel(job_id)
+    record = _wait_done(store, job_id)
+    runner.stop()
+
+    assert record.status == "cancelled"
+    assert record.processed < 4
+    assert store.get(queued).status == "cancelled"
+
+
+def test_stores_sharing_a_database_only_requeue_jobs_of_gone_owners(tmp_path):
+    first = JobStore(tmp_path / "jobs.sqlite3")
+    second = JobStore(tmp_path / "jobs.sqlite3")
+    jobs = [first.create(JobSpec(caption="cat")) for _ in range(3)]
+
+    claimed = [first.claim_next(), second.claim_next(), first.claim_next()]
+    assert sorted(claimed) == sorted(jobs) and second.claim_next() is None  # each job once
+    first.heartbeat()
+    second.heartbeat()
+    first.add_progress(claimed[0], processed=1, result={"image": "a.jpg", "detections": []})
+
+    # a sibling starting up leaves the live owner's jobs running
+    assert JobStore(tmp_path / "jobs.sqlite3").requeue_interrupted() == 0
+    assert second.requeue_interrupted() == 0
+    assert first.get(claimed[0]).status == "running"
+
+    first.release_owner()  # stopped (or its heartbeat went stale)
+    assert second.requeue_interrupted() == 2
+    record = second.get(claimed[0])
+    assert (record.status, record.processed, record.results) == ("queued", 0, [])
+    assert second.get(claimed[1]).status == "running"
+
+    stale = JobStore(tmp_path / "jobs.sqlite3", stale_after=0.0)
+    time.sleep(0.01)
+    assert stale.requeue_interrupted() == 1  # second's heartbeat is older than stale_after
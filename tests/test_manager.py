@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import pytest
+
+from src.services.manager import DetectionServiceManager
+
+
+class _FakeService:
+    def __init__(self, name: str, size: int) -> None:
+        self.name = name
+        self.size = size
+        self.ready = False
+
+    def memory_bytes(self) -> int:
+        return self.size
+
+    def mark_ready(self) -> None:
+        self.ready = True
+
+    def warmup(self) -> None:
+        self.ready = True
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _manager(clock, built, **kwargs):
+    def factory(name, size):
+        def build():
+            built.append(name)
+            return _FakeService(name, size)
+
+        return build
+
+    return DetectionServiceManager(
+        factories={"small": factory("small", 100), "large": factory("large", 300)},
+        default_model="small",
+        aliases={"large": ("big",)},
+        clock=clock,
+        **kwargs,
+    )
+
+
+def test_models_load_on_first_resolve_and_evict_when_idle():
+    clock, built = _Clock(), []
+    manager = _manager(clock, built, idle_timeout=60)
+    assert manager.loaded_models() == [] and manager.ready  # loadable on demand
+    assert built == []
+
+    large = manager.resolve("big")
+    assert built == ["large"] and large.ready
+    assert manager.resolve("large") is large  # cached, no second build
+    manager.resolve()
+    assert manager.loaded_models() == ["small", "large"]
+
+    clock.now = 50
+    manager.resolve("small")
+    clock.now = 90
+    assert manager.evict_idle() == ["large"]
+    assert manager.loaded_models() == ["small"]
+    manager.resolve("large")
+    assert built == ["large", "small", "large"]
+
+    with pytest.raises(KeyError):
+        manager.resolve("unknown")
+
+
+def test_memory_budget_evicts_least_recently_used_but_not_models_in_use():
+    clock, built = _Clock(), []
+    manager = _manager(clock, built, memory_budget_bytes=350)
+    manager.preload()
+    clock.now = 1
+    with manager.use("small"):
+        manager.resolve("large")  # 400 bytes > budget, but "small" is busy
+        assert manager.loaded_models() == ["small", "large"]
+    clock.now = 2
+    manager.resolve("large")
+    clock.now = 3
+    manager.evict("large")
+    manager.resolve("small")
+    clock.now = 4
+    manager.resolve("large")  # now "small" is idle and least recently used
+    assert manager.loaded_models() == ["large"]
+
+
+def test_prebuilt_services_are_never_evicted():
+    service = _FakeService("pinned", 10)
+    manager = DetectionServiceManager(services={"pinned": service}, default_model="pinned", idle_timeout=1)
+    assert manager.readiness() == {"pinned": False}
+    assert not manager.evict("pinned")
+    assert manager.evict_idle() == []
+    assert manager.resolve() is service
+
+
+def test_preloaded_default_model_is_warmed_up_once_after_startup(tiny_settings_env, monkeypatch):
+    pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    from src.services.detection_service import DetectionService
+    from src.services.factory import create_detection_manager
+
+    warmups = []
+    original = DetectionService.warmup
+
+    def counting_warmup(self, *args, **kwargs):
+        warmups.append(self.model_name)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(DetectionService, "warmup", counting_warmup)
+    monkeypatch.setenv("GDINO_WARMUP", "1")
+    manager = create_detection_manager()
+    assert manager.loaded_models() == ["grounding_dino"]
+    assert warmups == [] and not manager.ready  # startup does not block on the warm-up
+
+    manager.warmup()  # what the server's warm-up thread runs
+    assert warmups == ["grounding_dino"] and manager.ready
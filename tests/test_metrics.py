@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import pytest
+
+from src.services.metrics import MetricsRegistry
+
+
+def test_metrics_registry_renders_prometheus_text():
+    registry = MetricsRegistry()
+    registry.counter("requests_total", "Requests.", ("route", "status"))
+    registry.histogram("latency_seconds", "Latency.", ("route",), buckets=(0.1, 1.0))
+    registry.gauge_callback("queue_depth", "Queue depth.", lambda: {("jobs",): 3}, ("queue",))
+
+    registry.inc("requests_total", "/detect", "200")
+    registry.inc("requests_total", "/detect", "200")
+    registry.observe("latency_seconds", 0.5, "/detect")
+    lines = registry.render()
+
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{route="/detect",status="200"} 2' in lines
+    assert 'latency_seconds_bucket{route="/detect",le="0.1"} 0' in lines
+    assert 'latency_seconds_bucket{route="/detect",le="+Inf"} 1' in lines
+    assert 'queue_depth{queue="jobs"} 3' in lines
+
+
+@pytest.fixture
+def tiny_app(tiny_settings_env, monkeypatch):
+    pytest.importorskip("torch")
+    pytest.importorskip("transformers")
+    from fastapi import FastAPI
+
+    from api.middleware import register_metrics_middleware
+    from api.routers import detect, jobs, metrics
+    from src.services.factory import create_detection_manager
+
+    monkeypatch.setenv("GDINO_WARMUP", "1")  # the preloaded model stays unready until warmed up
+    app = FastAPI()
+    app.state.detection_manager = create_detection_manager()
+    register_metrics_middleware(app)
+    app.include_router(detect.router)
+    app.include_router(jobs.router)
+    app.include_router(metrics.router)
+    return app
+
+
+def test_readyz_reports_loading_ready_and_evicted_models(tiny_app):
+    from fastapi.testclient import TestClient
+
+    client = TestClient(tiny_app)
+    manager = tiny_app.state.detection_manager
+
+    loading = client.get("/readyz")
+    assert loading.status_code == 503
+    assert loading.json() == {"ready": False, "models": {"grounding_dino": False}, "loaded": ["grounding_dino"]}
+
+    manager.warmup()
+    ready = client.get("/readyz")
+    assert ready.status_code == 200
+    assert ready.json() == {"ready": True, "models": {"grounding_dino": True}, "loaded": ["grounding_dino"]}
+
+    assert manager.evict("grounding_dino")
+    evicted = client.get("/readyz")  # loads again on the next request
+    assert evicted.status_code == 200
+    assert evicted.json() == {"ready": True, "models": {"grounding_dino": True}, "loaded": []}
+
+
+def test_metrics_endpoint_labels_requests_by_route_template(tiny_app):
+    from fastapi.testclient import TestClient
+
+    client = TestClient(tiny_app)
+    tiny_app.state.detection_manager.warmup()
+    assert client.get("/jobs/abc123").status_code == 503  # no job runner in this app
+    assert client.get("/jobs/def456").status_code == 503
+    assert client.post("/detect/refilter", json={"result_id": "missing"}).status_code == 404
+    assert client.get("/no-such-route").status_code == 404
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = response.text.splitlines()
+    assert "# TYPE gdino_http_requests_total counter" in lines
+    assert 'gdino_http_requests_total{route="/jobs/{job_id}",method="GET",status="503"} 2' in lines
+    assert 'gdino_http_requests_total{route="/detect/refilter",method="POST",status="404"} 1' in lines
+    assert 'gdino_http_requests_total{route="unmatched",method="GET",status="404"} 1' in lines
+    assert not any("abc123" in line for line in lines)
+    assert 'gdino_model_ready{model="grounding_dino"} 1' in lines
+    assert "gdino_http_requests_in_flight 1" in lines  # the /metrics request itself
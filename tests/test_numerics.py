@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from groundingdino.util.numerics import NUMERICS, NumericsMonitor
+from src.services.metrics import render_metrics
+
+
+def test_numerics_monitor_counts_only_while_enabled():
+    monitor = NumericsMonitor()
+    values = torch.tensor([1.0, float("nan"), float("inf"), -float("inf")])
+    monitor.check("decoder.layer", values, 0)
+    assert monitor.counts() == {}
+
+    monitor.configure(enabled=True)
+    for _ in range(2):
+        monitor.check("decoder.layer", values, 0)
+    monitor.check("decoder.layer", torch.ones(3), 1)
+    assert monitor.counts() == {
+        "decoder.layer.0": {"checks": 2, "nan": 2, "inf": 4},
+        "decoder.layer.1": {"checks": 1, "nan": 0, "inf": 0},
+    }
+    assert monitor.counts()["decoder.layer.0"]["nan"] == 2  # reading does not reset
+
+
+def test_decoder_layers_report_through_metrics(tiny_adapter):
+    model = tiny_adapter.model
+    NUMERICS.configure(enabled=True)
+    try:
+        with torch.no_grad():
+            model(torch.rand(1, 3, 64, 96), captions=["person ."])
+        counts = NUMERICS.counts()
+        text = render_metrics()
+    finally:
+        NUMERICS.configure(enabled=False)
+        NUMERICS.reset()
+    num_layers = model.transformer.decoder.num_layers
+    assert sorted(counts) == [f"decoder.layer.{index}" for index in range(num_layers)]
+    assert all(found == {"checks": 1, "nan": 0, "inf": 0} for found in counts.values())
+    assert 'gdino_numerics_checks_total{stage="decoder.layer.0"} 1' in text
+    assert 'gdino_nonfinite_values_total{stage="decoder.layer.0",kind="nan"} 0' in text
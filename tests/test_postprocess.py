@@ -0,0 +1,77 @@
+from __future__ import annotations
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from groundingdino.util.postprocess import GroundingPostProcessor
+from groundingdino.util.vl_utils import build_captions_and_token_span, create_positive_map_from_span
+from tests.conftest import TINY_CONFIG
+
+CLASSES = ["person", "traffic light", "car", "dog"]
+
+
+@pytest.fixture(scope="module")
+def tiny_model():
+    from groundingdino.util.inference import Model
+
+    return Model(str(TINY_CONFIG), None, device="cpu")
+
+
+def test_positive_map_matches_the_caption_and_is_cached(tiny_model):
+    postprocessor = GroundingPostProcessor(tiny_model.model.tokenizer)
+    caption, cat2tokenspan = build_captions_and_token_span(CLASSES, True)
+    assert postprocessor.caption(CLASSES) == caption == "person . traffic light . car . dog ."
+
+    positive_map, class_ids = postprocessor.positive_map(CLASSES)
+    expected = create_positive_map_from_span(
+        tiny_model.model.tokenizer(caption), [cat2tokenspan[name] for name in CLASSES]
+    )
+    assert torch.equal(positive_map, expected)
+    assert class_ids.tolist() == [0, 1, 2, 3]
+    assert postprocessor.positive_map(CLASSES)[0] is positive_map
+    assert postprocessor.positive_map(CLASSES, "meta")[0].device.type == "meta"
+
+
+def test_topk_matches_exhaustive_ranking(tiny_model):
+    postprocessor = GroundingPostProcessor(tiny_model.model.tokenizer)
+    generator = torch.Generator().manual_seed(0)
+    outputs = {
+        "pred_logits": torch.randn(2, 30, 256, generator=generator),
+        "pred_boxes": torch.rand(2, 30, 4, generator=generator) * 0.5 + 0.25,
+    }
+    sizes = torch.tensor([[100, 200], [50, 80]])
+    results = postprocessor(outputs, CLASSES, sizes, num_select=10, label_ids=[1, 10, 3, 18])
+
+    positive_map, _ = postprocessor.positive_map(CLASSES)
+    for image, result in enumerate(results):
+        prob = outputs["pred_logits"][image].sigmoid() @ positive_map.T  # 30, 4
+        pairs = sorted(
+            ((prob[q, c].item(), q, c) for q in range(30) for c in range(4)), reverse=True
+        )[:10]
+        assert result["scores"].tolist() == pytest.approx([score for score, _, _ in pairs])
+        assert result["labels"].tolist() == [[1, 10, 3, 18][c] for _, _, c in pairs]
+        h, w = sizes[image].tolist()
+        cx, cy, bw, bh = outputs["pred_boxes"][image, pairs[0][1]].tolist()
+        assert result["boxes"][0].tolist() == pytest.approx(
+            [(cx - bw / 2) * w, (cy - bh / 2) * h, (cx + bw / 2) * w, (cy + bh / 2) * h], rel=1e-5
+        )
+
+
+def test_predict_with_classes_agrees_with_the_prompt_bank_path(tiny_model):
+    np = pytest.importorskip("numpy")
+    image = np.random.default_rng(0).integers(0, 256, size=(48, 64, 3), dtype=np.uint8)
+    detections = tiny_model.predict_with_classes(image, CLASSES, box_threshold=0.3, text_threshold=0.2)
+    banked = tiny_model.predict_with_classes(
+        image,
+        None,
+        box_threshold=0.3,
+        text_threshold=0.2,
+        prompt_bank=tiny_model.build_prompt_bank(CLASSES),
+    )
+    assert len(detections) > 0
+    np.testing.assert_allclose(detections.xyxy, banked.xyxy, atol=1e-4)
+    np.testing.assert_allclose(detections.confidence, banked.confidence, atol=1e-5)
+    assert detections.class_id.tolist() == banked.class_id.tolist()
+    assert set(detections.class_id.tolist()) <= {0, 1, 2, 3}
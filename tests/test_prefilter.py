@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from src.services.prefilter import GalleryPrefilter, build_adapter_prefilter, build_grounding_dino_prefilter
+
+PATHS = [Path(name) for name in ("d.jpg", "a.jpg", "c.jpg", "b.jpg")]
+SCORES = {"d.jpg": 0.05, "a.jpg": 0.4, "c.jpg": 0.1, "b.jpg": 0.3}
+
+
+def _scorer(image_path: Path, caption: str) -> float:
+    if image_path.name == "broken.jpg":
+        raise OSError("cannot decode")
+    return SCORES[image_path.name]
+
+
+def test_threshold_keeps_matches_in_gallery_order():
+    selection = GalleryPrefilter(scorer=_scorer, threshold=0.2).select(PATHS, "cat")
+    assert selection.kept == [Path("a.jpg"), Path("b.jpg")]
+    assert (selection.total, selection.pruned, selection.pruned_fraction) == (4, 2, 0.5)
+    assert selection.scores[Path("c.jpg")] == 0.1
+
+
+def test_min_keep_fraction_tops_up_with_the_best_scores():
+    prefilter = GalleryPrefilter(scorer=_scorer, threshold=0.35, min_keep_fraction=0.6)
+    # ceil(0.6 * 4) = 3 images: the threshold keeps one, the two next best are added
+    assert prefilter.select(PATHS, "cat").kept == [Path("a.jpg"), Path("c.jpg"), Path("b.jpg")]
+    relaxed = GalleryPrefilter(scorer=_scorer, threshold=0.0, min_keep_fraction=0.25)
+    assert relaxed.select(PATHS, "cat").kept == PATHS  # the threshold already keeps enough
+    with pytest.raises(ValueError):
+        GalleryPrefilter(scorer=_scorer, threshold=0.1, min_keep_fraction=1.5)
+
+
+def test_empty_gallery_and_failing_images():
+    prefilter = GalleryPrefilter(scorer=_scorer, threshold=0.9, min_keep_fraction=0.5)
+    empty = prefilter.select([], "cat")
+    assert (empty.kept, empty.total, empty.pruned_fraction) == ([], 0, 0.0)
+    assert prefilter.select([Path("d.jpg"), Path("broken.jpg")], "cat").kept == [Path("broken.jpg")]
+
+
+@dataclass
+class _Prediction:
+    logits: List[float]
+
+
+class _FakeDetector:
+    def __init__(self) -> None:
+        self.thresholds = []
+
+    def load_image(self, image_path: Path):
+        return None, image_path.name
+
+    def predict(self, *, image, caption, box_threshold, text_threshold):
+        self.thresholds.append((box_threshold, text_threshold))
+        return _Prediction(logits=[0.5, 0.7] if image.startswith("a") else [])
+
+
+def test_adapter_prefilter_scores_the_best_detection():
+    detector = _FakeDetector()
+    selection = build_adapter_prefilter(detector, threshold=0.3).select(PATHS, "cat")
+    assert selection.kept == [Path("a.jpg")]
+    assert selection.scores[Path("a.jpg")] == pytest.approx(0.7)
+    assert selection.scores[Path("b.jpg")] == 0.0  # no detections
+    assert set(detector.thresholds) == {(0.3, 0.3)}
+
+
+def test_grounding_dino_prefilter_modes_on_the_tiny_model(tiny_adapter, tmp_path):
+    pytest.importorskip("transformers")
+    np = pytest.importorskip("numpy")
+    from PIL import Image
+
+    paths = []
+    for index in range(3):
+        pixels = np.random.default_rng(index).integers(0, 256, size=(60, 80, 3), dtype=np.uint8)
+        paths.append(tmp_path / f"image_{index}.jpg")
+        Image.fromarray(pixels).save(paths[-1])
+
+    for mode in ("encoder", "downscale"):
+        prefilter = build_grounding_dino_prefilter(tiny_adapter, mode=mode, threshold=0.0, short_side=64)
+        selection = prefilter.select(paths, "person .")
+        assert selection.kept == paths
+        assert all(0.0 <= score <= 1.0 for score in selection.scores.values())
+        expected = tiny_adapter.prefilter_score(
+            paths[0], "person .", short_side=64, encoder_only=mode == "encoder"
+        )
+        assert selection.scores[paths[0]] == pytest.approx(expected)
+
+        median = sorted(selection.scores.values())[1]
+        strict = build_grounding_dino_prefilter(
+            tiny_adapter, mode=mode, threshold=median + 1e-6, short_side=64
+        ).select(paths, "person .")
+        assert strict.kept == [path for path in paths if selection.scores[path] > median]
+    with pytest.raises(ValueError):
+        build_grounding_dino_prefilter(tiny_adapter, mode="omdet", threshold=0.1)
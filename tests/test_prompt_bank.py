@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from groundingdino.util.prompt_bank import PromptBank
+
+CLASSES = ["person", "traffic light", "car"]
+
+
+def test_save_and_load_round_trip(tiny_adapter, tmp_path):
+    bank = PromptBank.build(tiny_adapter.model, CLASSES)
+    bank.save(tmp_path / "bank.pt")
+    loaded = PromptBank.load(tmp_path / "bank.pt")
+
+    assert (loaded.classes, loaded.captions, loaded.input_ids) == (bank.classes, bank.captions, bank.input_ids)
+    assert (loaded.class_ids, loaded.token_spans) == (bank.class_ids, bank.token_spans)
+    assert all(torch.equal(a, b) for a, b in zip(loaded.positive_maps, bank.positive_maps))
+    assert set(loaded.text_dict) == set(bank.text_dict)
+    for key, value in bank.text_dict.items():
+        assert torch.equal(loaded.text_dict[key], value), key
+
+    state = bank.state_dict()
+    state["version"] = 0
+    torch.save(state, tmp_path / "old.pt")
+    with pytest.raises(ValueError):
+        PromptBank.load(tmp_path / "old.pt")
+
+
+def test_chunk_text_dict_selects_and_expands_one_chunk(tiny_adapter):
+    bank = PromptBank.build(tiny_adapter.model, CLASSES)
+    assert len(bank) == 1
+    chunk = bank.chunk_text_dict(0, batch_size=3)
+    for key, value in bank.text_dict.items():
+        assert chunk[key].shape == (3, *value.shape[1:])
+        assert all(torch.equal(row, value[0]) for row in chunk[key])
+    image = torch.rand(1, 3, 64, 96, generator=torch.Generator().manual_seed(0))
+    with torch.no_grad():
+        banked = tiny_adapter.model(image, text_dict=bank.chunk_text_dict(0))
+        encoded = tiny_adapter.model(image, captions=[bank.captions[0]])
+    assert torch.allclose(banked["pred_boxes"], encoded["pred_boxes"], atol=1e-6)
+
+
+def test_adapter_uses_its_bank_only_for_matching_captions(tiny_adapter, sample_image, monkeypatch):
+    lookups = []
+    monkeypatch.setattr(tiny_adapter, "_on_prompt_bank_lookup", lookups.append)
+    bank = PromptBank.build(tiny_adapter.model, CLASSES)
+    tiny_adapter.set_prompt_bank(bank)
+    try:
+        assert tiny_adapter._match_prompt_bank("Person . traffic light.  car") is tiny_adapter.prompt_bank
+        assert tiny_adapter._match_prompt_bank("person . car") is None  # a subset is a different caption
+        assert tiny_adapter._match_prompt_bank("car . person . traffic light") is None  # order matters
+        assert lookups == ["hit", "miss", "miss"]
+
+        _, image = tiny_adapter.load_image(sample_image)
+        kwargs = dict(image=image, caption="person . traffic light . car", box_threshold=0.0, text_threshold=0.0)
+        banked = tiny_adapter.predict(**kwargs)
+    finally:
+        tiny_adapter.set_prompt_bank(None)
+    assert tiny_adapter._match_prompt_bank("person . traffic light . car") is None
+    assert lookups == ["hit", "miss", "miss", "hit"]  # no lookups without a bank
+    plain = tiny_adapter.predict(**kwargs)
+    assert banked.phrases == plain.phrases
+    assert torch.allclose(banked.boxes, plain.boxes, atol=1e-5)
+
+
+def test_missing_prompt_bank_file_fails_at_startup(tiny_settings_env, monkeypatch, tmp_path):
+    from config.runtime import get_settings
+
+    monkeypatch.setenv("GDINO_PROMPT_BANK", str(tmp_path / "typo.pt"))
+    with pytest.raises(FileNotFoundError, match="GDINO_PROMPT_BANK"):
+        get_settings()
+    (tmp_path / "bank.pt").write_bytes(b"")
+    monkeypatch.setenv("GDINO_PROMPT_BANK", str(tmp_path / "bank.pt"))
+    assert get_settings().prompt_bank_path == (tmp_path / "bank.pt").resolve()
+    monkeypatch.delenv("GDINO_PROMPT_BANK")
+    assert get_settings().prompt_bank_path is None
+
+
+def test_factory_counts_prompt_bank_lookups_in_the_service_metrics(tiny_settings_env):
+    from src.services.factory import create_grounding_dino_adapter
+    from src.services.metrics import METRICS
+
+    def lookups(result):
+        return dict(METRICS._metric("gdino_cache_lookups_total").series).get(("prompt_bank", result), 0)
+
+    adapter = create_grounding_dino_adapter()
+    adapter.set_prompt_bank(PromptBank.build(adapter.model, CLASSES))
+    hits, misses = lookups("hit"), lookups("miss")
+    adapter._match_prompt_bank("person . traffic light . car")
+    adapter._match_prompt_bank("person")
+    assert (lookups("hit") - hits, lookups("miss") - misses) == (1, 1)
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("cv2")
+
+from src.services.rendering import AnnotationHandle, AnnotationWriter
+
+
+def test_annotation_handle_renders_once_and_only_on_demand(tmp_path):
+    calls = []
+
+    def render():
+        calls.append(1)
+        return np.zeros((8, 8, 3), dtype=np.uint8)
+
+    writer = AnnotationWriter(max_workers=1)
+    lazy = AnnotationHandle(render=render, target_path=tmp_path / "lazy.jpg", writer=writer)
+    assert not calls and not lazy.target_path.exists()
+
+    assert lazy.path().exists()
+    lazy.image()
+    assert len(calls) == 1
+
+    background = AnnotationHandle(render=render, target_path=tmp_path / "bg.jpg", writer=writer)
+    assert background.schedule().path(timeout=10).exists()
+    assert len(calls) == 2
+    writer.shutdown()
+
+
+def test_annotations_are_written_before_the_response_by_default(tiny_settings_env, monkeypatch):
+    from config.runtime import get_settings
+
+    monkeypatch.delenv("GDINO_ANNOTATION_MODE")
+    assert get_settings().annotation_mode == "sync"  # "background" reports paths not yet written
+    monkeypatch.setenv("GDINO_ANNOTATION_MODE", "Background")
+    assert get_settings().annotation_mode == "background"
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+pytest.importorskip("torch")
+
+from src.services.cpu_layout import parse_cpu_list
+from src.services.replicas import ReplicaPool, ReplicaSpec, plan_replicas
+
+
+class _FakeService:
+    def __init__(self, spec: ReplicaSpec) -> None:
+        self.spec = spec
+        self.thread = threading.current_thread().name
+        self.release = threading.Event()
+        self.release.set()
+        self.fail = False
+        self.ready = False
+
+    def detect_from_path(self, path):
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("CUDA out of memory")
+        if path is None:
+            raise ValueError("no image")
+        return self.spec.index
+
+    def memory_bytes(self) -> int:
+        return 10
+
+    def mark_ready(self) -> None:
+        self.ready = True
+
+    def warmup(self, caption: str = "object") -> None:
+        self.ready = True
+
+
+class _Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _pool(count: int, **kwargs) -> ReplicaPool:
+    specs = [ReplicaSpec(index=index, device="cpu") for index in range(count)]
+    return ReplicaPool(_FakeService, specs, model_name="fake", **kwargs)
+
+
+def test_plan_replicas_per_gpu_and_per_numa_node():
+    gpus = plan_replicas(0, device="cuda", gpu_count=2)
+    assert [spec.device for spec in gpus] == ["cuda:0", "cuda:1"]
+    assert plan_replicas(1, device="cuda", gpu_count=2) == [ReplicaSpec(0, "cuda")]
+
+    nodes = [tuple(parse_cpu_list("0-3")), tuple(parse_cpu_list("4-7"))]
+    numa = plan_replicas(0, device="cpu", cpu_mode="numa", numa_nodes=nodes)
+    assert [spec.cpus for spec in numa] == nodes
+    split = plan_replicas(2, device="cpu", cpu_mode="split", cpus=range(8))
+    assert [spec.cpus for spec in split] == [(0, 1, 2, 3), (4, 5, 6, 7)]
+    assert [spec.device for spec in plan_replicas(3, device="cpu", devices=["a", "b"])] == ["a", "b", "a"]
+    with pytest.raises(ValueError):
+        plan_replicas(2, device="cpu", cpu_mode="bogus")
+
+
+def test_pool_builds_each_replica_on_its_own_thread_and_spreads_load():
+    pool = _pool(2)
+    threads = {replica.service.thread for replica in pool._replicas}
+    assert len(threads) == 2
+    assert [pool.detect_from_path(path="x") for _ in range(4)] == [0, 1, 0, 1]
+
+    busy = pool._replicas[0].service
+    busy.release.clear()
+    results = []
+    worker = threading.Thread(target=lambda: results.append(pool.detect_from_path(path="x")))
+    worker.start()
+    while pool._replicas[0].outstanding == 0:
+        pass
+    # replica 0 is busy, so the next requests go to replica 1
+    assert [pool.detect_from_path(path="x") for _ in range(3)] == [1, 1, 1]
+    busy.release.set()
+    worker.join(5)
+    assert results == [0]
+
+    pool.warmup()
+    assert pool.ready and pool.memory_bytes() == 20
+    pool.close()
+
+
+def test_faulty_replica_leaves_rotation_until_cooldown_ends():
+    clock = _Clock()
+    pool = _pool(2, max_failures=2, cooldown=10, clock=clock)
+    with pytest.raises(ValueError):  # request errors do not count against a replica
+        pool.detect_from_path(path=None)
+    pool._replicas[0].service.fail = True
+    for _ in range(2):
+        assert pool.detect_from_path(path="x") == 1
+        with pytest.raises(RuntimeError):
+            pool.detect_from_path(path="x")
+    assert [status["healthy"] for status in pool.replica_status()] == [False, True]
+    assert [pool.detect_from_path(path="x") for _ in range(3)] == [1, 1, 1]
+
+    pool._replicas[0].service.fail = False
+    clock.now = 11
+    assert sorted(pool.detect_from_path(path="x") for _ in range(2)) == [0, 1]
+    pool.close()
+
+
+def test_factory_builds_a_pool_of_tiny_model_replicas(tiny_settings_env, monkeypatch, sample_image):
+    pytest.importorskip("transformers")
+    from src.services.factory import create_detection_manager
+
+    monkeypatch.setenv("GDINO_REPLICAS", "2")
+    manager = create_detection_manager()
+    with manager.use() as service:
+        assert isinstance(service, ReplicaPool) and service.ready
+        result = service.detect_from_path(image_path=sample_image, caption="person", box_threshold=0.0)
+    assert [status["served"] for status in service.replica_status()] == [1, 0]
+    assert len(result.items) > 0
+    assert manager.evict("grounding_dino")
+
+
+def test_pinned_replicas_size_their_own_thread_pools():
+    import torch
+
+    from src.services.cpu_layout import available_cpus
+
+    cpus = tuple(available_cpus()[:1])
+    specs = [ReplicaSpec(index=index, device="cpu", cpus=cpus) for index in range(2)]
+    sized = []
+
+    def factory(spec):
+        sized.append(torch.get_num_threads())
+        return _FakeService(spec)
+
+    before = torch.get_num_threads()
+    torch.set_num_threads(4)
+    try:
+        pool = ReplicaPool(factory, specs, model_name="fake", size_thread_pools=True)
+        pool.close()
+        assert sized == [len(cpus)] * 2
+        assert torch.get_num_threads() == 4  # the calling thread keeps its own pool size
+    finally:
+        torch.set_num_threads(before)
+
+
+def test_stage_timings_survive_a_replica_dispatch():
+    from groundingdino.util.time_counter import PROFILER, profile_stage
+
+    class _TimedService(_FakeService):
+        def detect_from_path(self, path):
+            with profile_stage("replica_stage"):
+                return super().detect_from_path(path)
+
+    pool = ReplicaPool(_TimedService, [ReplicaSpec(index=0, device="cpu")], model_name="fake")
+    enabled, sync_cuda = PROFILER.enabled, PROFILER.sync_cuda
+    PROFILER.configure(enabled=True)
+    try:
+        with PROFILER.collect() as timings:
+            assert pool.detect_from_path("a.jpg") == 0
+    finally:
+        PROFILER.configure(enabled=enabled, sync_cuda=sync_cuda)
+        pool.close()
+    assert set(timings) == {"replica_stage"}
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from src.services.result_cache import ResultCache, make_cache_key
+
+
+def _raw(seed: int):
+    from groundingdino.util.inference import RawPrediction
+
+    generator = torch.Generator().manual_seed(seed)
+    return RawPrediction(
+        logits=torch.rand(30, 8, generator=generator),
+        boxes=torch.rand(30, 4, generator=generator),
+        input_ids=[101, 2711, 1012, 102] + [0] * 4,
+    )
+
+
+def test_cache_key_ignores_caption_formatting():
+    assert make_cache_key("abc", "Person .  Car", "gdino", "v1") == make_cache_key(
+        "abc", "person . car .", "gdino", "v1"
+    )
+    assert make_cache_key("abc", "person", "gdino", "v1") != make_cache_key(
+        "abc", "person", "gdino", "v2"
+    )
+
+
+def test_disk_tier_round_trips_and_evicts_oldest(tmp_path):
+    cache = ResultCache(max_entries=1, disk_dir=tmp_path, max_disk_bytes=10**9, top_k=0, token_floor=0.0)
+    cache.put("a", _raw(0))
+    cache.put("b", _raw(1))
+    assert len(cache) == 1
+
+    restored = cache.get("a")  # evicted from memory, read back from disk
+    assert torch.equal(restored.logits, _raw(0).logits)
+    assert restored.input_ids == _raw(0).input_ids
+
+    entry_size = (tmp_path / "a.npz").stat().st_size
+    small = ResultCache(
+        max_entries=0, disk_dir=tmp_path, max_disk_bytes=int(entry_size * 2.5), top_k=0, token_floor=0.0
+    )
+    small.put("c", _raw(2))
+    assert not (tmp_path / "b.npz").exists()
+    assert small.get("c") is not None and small.disk_bytes <= entry_size * 2.5
+
+
+def test_service_serves_new_thresholds_from_cache(tiny_adapter, tmp_path, sample_image):
+    from src.services.detection_service import DetectionService
+
+    service = DetectionService(
+        model_adapter=tiny_adapter,
+        model_name="grounding_dino",
+        images_dir=tmp_path / "images",
+        results_dir=tmp_path / "results",
+        search_dir=tmp_path,
+        default_box_threshold=0.3,
+        default_text_threshold=0.25,
+        annotate_results=False,
+        result_cache=ResultCache(max_entries=4),
+    )
+    first = service.detect_from_path(image_path=sample_image, caption="person . car .")
+    second = service.detect_from_path(
+        image_path=sample_image, caption="Person . car", box_threshold=0.6, text_threshold=0.5
+    )
+    assert not first.cache_hit and second.cache_hit
+    assert first.result_id == second.result_id
+
+    refiltered = service.refilter(result_id=first.result_id, box_threshold=0.6, text_threshold=0.5)
+    assert [item.label for item in refiltered.items] == [item.label for item in second.items]
+    assert refiltered.source_path is None and refiltered.result_id == first.result_id
+    with pytest.raises(KeyError):
+        service.refilter(result_id="missing")
+
+    _, image = tiny_adapter.load_image(sample_image)
+    expected = tiny_adapter.predict(
+        image=image, caption="person . car .", box_threshold=0.6, text_threshold=0.5
+    )
+    assert [item.label for item in second.items] == expected.phrases
+    assert [item.score for item in second.items] == pytest.approx(expected.logits.tolist())
+
+
+def test_compact_prediction_filters_exactly_within_its_bounds():
+    from groundingdino.util.inference import filter_raw_prediction
+
+    class _Tokenizer:
+        def decode(self, token_ids):
+            return " ".join(str(token) for token in token_ids)
+
+    raw = _raw(3)
+    compact = raw.compact(top_k=5, token_floor=0.2)
+    assert compact.logits.shape == (5, 8)
+    bound = compact.min_box_threshold
+    for box_threshold in (bound, (bound + 1.0) / 2, 1.0):
+        expected = filter_raw_prediction(raw, _Tokenizer(), box_threshold, 0.3)
+        actual = filter_raw_prediction(compact, _Tokenizer(), box_threshold, 0.3)
+        assert torch.equal(expected[0], actual[0]) and expected[2] == actual[2]
+    assert not compact.covers(compact.min_box_threshold - 0.01, 0.3)
+    assert not compact.covers(0.99, 0.1)
+
+
+def test_tiling_and_prompt_bank_are_part_of_the_cache_key(tiny_adapter, tmp_path, sample_image):
+    from src.services.detection_service import DetectionService, TilingOptions
+
+    def service(tiling=None):
+        return DetectionService(
+            model_adapter=tiny_adapter,
+            model_name="grounding_dino",
+            images_dir=tmp_path / "images",
+            results_dir=tmp_path / "results",
+            search_dir=tmp_path,
+            default_box_threshold=0.3,
+            default_text_threshold=0.25,
+            annotate_results=False,
+            tiling=tiling,
+            result_cache=ResultCache(max_entries=4, disk_dir=tmp_path / "cache"),  # shared on disk
+        )
+
+    plain = service().detect_from_path(image_path=sample_image, caption="person .")
+    tiled_service = service(TilingOptions(tile_size=64))
+    tiled = tiled_service.detect_from_path(image_path=sample_image, caption="person .")
+    assert not tiled.cache_hit and tiled.result_id != plain.result_id  # no stale untiled result
+    assert service().detect_from_path(image_path=sample_image, caption="person .").cache_hit
+
+    tiny_adapter.set_prompt_bank(tiny_adapter.build_prompt_bank("person"))
+    try:
+        banked = service().detect_from_path(image_path=sample_image, caption="person .")
+    finally:
+        tiny_adapter.set_prompt_bank(None)
+    assert not banked.cache_hit and banked.result_id != plain.result_id
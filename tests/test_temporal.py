@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from groundingdino.util.prompt_bank import PromptBank
+from groundingdino.util.temporal import TemporalFeatureCache
+
+
+@pytest.fixture(scope="module")
+def text_dict(tiny_adapter):
+    return PromptBank.build(tiny_adapter.model, ["person", "car"]).chunk_text_dict(0)
+
+
+def _frame(seed: int) -> "torch.Tensor":
+    generator = torch.Generator().manual_seed(seed)
+    coarse = torch.randn(1, 3, 5, 7, generator=generator)
+    return torch.nn.functional.interpolate(coarse, size=(160, 224), mode="bilinear")[0]
+
+
+def test_keyframe_matches_full_forward_and_static_frames_reuse(tiny_adapter, text_dict):
+    model = tiny_adapter.model
+    cache = TemporalFeatureCache(model, keyframe_interval=3)
+    image = _frame(0)
+
+    outputs, mode = cache(image, text_dict, text_key="person . car")
+    with torch.no_grad():
+        expected = model(image[None], text_dict=text_dict)
+    assert mode == "keyframe"
+    assert torch.allclose(outputs["pred_boxes"], expected["pred_boxes"])
+    num_tokens = outputs["pred_logits"].shape[-1]  # compact logits: text tokens only
+    assert torch.allclose(outputs["pred_logits"], expected["pred_logits"][..., :num_tokens])
+
+    again, mode = cache(image.clone(), text_dict, text_key="person . car")
+    assert mode == "reuse" and again is outputs
+    _, mode = cache(image.clone(), text_dict, text_key="other caption")
+    assert mode == "partial"  # same features, new text: transformer only
+    _, mode = cache(image.clone(), text_dict, text_key="other caption")
+    assert mode == "keyframe"  # keyframe_interval
+    assert cache.counts == {"keyframe": 2, "partial": 1, "reuse": 1}
+
+
+def test_local_change_splices_only_changed_blocks(tiny_adapter, text_dict):
+    cache = TemporalFeatureCache(tiny_adapter.model, keyframe_interval=0, margin=1)
+    image = _frame(1)
+    cache(image, text_dict)
+    before = [feature.tensors.clone() for feature in cache._features]
+
+    changed = image.clone()
+    changed[:, 70:90, 100:120] += 2.0  # inside block row 2, column 3
+    _, mode = cache(changed, text_dict)
+    assert mode == "partial"
+    for level, (old, feature) in enumerate(zip(before, cache._features)):
+        stride = 32 // 2 ** (2 - level)
+        diff = (feature.tensors - old).abs().sum(dim=(0, 1)) > 0
+        rows, cols = diff.nonzero(as_tuple=True)
+        assert rows.min() >= 64 // stride and rows.max() < 96 // stride
+        assert cols.min() >= 96 // stride and cols.max() < 128 // stride
+
+    _, mode = cache(_frame(2), text_dict)
+    assert mode == "keyframe"  # most blocks changed
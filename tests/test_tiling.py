@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from groundingdino.util.box_ops import weighted_boxes_fusion
+from groundingdino.util.inference import get_tile_windows
+
+
+def test_tile_windows_cover_image_with_equal_sized_tiles():
+    windows = get_tile_windows(height=600, width=900, tile_size=256, overlap=0.2)
+
+    assert {(x1 - x0, y1 - y0) for x0, y0, x1, y1 in windows} == {(256, 256)}
+    assert max(x1 for _, _, x1, _ in windows) == 900
+    assert max(y1 for _, _, _, y1 in windows) == 600
+    assert get_tile_windows(height=200, width=300, tile_size=800) == [(0, 0, 300, 200)]
+
+
+def test_weighted_boxes_fusion_merges_overlaps_of_the_same_label_only():
+    boxes = torch.tensor(
+        [[0.0, 0.0, 10.0, 10.0], [1.0, 1.0, 11.0, 11.0], [50.0, 50.0, 60.0, 60.0], [0.0, 0.0, 10.0, 10.0]]
+    )
+    scores = torch.tensor([0.9, 0.5, 0.8, 0.7])
+    labels = torch.tensor([0, 0, 0, 1])
+
+    fused_boxes, fused_scores, best_idx = weighted_boxes_fusion(boxes, scores, labels, iou_threshold=0.5)
+
+    assert best_idx.tolist() == [0, 2, 3]
+    assert fused_scores.tolist() == pytest.approx([0.9, 0.8, 0.7])
+    expected = (boxes[0] * 0.9 + boxes[1] * 0.5) / 1.4
+    assert torch.allclose(fused_boxes[0], expected)
+
+
+def test_predict_tiled_on_the_tiny_model(tiny_adapter, sample_image):
+    pytest.importorskip("transformers")
+    from groundingdino.util.inference import predict_tiled
+
+    image_source, _ = tiny_adapter.load_image(sample_image)
+    num_tiles = len(get_tile_windows(*image_source.shape[:2], tile_size=64))
+    assert num_tiles > 1
+    kwargs = dict(caption="person . car .", box_threshold=0.0, text_threshold=0.0, device="cpu", tile_size=64)
+    raw_boxes, raw_scores, raw_phrases = predict_tiled(
+        tiny_adapter.model, image_source, **kwargs, iou_threshold=1.0
+    )
+    num_queries = tiny_adapter.model.num_queries
+    assert len(raw_boxes) == len(raw_scores) == len(raw_phrases) == (num_tiles + 1) * num_queries  # + full image
+
+    for merge in ("nms", "wbf"):
+        boxes, scores, phrases = predict_tiled(tiny_adapter.model, image_source, **kwargs, merge=merge)
+        assert boxes.shape == (len(phrases), 4) and scores.shape == (len(phrases),)
+        assert 0 < len(phrases) < len(raw_phrases)
+        assert set(phrases) <= set(raw_phrases)
+        assert scores.max() == pytest.approx(raw_scores.max())  # the best box always survives
+
+    tiles_only = predict_tiled(tiny_adapter.model, image_source, **kwargs, full_image_pass=False, iou_threshold=1.0)
+    assert len(tiles_only[0]) == num_tiles * num_queries
+    single = predict_tiled(tiny_adapter.model, image_source, **{**kwargs, "tile_size": 256})
+    assert len(single[0]) == num_queries  # one window: neither a full-image pass nor a merge
+    with pytest.raises(ValueError):
+        predict_tiled(tiny_adapter.model, image_source, **kwargs, merge="mean")
+
+
+def test_detection_service_tiles_only_images_larger_than_a_tile(tiny_adapter, sample_image, tmp_path, monkeypatch):
+    pytest.importorskip("transformers")
+    from src.services.detection_service import DetectionService, TilingOptions
+
+    calls = []
+    predict_tiled = tiny_adapter.predict_tiled
+
+    def spy(**kwargs):
+        calls.append(kwargs["tile_size"])
+        return predict_tiled(**kwargs)
+
+    monkeypatch.setattr(tiny_adapter, "predict_tiled", spy)
+
+    def service(tile_size):
+        return DetectionService(
+            model_adapter=tiny_adapter,
+            model_name="grounding_dino",
+            images_dir=tmp_path / "images",
+            results_dir=tmp_path / "results",
+            search_dir=tmp_path,
+            default_box_threshold=0.0,
+            default_text_threshold=0.0,
+            annotate_results=False,
+            tiling=TilingOptions(tile_size=tile_size, merge="wbf"),
+        )
+
+    tiled = service(64).detect_from_path(image_path=sample_image, caption="person .")
+    assert calls == [64] and len(tiled.items) > 0
+    service(128).detect_from_path(image_path=sample_image, caption="person .")  # fits in one tile
+    assert calls == [64]
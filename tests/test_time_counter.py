@@ -0,0 +1,27 @@
+from __future__ import annotations
+
+from groundingdino.util.time_counter import LatencyHistogram, StageProfiler
+
+
+def test_stage_profiler_records_only_while_enabled():
+    profiler = StageProfiler()
+    with profiler.collect() as timings:
+        with profiler.stage("backbone"):
+            pass
+    assert timings == {} and profiler.histograms() == {}
+
+    profiler.configure(enabled=True)
+    with profiler.collect() as timings:
+        for layer_id in range(2):
+            with profiler.stage("encoder.fusion", layer_id):
+                pass
+    assert set(timings) == {"encoder.fusion.0", "encoder.fusion.1"}
+    assert profiler.histograms()["encoder.fusion.0"].count == 1
+
+
+def test_latency_histogram_buckets_are_cumulative():
+    histogram = LatencyHistogram(buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+    assert histogram.cumulative_counts() == [2, 3, 4]
+    assert histogram.count == 4
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import pytest
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("transformers")
+
+from tests.conftest import TINY_CONFIG
+
+
+def test_tiny_model_builds_offline_and_deterministically():
+    from groundingdino.util.inference import load_model, predict
+
+    model = load_model(str(TINY_CONFIG), None, device="cpu")
+    again = load_model(str(TINY_CONFIG), "ignored.pth", device="cpu")
+    for name, tensor in model.state_dict().items():
+        assert torch.equal(tensor, again.state_dict()[name]), name
+
+    boxes, logits, phrases = predict(
+        model, torch.rand(3, 64, 96), "person . car .", 0.0, 0.0, device="cpu"
+    )
+    assert boxes.shape == (30, 4) and logits.shape == (30,) and len(phrases) == 30
+
+
+def test_load_model_needs_a_checkpoint_unless_the_config_sets_random_init(tmp_path):
+    from groundingdino.util.inference import load_model
+
+    config = tmp_path / "no_random_init.py"
+    config.write_text(TINY_CONFIG.read_text().replace("random_init = True", "random_init = False"))
+    for checkpoint in (None, ""):
+        with pytest.raises(ValueError, match="random_init"):
+            load_model(str(config), checkpoint, device="cpu")
+    with pytest.raises(FileNotFoundError):
+        load_model(str(config), str(tmp_path / "missing.pth"), device="cpu")
+
+
+def test_benchmark_model_uses_the_seeded_random_init(tmp_path):
+    import torch
+
+    from benchmarks.cli import build_benchmark_model
+    from groundingdino.util.inference import load_model
+
+    config = tmp_path / "no_random_init.py"
+    config.write_text(TINY_CONFIG.read_text().replace("random_init = True", "random_init = False"))
+    reference = load_model(str(TINY_CONFIG), None, device="cpu").state_dict()
+    for model in (
+        load_model(str(config), None, device="cpu", random_init=True),
+        build_benchmark_model(config, None, "cpu"),
+    ):
+        state = model.state_dict()
+        assert state.keys() == reference.keys()
+        assert all(torch.equal(state[name], reference[name]) for name in reference)
+
+
+def test_tiny_model_serves_detect_route(tiny_settings_env, sample_image):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from api.routers import detect
+    from src.services.factory import create_detection_manager
+
+    manager = create_detection_manager()
+    service = manager.available_models()["grounding_dino"]
+    result = service.detect_from_path(image_path=sample_image, caption="person .", box_threshold=0.01)
+    assert result.annotated_path is not None
+
+    app = FastAPI()
+    app.state.detection_manager = manager
+    app.include_router(detect.router)
+    client = TestClient(app)
+    response = client.post(
+        "/detect",
+        files={"file": ("sample.jpg", sample_image.read_bytes(), "image/jpeg")},
+        data={"text": "person . car ."},
+    )
+    assert response.status_code == 200
+    assert isinstance(response.json(), list)
+
+    refiltered = client.post(
+        "/detect/refilter",
+        json={"result_id": response.headers["X-Result-Id"], "box_threshold": 0.9},
+    )
+    assert refiltered.status_code == 200
+    assert len(refiltered.json()) <= len(response.json())
+    assert client.post("/detect/refilter", json={"result_id": "missing"}).status_code == 404
+
+
+def test_compact_logits_match_the_padded_output():
+    from groundingdino.util.inference import load_model
+
+    model = load_model(str(TINY_CONFIG), None, device="cpu")
+    images = torch.rand(2, 3, 64, 96, generator=torch.Generator().manual_seed(0))
+    captions = ["person .", "person . traffic light . car ."]  # padded to the longer one
+    with torch.no_grad():
+        padded = model(images, captions=captions)
+        compact = model(images, captions=captions, compact_logits=True)
+        encoder = model.forward_encoder_logits(images, captions=captions, compact_logits=True)
+
+    num_tokens = compact["pred_logits"].shape[-1]
+    assert padded["pred_logits"].shape[-1] == 256 and num_tokens < 256
+    assert torch.equal(compact["pred_logits"], padded["pred_logits"][..., :num_tokens])
+    assert torch.isinf(padded["pred_logits"][..., num_tokens:]).all()
+    assert torch.equal(compact["pred_boxes"], padded["pred_boxes"])
+    assert encoder.shape[-1] == num_tokens
+
+
+def test_final_layer_heads_match_the_all_layer_forward(tiny_adapter):
+    from benchmarks.suites import BenchmarkCase, build_final_heads, build_forward
+
+    model = tiny_adapter.model
+    assert model.final_layer_heads  # the adapter enables it by default
+    images = torch.rand(2, 3, 64, 96, generator=torch.Generator().manual_seed(1))
+    case = BenchmarkCase(model, "cpu", None, None, "person . traffic light .", batch_size=2)
+    case.batch_tensor = lambda: images
+    full = build_forward(case)()
+    final = build_final_heads(case)()
+    assert torch.equal(final["pred_boxes"], full["pred_boxes"])
+    assert torch.equal(final["pred_logits"], full["pred_logits"])
+    with torch.no_grad():
+        compact = model(images, captions=[case.caption] * 2, compact_logits=True)
+    assert torch.equal(compact["pred_logits"], full["pred_logits"][..., : compact["pred_logits"].shape[-1]])
+
+
+def test_detect_route_does_not_render_annotations(tiny_settings_env, sample_image, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from api.routers import detect
+    from src.adapters.grounding_dino import GroundingDinoModelAdapter
+    from src.services.factory import create_detection_manager
+
+    renders = []
+    annotate = GroundingDinoModelAdapter.annotate
+
+    def counting_annotate(self, **kwargs):
+        renders.append(kwargs["phrases"])
+        return annotate(self, **kwargs)
+
+    monkeypatch.setattr(GroundingDinoModelAdapter, "annotate", counting_annotate)
+    monkeypatch.setenv("GDINO_ANNOTATION_MODE", "sync")
+    monkeypatch.setenv("GDINO_BOX_THRESHOLD", "0.01")
+    manager = create_detection_manager()
+
+    app = FastAPI()
+    app.state.detection_manager = manager
+    app.include_router(detect.router)
+    response = TestClient(app).post(
+        "/detect",
+        files={"file": ("sample.jpg", sample_image.read_bytes(), "image/jpeg")},
+        data={"text": "person . car ."},
+    )
+    assert response.status_code == 200 and len(response.json()) > 0
+    assert renders == []  # the response has no image, so nothing is drawn or encoded
+
+    service = manager.available_models()["grounding_dino"]
+    result = service.detect_from_path(image_path=sample_image, caption="person .")
+    assert result.annotated_path.exists() and len(renders) == 1  # sync where a path is returned
@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import pytest
+
+torch = pytest.importorskip("torch")
+
+from groundingdino.util.tracker import ObjectTracker
+
+
+def _boxes(*boxes):
+    return torch.tensor(boxes, dtype=torch.float32).reshape(-1, 4)
+
+
+def test_tracks_keep_ids_and_follow_motion_between_detections():
+    tracker = ObjectTracker(detect_every=3, min_confidence=0.0)
+    schedule = []
+    for frame in range(10):
+        x = 0.2 + 0.01 * frame
+        if tracker.should_detect():
+            schedule.append(frame)
+            tracks = tracker.update(
+                _boxes([x, 0.5, 0.1, 0.2], [0.8, 0.2, 0.1, 0.1]),
+                torch.tensor([0.9, 0.6]),
+                ["person", "car" if frame else "truck"],
+            )
+        else:
+            tracks = tracker.propagate()
+        assert [track.id for track in tracks] == [1, 2]
+        if frame == 8:  # propagated with the velocity learned from earlier detections
+            assert tracks[0].box[0] == pytest.approx(x, abs=0.005)
+
+    assert schedule == [0, 3, 6, 9]
+    car = tracks[1]
+    assert car.label == "car"  # outvoted the first frame's label
+    assert tracker.tracks_created == 2
+
+
+def test_unmatched_tracks_expire_and_new_objects_get_new_ids():
+    tracker = ObjectTracker(detect_every=1, max_misses=1)
+    tracker.update(_boxes([0.3, 0.3, 0.1, 0.1]), torch.tensor([0.9]), ["cat"])
+    tracks = tracker.update(_boxes([0.7, 0.7, 0.1, 0.1]), torch.tensor([0.8]), ["dog"])
+    assert [track.id for track in tracks] == [1, 2]  # the cat survives one miss
+    tracks = tracker.update(_boxes([0.7, 0.7, 0.1, 0.1]), torch.tensor([0.8]), ["dog"])
+    assert [(track.id, track.label) for track in tracks] == [(2, "dog")]
+
+
+def test_fading_confidence_triggers_an_early_detection():
+    tracker = ObjectTracker(detect_every=10, min_confidence=0.3, confidence_decay=0.5)
+    tracker.update(_boxes([0.5, 0.5, 0.2, 0.2]), torch.tensor([0.8]), ["cup"])
+    tracker.propagate()  # 0.4
+    assert not tracker.should_detect()
+    tracker.propagate()  # 0.2
+    assert tracker.should_detect()
+
+
+def test_model_track_with_caption_runs_detector_every_n_frames(monkeypatch):
+    np = pytest.importorskip("numpy")
+    pytest.importorskip("transformers")
+    from groundingdino.util import inference
+    from tests.conftest import TINY_CONFIG
+
+    model = inference.Model(str(TINY_CONFIG), None, device="cpu")
+    calls = []
+    original = inference.predict
+    monkeypatch.setattr(
+        inference, "predict", lambda **kwargs: calls.append(1) or original(**kwargs)
+    )
+    frame = np.random.default_rng(0).integers(0, 256, size=(48, 64, 3), dtype=np.uint8)
+    for _ in range(4):
+        detections, labels = model.track_with_caption(
+            frame, "person . car", box_threshold=0.0, text_threshold=0.0, detect_every=2
+        )
+    assert len(calls) == 2
+    assert len(detections) == len(labels) == 30
+    assert sorted(detections.tracker_id.tolist()) == list(range(1, 31))
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import io
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+cv2 = pytest.importorskip("cv2")
+
+from src.pipelines.video import FrameReader, FrameScheduler, run_video
+
+
+@pytest.fixture
+def video_file(tmp_path):
+    path = tmp_path / "clip.avi"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 10.0, (128, 96))
+    rng = np.random.default_rng(0)
+    for _ in range(12):
+        writer.write(rng.integers(0, 256, size=(96, 128, 3), dtype=np.uint8))
+    writer.release()
+    return path
+
+
+class _FakeCapture:
+    def __init__(self, frames: int) -> None:
+        self._remaining = frames
+
+    def get(self, prop):
+        return 30.0 if prop == cv2.CAP_PROP_FPS else 0.0
+
+    def read(self):
+        if self._remaining == 0:
+            return False, None
+        self._remaining -= 1
+        return True, np.zeros((4, 4, 3), dtype=np.uint8)
+
+
+def test_scheduler_caps_rate_and_adapts_to_latency():
+    scheduler = FrameScheduler(target_fps=10.0)
+    picked = [i for i in range(12) if scheduler.should_detect(i / 30.0)]
+    assert picked == [0, 3, 6, 9]
+
+    adaptive = FrameScheduler(target_fps=10.0, adaptive=True, headroom=0.0)
+    assert adaptive.should_detect(0.0)
+    adaptive.record_latency(0.5)
+    assert not adaptive.should_detect(0.4)
+    assert adaptive.should_detect(0.5)
+
+
+def test_reader_drops_stale_frames_only_for_live_sources():
+    live = FrameReader(_FakeCapture(20), buffer_size=2, drop_stale=True).start()
+    live._thread.join(5)
+    assert [frame.index for frame in live] == [18, 19]
+    assert (live.frames_read, live.frames_dropped) == (20, 18)
+
+    offline = FrameReader(_FakeCapture(20), buffer_size=2, drop_stale=False, realtime=False).start()
+    frames = list(offline)
+    assert [frame.index for frame in frames] == list(range(20))
+    assert frames[3].timestamp == pytest.approx(0.1)
+    assert offline.frames_dropped == 0
+
+
+def test_run_video_streams_jsonl_and_annotated_video(tiny_adapter, video_file, tmp_path):
+    pytest.importorskip("torch")
+    output = io.StringIO()
+    annotated = tmp_path / "annotated.avi"
+    stats = run_video(
+        adapter=tiny_adapter,
+        source=str(video_file),
+        caption="person . car",
+        box_threshold=0.0,
+        text_threshold=0.0,
+        target_fps=5.0,
+        size=64,
+        jsonl=output,
+        output_video=annotated,
+    )
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [record["frame"] for record in records] == [0, 2, 4, 6, 8, 10]
+    assert all(len(record["detections"]) == 30 for record in records)
+    assert (stats.frames_read, stats.frames_detected, stats.frames_skipped) == (12, 6, 6)
+
+    capture = cv2.VideoCapture(str(annotated))
+    assert capture.get(cv2.CAP_PROP_FRAME_COUNT) == 12
+    capture.release()
+
+
+def test_run_video_incremental_reuses_static_frames(tiny_adapter, tmp_path):
+    pytest.importorskip("torch")
+    path = tmp_path / "static.avi"
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 10.0, (128, 96))
+    frame = np.kron(np.random.default_rng(1).integers(0, 256, size=(6, 8, 3)), np.ones((16, 16, 1)))
+    for _ in range(6):
+        writer.write(frame.astype(np.uint8))
+    writer.release()
+
+    output = io.StringIO()
+    stats = run_video(
+        adapter=tiny_adapter,
+        source=str(path),
+        caption="person . car",
+        target_fps=0.0,
+        size=96,
+        jsonl=output,
+        temporal={"keyframe_interval": 4},
+    )
+    assert stats.frames_detected == 6
+    assert stats.temporal == {"keyframe": 2, "partial": 0, "reuse": 4}
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert records[1]["detections"] == records[0]["detections"]
+
+
+def test_run_video_tracking_detects_every_n_frames(tiny_adapter, video_file):
+    pytest.importorskip("torch")
+    output = io.StringIO()
+    stats = run_video(
+        adapter=tiny_adapter,
+        source=str(video_file),
+        caption="person . car",
+        box_threshold=0.3,
+        text_threshold=0.0,
+        size=64,
+        jsonl=output,
+        track={"detect_every": 4, "min_confidence": 0.0},
+    )
+    records = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert len(records) == 12
+    assert [record["frame"] for record in records if record["detected"]] == [0, 4, 8]
+    assert stats.frames_detected == 3 and stats.tracks_created is not None
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import pytest
+
+pytest.importorskip("torch")
+transformers = pytest.importorskip("transformers")
+
+from groundingdino.util.vl_utils import build_chunked_captions_and_token_span
+
+
+@pytest.fixture()
+def tokenizer(tmp_path):
+    vocab = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", ".", "red", "blue", "cat", "dog", "bottle"]
+    vocab_file = tmp_path / "vocab.txt"
+    vocab_file.write_text("\n".join(vocab) + "\n", encoding="utf-8")
+    return transformers.BertTokenizerFast(vocab_file=str(vocab_file))
+
+
+def test_chunks_respect_token_budget_and_keep_class_order(tokenizer):
+    classes = [f"{color} {noun}" for color in ("red", "blue") for noun in ("cat", "dog", "bottle")] * 5
+
+    chunks = build_chunked_captions_and_token_span(classes, tokenizer, max_text_len=16)
+
+    assert len(chunks) > 1
+    assert [class_id for _, class_ids, _ in chunks for class_id in class_ids] == list(
+        range(len(classes))
+    )
+    for caption, class_ids, token_spans in chunks:
+        assert len(tokenizer(caption)["input_ids"]) <= 16
+        for class_id, spans in zip(class_ids, token_spans):
+            assert " ".join(caption[beg:end] for beg, end in spans) == classes[class_id]
+
+
+def test_chunking_rejects_class_longer_than_budget(tokenizer):
+    with pytest.raises(ValueError):
+        build_chunked_captions_and_token_span(["red blue cat dog"], tokenizer, max_text_len=5)